@@ -6,257 +6,256 @@ This file generates realistic errors and issues for postmortem analysis
 
 import sys
 import time
+import argparse
+import hashlib
 import random
 import logging
 import json
 import os
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import requests
 import psutil
+import numpy as np
 
-# Ensure log directory exists
-os.makedirs("logs", exist_ok=True)
+from simulator.access_logs import AccessLogGenerator
+from simulator.alerts import AlertEvaluator, DEFAULT_RULES as DEFAULT_ALERT_RULES
+from simulator.clock import RealClock, SimulatedClock, ClockFilter
+from simulator.config import parse_duration, parse_size
+from simulator.log_rotation import RotationPolicy, COMPRESSIONS
+from simulator.log_sink import LogSink, SinkHandler, OVERFLOW_POLICIES
+from simulator.profiling import PhaseProfiler, PROFILERS
+from simulator.scenarios import ScenarioRegistry
+from simulator.services import SERVICE_PORTS
+from simulator.telemetry import TelemetryOutput, FORMATS as TELEMETRY_FORMATS
+from simulator.timeseries import MetricsStore
+from simulator.traffic import TrafficModel
 
-# Create timestamp for filenames
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+# Fixed origin for sharded runs so a seed set always yields the same timestamps
+DEFAULT_SHARD_START = datetime(2025, 1, 1)
 
-# Log filenames with timestamp
-app_log_file = f"logs/application_{timestamp}.log"
-error_log_file = f"logs/error_{timestamp}.log"
-access_log_file = f"logs/access_{timestamp}.log"
+# EcommercePlatform methods timed as phases by --profile
+PHASES = ('health_check', 'generate_metrics', 'generate_access_logs', 'run_load_test',
+          'simulate_incident', 'resolve_incidents')
 
-# Custom filter to separate error logs from application logs
-class ErrorFilter(logging.Filter):
-    def filter(self, record):
-        return record.levelno >= logging.ERROR
-
-class AppFilter(logging.Filter):
-    def filter(self, record):
-        return record.levelno < logging.ERROR
+def log_paths(log_dir="logs", run_id=None):
+    """Application/error/access log filenames for one run"""
+    # Create timestamp for filenames
+    run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+    return {
+        'application': os.path.join(log_dir, f"application_{run_id}.log"),
+        'error': os.path.join(log_dir, f"error_{run_id}.log"),
+        'access': os.path.join(log_dir, f"access_{run_id}.log"),
+    }
 
 # Configure separate loggers
-def setup_logging():
-    # Main application logger (INFO and WARNING only)
+def setup_logging(paths, console=True, max_queue=100000, overflow='block', rotation=None):
+    """Route the runner and access loggers through one queue-based LogSink (rotating with a policy)"""
+    global log_sink
+    close_logging()
+
+    # Main application logger: INFO/WARNING go to the application log,
+    # ERROR/CRITICAL to the error log
     app_logger = logging.getLogger("EcommerceRunner")
     app_logger.setLevel(logging.INFO)
-    
-    # Application log handler (INFO and WARNING)
-    app_handler = logging.FileHandler(app_log_file)
-    app_handler.setLevel(logging.INFO)
-    app_handler.addFilter(AppFilter())
-    app_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    app_handler.setFormatter(app_formatter)
-    
-    # Error log handler (ERROR and CRITICAL only)
-    error_handler = logging.FileHandler(error_log_file)
-    error_handler.setLevel(logging.ERROR)
-    error_handler.addFilter(ErrorFilter())
-    error_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    error_handler.setFormatter(error_formatter)
-    
-    # Console handler (all levels)
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handlers to logger
-    app_logger.addHandler(app_handler)
-    app_logger.addHandler(error_handler)
-    app_logger.addHandler(console_handler)
-    
+    app_logger.propagate = False
+    for log_filter in list(app_logger.filters):
+        app_logger.removeFilter(log_filter)
+
+    access_logger = logging.getLogger('access')
+    access_logger.setLevel(logging.INFO)
+    access_logger.propagate = False  # Prevent propagation to parent logger
+    for log_filter in list(access_logger.filters):
+        access_logger.removeFilter(log_filter)
+
+    # Ensure log directory exists
+    for path in paths.values():
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    log_sink = LogSink(max_queue=max_queue, overflow=overflow, rotation=rotation)
+    log_sink.open_file('application', paths['application'], formatter)
+    log_sink.open_file('error', paths['error'], formatter)
+    log_sink.open_file('access', paths['access'])
+
+    # Console echo (all levels) is optional - it dominates high-volume runs
+    echo_stream = None
+    if console:
+        log_sink.open_console('console', logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+        echo_stream = 'console'
+
+    app_logger.addHandler(SinkHandler(log_sink, 'application', error_stream='error', echo_stream=echo_stream))
+    access_logger.addHandler(SinkHandler(log_sink, 'access'))
+    log_sink.start()
+
     return app_logger
 
-# Setup logging
-logger = setup_logging()
+def close_logging():
+    """Drain the log sink and close the runner's log files"""
+    global log_sink
+    for name in ("EcommerceRunner", 'access'):
+        target = logging.getLogger(name)
+        for handler in list(target.handlers):
+            target.removeHandler(handler)
+            handler.close()
+    if log_sink is not None:
+        log_sink.close()
+        log_sink = None
+
+# Handlers are attached by setup_logging() once the output paths are known
+logger = logging.getLogger("EcommerceRunner")
+access_logger = logging.getLogger('access')
+log_sink = None
+
+# Initial state of every service; each platform works on its own copy
+SERVICES = {service: {'port': port, 'status': 'running', 'cpu_usage': 0} for service, port in SERVICE_PORTS.items()}
 
 class EcommercePlatform:
-    def __init__(self):
-        self.services = {
-            'user-service': {'port': 8001, 'status': 'running', 'cpu_usage': 0},
-            'product-service': {'port': 8002, 'status': 'running', 'cpu_usage': 0},
-            'order-service': {'port': 8003, 'status': 'running', 'cpu_usage': 0},
-            'payment-service': {'port': 8004, 'status': 'running', 'cpu_usage': 0}
-        }
+    def __init__(self, clock=None, seed=None, telemetry=None, traffic=None, scenarios=None, metrics_store=None,
+                 alerts=None):
+        self.clock = clock or RealClock()
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(self.rng.getrandbits(64))
+        self.telemetry = telemetry
+        self.metrics_store = metrics_store
+        self.alerts = alerts
+        self._alert_state = set()
+        self.traffic = traffic
+        self.incident_count = 0
+        self.access_log_lines = 0
+        self.services = {service: dict(config) for service, config in SERVICES.items()}
         self.database_connection_pool = 20
         self.redis_connections = 100
-        self.incident_scenarios = [
-            'database_connection_leak',
-            'memory_leak',
-            'configuration_error',
-            'third_party_api_failure',
-            'high_cpu_usage',
-            'disk_space_issue',
-            'network_timeout',
-            'authentication_failure'
-        ]
+        self.scenarios = scenarios or ScenarioRegistry.from_yaml()
+        self.incident_scenarios = self.scenarios.names()
+        if traffic:
+            self.access_generator = AccessLogGenerator(
+                self.services, self.np_rng, endpoints=traffic.endpoint_table,
+                weights=traffic.rates, latency=traffic.latency
+            )
+        else:
+            self.access_generator = AccessLogGenerator(self.services, self.np_rng)
         
     def simulate_incident(self):
-        """Randomly trigger different types of incidents"""
-        scenario = random.choice(self.incident_scenarios)
-        logger.info(f"🚨 INCIDENT TRIGGERED: {scenario}")
-        
-        if scenario == 'database_connection_leak':
-            self._database_connection_leak()
-        elif scenario == 'memory_leak':
-            self._memory_leak()
-        elif scenario == 'configuration_error':
-            self._configuration_error()
-        elif scenario == 'third_party_api_failure':
-            self._third_party_api_failure()
-        elif scenario == 'high_cpu_usage':
-            self._high_cpu_usage()
-        elif scenario == 'disk_space_issue':
-            self._disk_space_issue()
-        elif scenario == 'network_timeout':
-            self._network_timeout()
-        elif scenario == 'authentication_failure':
-            self._authentication_failure()
-    
-    def _database_connection_leak(self):
-        logger.error("DATABASE CONNECTION POOL EXHAUSTED")
-        logger.error("Connection pool size exceeded: 50/20 connections active")
-        logger.error("service=order-service error=connection_timeout duration=30s")
-        logger.error("Multiple queries stuck in WAITING state")
-        logger.critical("Database performance degraded - query timeout increased to 45s")
-        self.services['order-service']['status'] = 'degraded'
-        
-    def _memory_leak(self):
-        logger.error("MEMORY USAGE CRITICAL")
-        logger.error("service=product-service memory_usage=95% heap_size=1.8GB/2GB")
-        logger.error("Garbage collection frequency increased significantly")
-        logger.error("OutOfMemoryError: Java heap space in product catalog service")
-        logger.critical("Service restart required - memory leak detected in image processing")
-        self.services['product-service']['status'] = 'critical'
-        
-    def _configuration_error(self):
-        logger.error("CONFIGURATION MISMATCH DETECTED")
-        logger.error("service=payment-service config=redis_timeout value=null expected=5000ms")
-        logger.error("Redis connection failed: NoneType object has no attribute 'decode'")
-        logger.error("Payment processing halted - cache unavailable")
-        logger.critical("Configuration rollback required for payment-service")
-        self.services['payment-service']['status'] = 'down'
-        
-    def _third_party_api_failure(self):
-        logger.error("EXTERNAL API FAILURE")
-        logger.error("api=stripe-payments status=503 error=service_unavailable")
-        logger.error("Payment gateway timeout after 30s - retrying with exponential backoff")
-        logger.error("Order completion rate dropped to 23%")
-        logger.critical("Fallback payment processor not configured")
-        
-    def _high_cpu_usage(self):
-        logger.error("HIGH CPU UTILIZATION ALERT")
-        logger.error("service=user-service cpu_usage=89% threads=156 load_avg=4.2")
-        logger.error("Authentication requests queuing - average response time 12s")
-        logger.error("Login success rate dropped to 67%")
-        logger.critical("Auto-scaling threshold reached - no available instances")
-        self.services['user-service']['cpu_usage'] = 89
-        
-    def _disk_space_issue(self):
-        logger.error("DISK SPACE CRITICAL")
-        logger.error("disk_usage=96% available=2.3GB path=/var/logs/")
-        logger.error("Log rotation failed - disk write errors detected")
-        logger.error("Application logging disabled to prevent system crash")
-        logger.critical("Manual intervention required - disk cleanup needed")
-        
-    def _network_timeout(self):
-        logger.error("NETWORK CONNECTIVITY ISSUES")
-        logger.error("service=order-service target=inventory-api timeout=30s retries=3")
-        logger.error("Inventory check failed - stock verification unavailable")
-        logger.error("Order processing delayed - customer notifications sent")
-        logger.critical("Network latency increased to 2.3s average")
-        
-    def _authentication_failure(self):
-        logger.error("AUTHENTICATION SERVICE FAILURE")
-        logger.error("service=user-service auth_provider=oauth2 error=invalid_token")
-        logger.error("JWT token validation failed - signature mismatch")
-        logger.error("User session termination rate: 94%")
-        logger.critical("Security breach potential - immediate investigation required")
-
-    def generate_access_logs(self):
-        """Generate realistic access log entries"""
-        # Create separate access logger
-        access_logger = logging.getLogger('access')
-        access_logger.setLevel(logging.INFO)
-        
-        # Remove any existing handlers to avoid duplicates
-        access_logger.handlers.clear()
-        
-        # Create access log handler
-        access_handler = logging.FileHandler(access_log_file)
-        access_handler.setFormatter(logging.Formatter('%(message)s'))
-        access_logger.addHandler(access_handler)
-        access_logger.propagate = False  # Prevent propagation to parent logger
-        
-        # Simulate HTTP requests to different services
-        endpoints = [
-            ('/users/123', 'GET', 8001),
-            ('/users/456', 'GET', 8001),
-            ('/products', 'GET', 8002),
-            ('/products/search', 'GET', 8002),
-            ('/orders', 'POST', 8003),
-            ('/orders/789', 'GET', 8003),
-            ('/payments', 'POST', 8004),
-            ('/health', 'GET', random.choice([8001, 8002, 8003, 8004]))
-        ]
-        
-        user_agents = [
-            'curl/7.68.0',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'PostmanRuntime/7.28.4',
-            'monitoring/1.0',
-            'python-requests/2.28.2'
-        ]
-        
-        for _ in range(random.randint(10, 25)):
-            endpoint, method, port = random.choice(endpoints)
-            user_agent = random.choice(user_agents)
-            
-            # Determine status code based on service health
-            service_name = f"{list(self.services.keys())[port-8001]}"
-            service_status = self.services[service_name]['status']
-            
-            if service_status == 'running':
-                status_code = random.choices([200, 201, 400, 404], weights=[85, 5, 7, 3])[0]
-            elif service_status == 'degraded':
-                status_code = random.choices([200, 500, 502, 503], weights=[60, 20, 10, 10])[0]
-            elif service_status == 'critical':
-                status_code = random.choices([500, 502, 503, 504], weights=[40, 20, 30, 10])[0]
-            else:  # down
-                status_code = random.choices([502, 503, 504], weights=[30, 50, 20])[0]
-            
-            response_size = random.randint(45, 2048)
-            timestamp = datetime.now().strftime('%d/%b/%Y:%H:%M:%S +0000')
-            
-            access_entry = f'127.0.0.1 - - [{timestamp}] "{method} {endpoint} HTTP/1.1" {status_code} {response_size} "-" "{user_agent}"'
-            access_logger.info(access_entry)
+        """Randomly trigger one of the registered incident scenarios"""
+        incident = self.scenarios.choose(self.rng).trigger(self.rng)
+        self.incident_count += 1
+        logger.info(f"🚨 INCIDENT TRIGGERED: {incident.name}")
+
+        for level, message in incident.lines:
+            logger.log(level, message)
+        if incident.transition:
+            self.services[incident.service].update(incident.transition)
+        self.observe_alerts()
+        return incident
+
+    def generate_access_logs(self, count=None, window=0):
+        """Generate realistic access log entries
+
+        `count` requests (default 10-25) are spread over the `window` seconds
+        leading up to the current clock time. With a traffic model and no
+        explicit count, volume over the window follows the model instead.
+        """
+        end = self.clock.time()
+        statuses = {service: config['status'] for service, config in self.services.items()}
+
+        if self.traffic and count is None and window > 0:
+            plan = self.traffic.plan(end - window, end, statuses, self.np_rng)
+            count = plan.total
+            chunks = self.access_generator.generate_plan(
+                plan, statuses, self.traffic.latency_multipliers(statuses)
+            )
+        else:
+            if count is None:
+                count = self.rng.randint(10, 25)
+            chunks = self.access_generator.generate(count, end - window, end, statuses)
+
+        for lines, events in chunks:
+            # Per-line times let a rotating access log split the chunk at interval boundaries
+            access_logger.info(lines, extra={'line_times': events['timestamp'] / 1000})
+            if self.telemetry:
+                self.telemetry.write('access', events)
+        self.access_log_lines += count
 
     def generate_metrics(self):
         """Generate realistic metrics for monitoring"""
         metrics = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self.clock.now().isoformat(),
             'services': {},
             'system': {
-                'cpu_usage': random.randint(15, 95),
-                'memory_usage': random.randint(30, 88),
-                'disk_usage': random.randint(45, 97),
-                'network_latency': random.uniform(0.1, 3.2)
+                'cpu_usage': self.rng.randint(15, 95),
+                'memory_usage': self.rng.randint(30, 88),
+                'disk_usage': self.rng.randint(45, 97),
+                'network_latency': self.rng.uniform(0.1, 3.2)
             }
         }
         
         for service, config in self.services.items():
             metrics['services'][service] = {
                 'status': config['status'],
-                'response_time': random.uniform(0.1, 5.0),
-                'error_rate': random.uniform(0, 15.5) if config['status'] != 'running' else random.uniform(0, 2.1),
-                'throughput': random.randint(50, 1200),
-                'cpu_usage': config.get('cpu_usage', random.randint(10, 45))
+                'response_time': self.rng.uniform(0.1, 5.0),
+                'error_rate': self.rng.uniform(0, 15.5) if config['status'] != 'running' else self.rng.uniform(0, 2.1),
+                'throughput': self.rng.randint(50, 1200),
+                'cpu_usage': config.get('cpu_usage', self.rng.randint(10, 45))
             }
+
+        # With a traffic model, report what the last access-log window actually saw
+        observed = self.access_generator.service_stats() if self.traffic else None
+        if observed:
+            for service, stats in observed.items():
+                metrics['services'][service].update(stats)
         
         logger.info(f"METRICS: {json.dumps(metrics, indent=2)}")
+        if self.telemetry:
+            self.telemetry.record_metrics(metrics, self.clock.time())
+        if self.metrics_store:
+            self.metrics_store.record(metrics, self.clock.time())
+        self.observe_alerts(metrics)
         return metrics
 
+    def observe_alerts(self, metrics=None):
+        """Feed the alert evaluator the services' current state, plus a snapshot's values if given
+
+        State series (up, cpu_usage, db_connections_*, and numeric fields a
+        scenario transition set) change the moment an incident starts or
+        resolves; the rest only change with each METRICS snapshot.
+        """
+        if not self.alerts:
+            return
+        samples = {}
+        if metrics:
+            groups = dict(metrics['services'], system=metrics['system'])
+            for instance, values in groups.items():
+                labels = (('instance', instance),)
+                for metric, value in values.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        samples[(metric, labels)] = value
+        state = {}
+        for service, config in self.services.items():
+            labels = (('instance', service),)
+            state[('up', labels)] = 0 if config['status'] == 'down' else 1
+            state[('db_connections_max', labels)] = self.database_connection_pool
+            for field, value in config.items():
+                if field != 'port' and isinstance(value, (int, float)) and not isinstance(value, bool):
+                    state[(field, labels)] = value
+        samples.update(dict.fromkeys(self._alert_state - state.keys()))
+        samples.update(state)
+        self._alert_state = set(state)
+        self.alerts.observe(samples, self.clock.time())
+
+    def advance(self, seconds):
+        """Sleep `seconds`, waking whenever a pending alert's `for:` window runs out so it fires on time"""
+        end = self.clock.time() + seconds
+        while self.alerts:
+            due = self.alerts.next_due()
+            if due is None or due >= end:
+                break
+            self.clock.sleep(max(0.0, due - self.clock.time()))
+            self.alerts.tick(self.clock.time())
+        self.clock.sleep(max(0.0, end - self.clock.time()))
+        if self.alerts:
+            self.alerts.tick(self.clock.time())
+
     def health_check(self):
         """Perform health checks on all services"""
         logger.info("=== HEALTH CHECK STARTED ===")
@@ -299,67 +298,400 @@ class EcommercePlatform:
     def _simulate_request(self, request_id):
         """Simulate individual service requests"""
         # Random delay to simulate processing
-        time.sleep(random.uniform(0.1, 1.5))
+        self.clock.sleep(self.rng.uniform(0.1, 1.5))
         
         # Random chance of failure during load test
-        if random.random() < 0.3:
-            service = random.choice(list(self.services.keys()))
+        if self.rng.random() < 0.3:
+            service = self.rng.choice(list(self.services.keys()))
             logger.error(f"Request {request_id} failed on {service}: Connection timeout")
             raise Exception(f"Service {service} unavailable")
         
         logger.info(f"Request {request_id} completed successfully")
 
-def main():
+    def resolve_incidents(self):
+        """Bring every impacted service back to a healthy state"""
+        for service, config in self.services.items():
+            if config['status'] != 'running' or config['cpu_usage']:
+                logger.info(f"🩹 {service} recovered - status {config['status']} -> running")
+                config['status'] = 'running'
+                config['cpu_usage'] = 0
+            # Drop any other fields the incident's transition set
+            for field in set(config) - {'port', 'status', 'cpu_usage'}:
+                del config[field]
+        self.observe_alerts()
+
+def run_fast_forward(platform, hours=None, incidents=None, mean_incident_gap=600, access_rate=None):
+    """Drive the platform on a simulated clock until the hour or incident budget is spent
+
+    Every simulated interval gets background traffic from the platform's
+    traffic model, or a flat `access_rate` (requests per simulated hour);
+    with neither, each step writes the usual handful of access log lines.
+    """
+    clock = platform.clock
+
+    def traffic(window):
+        if window <= 0:
+            return  # a step clamped away at the hour budget
+        if platform.traffic:
+            platform.generate_access_logs(window=window)
+        elif access_rate:
+            platform.generate_access_logs(int(platform.np_rng.poisson(access_rate * window / 3600)), window)
+        else:
+            platform.generate_access_logs()
+
+    def advance(seconds):
+        """Advance the clock, never past the hour budget; returns the seconds actually advanced"""
+        if limit is not None:
+            seconds = max(0.0, min(seconds, limit - clock.elapsed()))
+        platform.advance(seconds)
+        return seconds
+    limit = hours * 3600 if hours is not None else None
+    logger.info(f"⏩ Fast-forward run: hours={hours} incidents={incidents}")
+
+    platform.health_check()
+    platform.generate_metrics()
+    platform.generate_access_logs()
+
+    while True:
+        if limit is not None and clock.elapsed() >= limit:
+            break
+        if incidents is not None and platform.incident_count >= incidents:
+            break
+
+        # Quiet period of normal traffic before the next incident
+        gap = advance(platform.rng.expovariate(1 / mean_incident_gap))
+        traffic(gap)
+        if limit is not None and clock.elapsed() >= limit:
+            break
+
+        incident = platform.simulate_incident()
+        delay = advance(platform.rng.uniform(1, 3))
+        platform.generate_metrics()
+        traffic(delay)
+
+        # Incident window, then recovery (cut short at the hour budget)
+        window = advance(incident.duration)
+        traffic(window)
+        platform.health_check()
+        platform.resolve_incidents()
+
+    platform.health_check()
+    return platform.generate_metrics()
+
+def report_throughput(platform, clock_filter, wall_seconds):
+    """Log incidents/sec and log lines/sec achieved by the run"""
+    log_lines = clock_filter.records + platform.access_log_lines
+    wall_seconds = max(wall_seconds, 1e-9)
+    logger.info(
+        f"⚡ THROUGHPUT: {platform.incident_count} incidents, {log_lines} log lines "
+        f"in {wall_seconds:.2f}s wall / {platform.clock.elapsed() / 3600:.2f}h simulated - "
+        f"{platform.incident_count / wall_seconds:.1f} incidents/sec, "
+        f"{log_lines / wall_seconds:.1f} log lines/sec"
+        + (f" ({log_sink.dropped} dropped by the log sink)" if log_sink and log_sink.dropped else "")
+        + (f" ({log_sink.write_errors} lost to write errors)" if log_sink and log_sink.write_errors else "")
+    )
+
+def report_metrics_history(store, final_metrics):
+    """Log each service's run-long averages and peaks next to its final snapshot"""
+    summary = store.summary()
+    for service, final in final_metrics['services'].items():
+        history = summary.get(service, {})
+        parts = [f"{metric} avg={stats['mean']:.2f} max={stats['max']:.2f} final={final[metric]:.2f}"
+                 for metric, stats in history.items() if stats['count'] and metric in final]
+        logger.info(f"📈 HISTORY {service} ({final['status']}): " + ", ".join(parts))
+    logger.info(f"📈 Metric history ({len(store.series())} series) kept in {store.directory}")
+
+def report_alerts(alerts):
+    """Log how many alerts fired and resolved, and which are still firing"""
+    stats = alerts.stats()
+    still = ", ".join(f"{alert['rule'].name}({dict(alert['labels']).get('instance')})" for alert in alerts.firing())
+    logger.info(f"🔔 ALERTS: {stats['fired']} fired, {stats['resolved']} resolved over {stats['series']} series "
+                f"({stats['evaluations']} rule evaluations); firing now: {still or 'none'}")
+
+def report_performance(profiler, output_dir, run_id):
+    """Write the performance report next to the logs and log its headline numbers"""
+    paths, report = profiler.write(output_dir, run_id)
+    for name, phase in report['phases'].items():
+        logger.info(f"⏱️  PHASE {name}: {phase['calls']} calls, wall {phase['wall_s']:.3f}s "
+                    f"({phase['share']:.1%}), cpu {phase['cpu_s']:.3f}s, max {phase['max_ms']:.1f}ms")
+    resources = report['resources']
+    if resources:
+        logger.info(f"⏱️  RESOURCES: rss peak {resources['rss_mb_peak']}MB, cpu mean {resources['cpu_percent_mean']}%, "
+                    f"threads peak {resources['threads_peak']}, read {resources['read_mb']}MB, "
+                    f"write {resources['write_mb']}MB")
+    logger.info(f"⏱️  Run wall {report['wall_s']:.3f}s, cpu {report['cpu_s']:.3f}s, "
+                f"timing overhead ~{report['timing_overhead_pct']:.3f}%; report in {paths['report']}"
+                + (f", profile in {paths['profile']}" if 'profile' in paths else ""))
+
+def report_log_rotation(sink):
+    """Rotation, compression and retention totals for this run's log files and those adopted from earlier runs"""
+    sink.flush()
+    segments = sum(stream.target.rotations for stream in sink.streams.values() if stream.rotating)
+    summary = f"🗂️  LOG ROTATION: {segments} segments closed"
+    if sink.archiver:
+        sink.archiver.wait()
+        stats = sink.archiver.stats()
+        if stats['adopted']:
+            summary += f", {stats['adopted']} adopted from earlier runs"
+        if stats['archived']:
+            summary += (f", {stats['archived']} compressed {stats['bytes_in'] / 2**20:.1f}MB -> "
+                        f"{stats['bytes_out'] / 2**20:.1f}MB ({stats['bytes_in'] / max(stats['bytes_out'], 1):.1f}x)")
+        if stats['deleted']:
+            summary += f", {stats['deleted']} deleted by retention ({stats['deleted_bytes'] / 2**20:.1f}MB)"
+        summary += f", {stats['retained']} kept ({stats['retained_bytes'] / 2**20:.1f}MB)"
+        if stats['errors']:
+            summary += f", {stats['errors']} failed"
+    logger.info(summary)
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def run_shard(shard_id, seed, output_dir, hours=None, incidents=None, start_time=None,
+              telemetry_formats=(), access_rate=None, traffic_config=None, scenario_files=()):
+    """Run one independent fast-forward simulation into its own log files"""
+    run_id = f"shard_{shard_id:04d}"
+    paths = log_paths(output_dir, run_id)
+    setup_logging(paths, console=False)
+    telemetry = None
+    try:
+        telemetry = TelemetryOutput(telemetry_formats, output_dir, run_id) if telemetry_formats else None
+        clock = SimulatedClock(start_time or DEFAULT_SHARD_START)
+        clock_filter = ClockFilter(clock)
+        logger.addFilter(clock_filter)
+        platform = EcommercePlatform(clock, seed=seed, telemetry=telemetry,
+                                     traffic=load_traffic(traffic_config),
+                                     scenarios=ScenarioRegistry.from_yaml(*scenario_files))
+
+        wall_start = time.perf_counter()
+        run_fast_forward(platform, hours=hours, incidents=incidents, access_rate=access_rate)
+    finally:
+        close_logging()
+        if telemetry:
+            telemetry.close()
+            paths.update(telemetry.paths)
+    wall_seconds = time.perf_counter() - wall_start
+
+    return {
+        'shard_id': shard_id,
+        'seed': seed,
+        'incidents': platform.incident_count,
+        'log_records': clock_filter.records + platform.access_log_lines,
+        'simulated_hours': round(clock.elapsed() / 3600, 4),
+        'wall_seconds': round(wall_seconds, 3),
+        'files': {
+            kind: {
+                'path': os.path.relpath(path, output_dir),
+                'bytes': os.path.getsize(path),
+                'sha256': _sha256(path),
+            }
+            for kind, path in paths.items()
+        },
+    }
+
+def run_sharded(shards, seed, output_dir, workers=None, hours=None, incidents=None, start_time=None,
+                telemetry_formats=(), access_rate=None, traffic_config=None, scenario_files=()):
+    """Fan K independent simulations out over a process pool and write manifest.json"""
+    os.makedirs(output_dir, exist_ok=True)
+    start_time = start_time or DEFAULT_SHARD_START
+    wall_start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(run_shard, shard_id, seed + shard_id, output_dir,
+                            hours, incidents, start_time, telemetry_formats, access_rate, traffic_config,
+                            scenario_files)
+            for shard_id in range(shards)
+        ]
+        results = [future.result() for future in futures]
+
+    wall_seconds = time.perf_counter() - wall_start
+    manifest = {
+        'seed': seed,
+        'shards': results,
+        'hours': hours,
+        'incidents_per_shard': incidents,
+        'access_rate': access_rate,
+        'traffic_config': traffic_config,
+        'scenario_files': ["scenarios.yaml", *scenario_files],
+        'start_time': start_time.isoformat(),
+        'workers': workers or os.cpu_count(),
+        'wall_seconds': round(wall_seconds, 3),
+    }
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    return manifest_path, manifest
+
+def load_traffic(path):
+    """Build the traffic model from a YAML file (None keeps the flat default traffic)"""
+    if not path:
+        return None
+    return TrafficModel.from_config(path, SERVICES)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="E-commerce platform incident simulation")
+    parser.add_argument("--fast-forward", action="store_true",
+                        help="run on a simulated clock instead of sleeping")
+    parser.add_argument("--hours", type=float, help="simulated hours to generate (fast-forward)")
+    parser.add_argument("--incidents", type=int, help="number of incidents to generate (fast-forward)")
+    parser.add_argument("--start-time", type=datetime.fromisoformat,
+                        help="ISO timestamp the simulated clock starts at")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible runs")
+    volume = parser.add_mutually_exclusive_group()
+    volume.add_argument("--access-rate", type=float,
+                        help="flat background requests per simulated hour (fast-forward)")
+    volume.add_argument("--traffic", nargs='?', const="traffic.yaml",
+                        help="shape access traffic with a traffic model (default: config/traffic.yaml)")
+    parser.add_argument("--shards", type=int,
+                        help="run K independent fast-forward simulations in a process pool")
+    parser.add_argument("--workers", type=int, help="process pool size for --shards (default: CPU count)")
+    parser.add_argument("--output-dir", default="logs", help="directory for log files and manifest")
+    parser.add_argument("--scenarios", action="append", default=[],
+                        help="extra incident scenario YAML on top of config/scenarios.yaml (repeatable; same name replaces)")
+    parser.add_argument("--telemetry", action="append", choices=TELEMETRY_FORMATS, default=[],
+                        help="also write typed metrics/access telemetry (repeatable: jsonl, parquet, arrow, npy)")
+    parser.add_argument("--metrics-store", action="store_true",
+                        help="keep metric history (raw, 1m, 1h rollups) memory-mapped under the output dir")
+    parser.add_argument("--alerts", nargs='?', const=DEFAULT_ALERT_RULES,
+                        help="evaluate alert rules against the metric stream (default: monitoring/alerts.yml)")
+    profiling = parser.add_argument_group("profiling")
+    profiling.add_argument("--profile", action="store_true",
+                           help="time each phase (wall + CPU) and write performance_<run>.json to the output dir")
+    profiling.add_argument("--profile-resources", type=float, nargs='?', const=0.5, metavar="SECONDS",
+                           help="also sample process RSS/CPU/IO with psutil every SECONDS (default 0.5)")
+    profiling.add_argument("--profile-phase", choices=PHASES, help="attach a profiler to this phase")
+    profiling.add_argument("--profiler", choices=PROFILERS, default='cprofile',
+                           help="cprofile (deterministic, .prof) or sampling (stack samples, .folded)")
+    rotation = parser.add_argument_group("log rotation")
+    rotation.add_argument("--log-rotate-size", type=parse_size, metavar="SIZE",
+                          help="start a new log segment once the active one reaches SIZE (e.g. 100MB)")
+    rotation.add_argument("--log-rotate-interval", type=parse_duration, metavar="DURATION",
+                          help="start a new log segment every DURATION of log time (e.g. 1h, simulated in fast-forward)")
+    rotation.add_argument("--log-compress", choices=COMPRESSIONS,
+                          help="compress closed segments in the background")
+    rotation.add_argument("--log-retention-age", type=parse_duration, metavar="DURATION",
+                          help="delete closed segments older than DURATION (log time)")
+    rotation.add_argument("--log-retention-bytes", type=parse_size, metavar="SIZE",
+                          help="delete the oldest closed segments while they take more than SIZE")
+    parser.add_argument("--quiet", action="store_true", help="don't echo runner logs to the console")
+    parser.add_argument("--log-queue-size", type=int, default=100000,
+                        help="bound of the log sink queue")
+    parser.add_argument("--log-overflow", choices=OVERFLOW_POLICIES, default='block',
+                        help="what producers do when the log sink queue is full")
+    args = parser.parse_args(argv)
+    if args.shards:
+        args.fast_forward = True
+        # Shards write a fixed set of files per run (hashed into the manifest) and report nothing
+        # beyond throughput, so these per-run features are not available there
+        unsupported = [flag for flag, value in (
+            ("--metrics-store", args.metrics_store), ("--alerts", args.alerts),
+            ("--profile", args.profile), ("--profile-resources", args.profile_resources is not None),
+            ("--profile-phase", args.profile_phase), ("--log-rotate-size", args.log_rotate_size),
+            ("--log-rotate-interval", args.log_rotate_interval), ("--log-compress", args.log_compress),
+            ("--log-retention-age", args.log_retention_age), ("--log-retention-bytes", args.log_retention_bytes),
+        ) if value]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be combined with --shards")
+    if args.profile_resources is not None or args.profile_phase:
+        args.profile = True
+    if args.fast_forward and args.hours is None and args.incidents is None:
+        parser.error("--fast-forward needs --hours and/or --incidents")
+    if args.hours is not None and args.hours <= 0:
+        parser.error("--hours must be positive")
+    if args.incidents is not None and args.incidents <= 0:
+        parser.error("--incidents must be positive")
+    args.rotation = None
+    if args.log_rotate_size or args.log_rotate_interval:
+        try:
+            args.rotation = RotationPolicy(args.log_rotate_size, args.log_rotate_interval, args.log_compress,
+                                           args.log_retention_age, args.log_retention_bytes)
+        except RuntimeError as e:
+            parser.error(str(e))
+    elif args.log_compress or args.log_retention_age or args.log_retention_bytes:
+        parser.error("--log-compress and --log-retention-* need --log-rotate-size and/or --log-rotate-interval")
+    return args
+
+def main(argv=None):
     """Main execution function that generates various scenarios for postmortem analysis"""
+    args = parse_args(argv)
+
     print("🚀 Starting E-commerce Platform Simulation")
     print("=" * 60)
-    
-    platform = EcommercePlatform()
-    
+
+    if args.shards:
+        seed = args.seed if args.seed is not None else 0
+        manifest_path, manifest = run_sharded(
+            args.shards, seed, args.output_dir, workers=args.workers,
+            hours=args.hours, incidents=args.incidents, start_time=args.start_time,
+            telemetry_formats=args.telemetry, access_rate=args.access_rate,
+            traffic_config=args.traffic, scenario_files=args.scenarios
+        )
+        incidents = sum(shard['incidents'] for shard in manifest['shards'])
+        records = sum(shard['log_records'] for shard in manifest['shards'])
+        wall_seconds = max(manifest['wall_seconds'], 1e-9)
+        print(f"⚡ {args.shards} shards: {incidents} incidents, {records} log lines in {wall_seconds:.2f}s - "
+              f"{incidents / wall_seconds:.1f} incidents/sec, {records / wall_seconds:.1f} log lines/sec")
+        print(f"🗂  Manifest written to {manifest_path}")
+        return
+
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    paths = log_paths(args.output_dir, run_id)
+    setup_logging(paths, console=not args.quiet, max_queue=args.log_queue_size, overflow=args.log_overflow,
+                  rotation=args.rotation)
+    telemetry = metrics_store = profiler = None
     try:
-        # Initial health check
-        platform.health_check()
-        time.sleep(2)
-        
-        # Generate baseline metrics
-        logger.info("📊 Generating baseline metrics...")
-        platform.generate_metrics()
-        
-        # Generate initial access logs
-        logger.info("🌐 Generating access logs...")
-        platform.generate_access_logs()
-        time.sleep(2)
-        
-        # Simulate normal operations for a few seconds
-        logger.info("✅ Platform running normally...")
-        time.sleep(3)
-        
-        # Start load testing
-        platform.run_load_test()
-        time.sleep(2)
-        
-        # Trigger multiple incidents (this is what creates issues for analysis)
-        logger.info("🎯 Simulating incident scenarios...")
-        for i in range(random.randint(2, 4)):
-            platform.simulate_incident()
-            time.sleep(random.uniform(1, 3))
-            platform.generate_metrics()
-            # Generate access logs after each incident
-            platform.generate_access_logs()
-        
-        # Final health check after incidents
-        time.sleep(2)
-        platform.health_check()
-        
-        # Generate final metrics
-        final_metrics = platform.generate_metrics()
-        
+        telemetry = TelemetryOutput(args.telemetry, args.output_dir, run_id) if args.telemetry else None
+        if args.metrics_store:
+            metrics_store = MetricsStore(os.path.join(args.output_dir, f"metrics_{run_id}"))
+        alerts = AlertEvaluator.from_yaml(args.alerts, log=logger) if args.alerts else None
+
+        if args.fast_forward:
+            clock = SimulatedClock(args.start_time)
+        else:
+            clock = RealClock()
+        clock_filter = ClockFilter(clock)
+        logger.addFilter(clock_filter)
+        if args.rotation:
+            # Access chunks carry the clock's time too, so they rotate on the same boundaries
+            access_logger.addFilter(ClockFilter(clock))
+        platform = EcommercePlatform(clock, seed=args.seed, telemetry=telemetry,
+                                     traffic=load_traffic(args.traffic),
+                                     scenarios=ScenarioRegistry.from_yaml(*args.scenarios),
+                                     metrics_store=metrics_store, alerts=alerts)
+        if args.profile:
+            profiler = PhaseProfiler(args.profile_resources, args.profile_phase, args.profiler)
+            profiler.instrument(platform, PHASES)
+            profiler.start()
+        wall_start = time.perf_counter()
+
+        if args.fast_forward:
+            final_metrics = run_fast_forward(platform, hours=args.hours, incidents=args.incidents,
+                                             access_rate=args.access_rate)
+            report_throughput(platform, clock_filter, time.perf_counter() - wall_start)
+        else:
+            final_metrics = run_interactive(platform)
+        if metrics_store:
+            report_metrics_history(metrics_store, final_metrics)
+        if alerts:
+            report_alerts(alerts)
+        if profiler:
+            profiler.stop()
+            report_performance(profiler, args.output_dir, run_id)
+        if args.rotation:
+            report_log_rotation(log_sink)
+        log_sink.flush()
+
         print("\n" + "=" * 60)
         print("🏁 Simulation completed!")
-        print("📝 Check logs/ directory for detailed incident logs")
+        print(f"📝 Check {args.output_dir}/ directory for detailed incident logs")
         print("🔍 Run your postmortem automation platform on these logs")
         print("=" * 60)
-        
+
     except KeyboardInterrupt:
         logger.info("🛑 Platform simulation interrupted by user")
         print("\nSimulation stopped by user")
@@ -367,6 +699,55 @@ def main():
         logger.critical(f"💥 FATAL ERROR: {str(e)}")
         print(f"\nFatal error occurred: {e}")
         sys.exit(1)
+    finally:
+        if profiler:
+            profiler.stop()
+        close_logging()
+        if telemetry:
+            telemetry.close()
+        if metrics_store:
+            metrics_store.close()
+
+def run_interactive(platform):
+    """The original paced scenario: a handful of incidents with pauses in between"""
+    clock = platform.clock
+
+    # Initial health check
+    platform.health_check()
+    clock.sleep(2)
+
+    # Generate baseline metrics
+    logger.info("📊 Generating baseline metrics...")
+    platform.generate_metrics()
+
+    # Generate initial access logs
+    logger.info("🌐 Generating access logs...")
+    platform.generate_access_logs()
+    clock.sleep(2)
+
+    # Simulate normal operations for a few seconds
+    logger.info("✅ Platform running normally...")
+    clock.sleep(3)
+
+    # Start load testing
+    platform.run_load_test()
+    clock.sleep(2)
+
+    # Trigger multiple incidents (this is what creates issues for analysis)
+    logger.info("🎯 Simulating incident scenarios...")
+    for i in range(platform.rng.randint(2, 4)):
+        platform.simulate_incident()
+        clock.sleep(platform.rng.uniform(1, 3))
+        platform.generate_metrics()
+        # Generate access logs after each incident
+        platform.generate_access_logs()
+
+    # Final health check after incidents
+    clock.sleep(2)
+    platform.health_check()
+
+    # Generate final metrics
+    return platform.generate_metrics()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
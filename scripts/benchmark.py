@@ -0,0 +1,275 @@
+# scripts/benchmark.py
+#!/usr/bin/env python3
+"""
+Benchmark the simulator and the services, and compare runs for regressions.
+
+    python scripts/benchmark.py run                               # all suites -> benchmarks/results/
+    python scripts/benchmark.py run --suite micro --suite flask -k access --repeat 7
+    python scripts/benchmark.py run --output baseline.json
+    python scripts/benchmark.py compare baseline.json             # vs the newest result
+    python scripts/benchmark.py compare baseline.json after.json --threshold 0.05
+    python scripts/benchmark.py list
+
+Suites:
+  micro  EcommercePlatform methods and the logging setup
+  flask  every service endpoint through its Flask test client
+  macro  end-to-end fast-forward and interactive runs on a simulated clock
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime
+from itertools import count
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import run_ecommerce_platform as runner  # noqa: E402
+from simulator import bench  # noqa: E402
+from simulator.clock import SimulatedClock  # noqa: E402
+from simulator.services import SERVICE_PORTS, load_service_app  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SUITES = ('micro', 'flask', 'macro')
+
+# Deterministic backends for the services unless the caller chose others:
+# no Redis server needed, no injected payment gateway failures
+SERVICE_ENV = {'REDIS_URL': 'memory://', 'PAYMENT_GATEWAY_URL': 'stub://'}
+
+_ids = count(1)
+
+# (service, method, path, JSON body or factory taking a unique number)
+ENDPOINTS = (
+    ('user-service', 'GET', '/health', None),
+    ('user-service', 'GET', '/users/123', None),
+    ('user-service', 'GET', '/users?ids=' + ','.join(str(i) for i in range(1, 51)), None),
+    ('user-service', 'GET', '/metrics', None),
+    ('product-service', 'GET', '/health', None),
+    ('product-service', 'GET', '/products?page=3&per_page=20', None),
+    ('product-service', 'GET', '/products/42', None),
+    ('product-service', 'GET', '/products/search?q=smart&limit=10&facets=1', None),
+    ('product-service', 'POST', '/products/search/index',
+     lambda n: {'id': 10_000_000 + n % 1000, 'name': f'bench widget {n % 97}', 'category': 'tools',
+                'price': 9.99}),
+    ('product-service', 'GET', '/metrics', None),
+    ('order-service', 'GET', '/health', None),
+    ('order-service', 'POST', '/orders',
+     lambda n: {'id': n, 'user_id': n % 10000, 'items': [{'sku': f'SKU-{n % 500}', 'qty': 1}]}),
+    ('order-service', 'GET', '/metrics', None),
+    ('payment-service', 'GET', '/health', None),
+    ('payment-service', 'POST', '/payments',
+     lambda n: {'id': n, 'order_id': n, 'amount': 42.5, 'currency': 'USD'}),
+    ('payment-service', 'POST', '/payments/batch',
+     lambda n: {'payments': [{'id': f'{n}-{i}', 'order_id': n, 'amount': 10.0, 'currency': 'USD'}
+                             for i in range(50)]}),
+    ('payment-service', 'GET', '/metrics', None),
+)
+
+
+class _LoggingScope:
+    """Runner logging into a scratch directory, (re)opened before each round"""
+
+    def __init__(self, directory, run_id):
+        self.paths = runner.log_paths(directory, run_id)
+
+    def __call__(self):
+        if runner.log_sink is None:
+            runner.setup_logging(self.paths, console=False)
+
+
+def micro_benchmarks(log_dir, seed):
+    ensure_logging = _LoggingScope(log_dir, 'micro')
+    platform = runner.EcommercePlatform(SimulatedClock(runner.DEFAULT_SHARD_START), seed=seed)
+    shaped = runner.EcommercePlatform(SimulatedClock(runner.DEFAULT_SHARD_START), seed=seed,
+                                      traffic=runner.load_traffic('traffic.yaml'))
+    states = {id(p): (p.rng.getstate(), p.np_rng.bit_generator.state) for p in (platform, shaped)}
+
+    def reset(*platforms):
+        def before():
+            ensure_logging()
+            for p in platforms:
+                p.rng.setstate(states[id(p)][0])
+                p.np_rng.bit_generator.state = states[id(p)][1]
+        return before
+
+    def incident():
+        platform.simulate_incident()
+        platform.resolve_incidents()
+
+    def logging_cycle():
+        runner.setup_logging(runner.log_paths(log_dir, 'setup'), console=False)
+        runner.close_logging()
+
+    return [
+        bench.Benchmark('micro/setup_logging', logging_cycle, unit='setups'),
+        bench.Benchmark('micro/log_record', lambda: runner.logger.info("benchmark record"), unit='records',
+                        before=ensure_logging),
+        bench.Benchmark('micro/generate_access_logs_20', lambda: platform.generate_access_logs(20), ops=20,
+                        unit='lines', before=reset(platform)),
+        bench.Benchmark('micro/generate_access_logs_10k', lambda: platform.generate_access_logs(10000, 600),
+                        ops=10000, unit='lines', before=reset(platform)),
+        bench.Benchmark('micro/generate_access_logs_traffic_1m', lambda: shaped.generate_access_logs(window=60),
+                        unit='minutes', before=reset(shaped)),
+        bench.Benchmark('micro/generate_metrics', platform.generate_metrics, unit='snapshots',
+                        before=reset(platform)),
+        bench.Benchmark('micro/simulate_incident', incident, unit='incidents', before=reset(platform)),
+        bench.Benchmark('micro/health_check', platform.health_check, unit='checks', before=ensure_logging),
+    ]
+
+
+def flask_benchmarks(seed):
+    for name, value in SERVICE_ENV.items():
+        os.environ.setdefault(name, value)
+    apps = {}
+    for service in SERVICE_PORTS:
+        apps[service] = load_service_app(service)
+        # Keep handler log calls (they are part of the cost) but off the console
+        service_logger = logging.getLogger(service.replace('-', '_') + '_app')
+        service_logger.propagate = False
+        service_logger.handlers = [logging.NullHandler()]
+
+    covered = {service: set() for service in apps}
+    benchmarks = []
+    for service, method, path, body in ENDPOINTS:
+        app = apps[service]
+        covered[service].add(app.url_map.bind('localhost').match(path.partition('?')[0], method)[0])
+        client = app.test_client()
+
+        def op(client=client, method=method, path=path, body=body):
+            response = client.open(path, method=method, json=body(next(_ids)) if callable(body) else body)
+            response.get_data()
+
+        # Handlers draw from the global `random` (simulated delays and failures)
+        benchmarks.append(bench.Benchmark(f"flask/{service} {method} {path.partition('?')[0]}", op,
+                                          unit='requests', before=lambda: random.seed(seed)))
+
+    for service, app in apps.items():
+        missing = {rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint != 'static'} - covered[service]
+        for endpoint in sorted(missing):
+            logger.warning(f"⚠️  {service} endpoint {endpoint!r} has no benchmark in ENDPOINTS")
+    return benchmarks
+
+
+def macro_benchmarks(log_dir, seed, incidents):
+    ensure_logging = _LoggingScope(log_dir, 'macro')
+
+    def platform(**options):
+        return runner.EcommercePlatform(SimulatedClock(runner.DEFAULT_SHARD_START), seed=seed, **options)
+
+    traffic = runner.load_traffic('traffic.yaml')
+    return [
+        bench.Benchmark(f'macro/fast_forward_{incidents}_incidents',
+                        lambda: runner.run_fast_forward(platform(), incidents=incidents),
+                        ops=incidents, unit='incidents', before=ensure_logging, number=1),
+        bench.Benchmark('macro/fast_forward_traffic_1h',
+                        lambda: runner.run_fast_forward(platform(traffic=traffic), hours=1),
+                        unit='runs', before=ensure_logging, number=1),
+        bench.Benchmark('macro/interactive', lambda: runner.run_interactive(platform()),
+                        unit='runs', before=ensure_logging, number=1),
+    ]
+
+
+def build(suites, log_dir, seed, incidents):
+    benchmarks = []
+    if 'micro' in suites:
+        benchmarks += micro_benchmarks(os.path.join(log_dir, 'micro'), seed)
+    if 'flask' in suites:
+        benchmarks += flask_benchmarks(seed)
+    if 'macro' in suites:
+        benchmarks += macro_benchmarks(os.path.join(log_dir, 'macro'), seed, incidents)
+    return benchmarks
+
+
+def newest_result():
+    paths = sorted(glob.glob(os.path.join(RESULTS_DIR, "bench_*.json")))
+    return paths[-1] if paths else None
+
+
+def run(args):
+    with tempfile.TemporaryDirectory(prefix="bench_logs_") as log_dir:
+        try:
+            benchmarks = [b for b in build(args.suite or SUITES, log_dir, args.seed, args.incidents)
+                          if not args.k or any(k in b.name for k in args.k)]
+            if not benchmarks:
+                logger.error("No benchmarks selected")
+                return False
+            result = bench.run_benchmarks(benchmarks, args.repeat, args.min_time)
+        finally:
+            runner.close_logging()
+    result['settings'].update(seed=args.seed, incidents=args.incidents)
+    path = args.output or os.path.join(RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    bench.save(result, path)
+    logger.info(f"💾 {len(result['benchmarks'])} results in {result['duration_s']}s written to {path}")
+    if args.json:
+        print(json.dumps(result, indent=2))
+    return True
+
+
+def compare(args):
+    current = args.current or newest_result()
+    if current is None:
+        logger.error(f"No results in {RESULTS_DIR}; pass the file to compare against the baseline")
+        return False
+    rows, differences = bench.compare(bench.load(args.baseline), bench.load(current), args.threshold)
+    for key, (before, after) in differences.items():
+        logger.warning(f"⚠️  machine differs: {key} {before} -> {after} (timings may not be comparable)")
+    regressions = [row for row in rows if row['verdict'] == 'regression']
+    if args.json:
+        print(json.dumps({'baseline': args.baseline, 'current': current, 'threshold': args.threshold,
+                          'machine_differences': differences, 'benchmarks': rows}, indent=2))
+    else:
+        marks = {'regression': '🔴', 'improved': '🟢', 'ok': '  ', 'new': '🆕', 'missing': '❔'}
+        print(f"{'benchmark':<50} {'baseline':>10} {'current':>10} {'change':>8}")
+        for row in rows:
+            change = f"{row['ratio'] - 1:+.1%}" if row['ratio'] is not None else ''
+            print(f"{marks[row['verdict']]} {row['name']:<48} {bench.format_seconds(row['baseline_s']):>10} "
+                  f"{bench.format_seconds(row['current_s']):>10} {change:>8}")
+        print(f"{len(regressions)} regressions beyond {args.threshold:.0%} ({os.path.basename(current)} vs "
+              f"{os.path.basename(args.baseline)})")
+    return not regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulator and service benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="run benchmarks and save the results as JSON")
+    run_cmd.add_argument("--suite", action="append", choices=SUITES, help="suite to run (repeatable; default all)")
+    run_cmd.add_argument("-k", action="append", help="only benchmarks whose name contains this (repeatable)")
+    run_cmd.add_argument("--repeat", type=int, default=5, help="timed rounds per benchmark")
+    run_cmd.add_argument("--min-time", type=float, default=0.2, help="target seconds per round")
+    run_cmd.add_argument("--incidents", type=int, default=20, help="incidents in the fast-forward macro run")
+    run_cmd.add_argument("--seed", type=int, default=0)
+    run_cmd.add_argument("--output", help=f"result file (default: {os.path.relpath(RESULTS_DIR, ROOT)}/bench_<ts>.json)")
+    run_cmd.add_argument("--json", action="store_true", help="also print the result document")
+
+    compare_cmd = commands.add_parser("compare", help="flag regressions between two result files")
+    compare_cmd.add_argument("baseline")
+    compare_cmd.add_argument("current", nargs="?", help="default: the newest result in benchmarks/results/")
+    compare_cmd.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown, e.g. 0.1 = 10%%")
+    compare_cmd.add_argument("--json", action="store_true")
+
+    commands.add_parser("list", help="list benchmark names")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        with tempfile.TemporaryDirectory(prefix="bench_logs_") as log_dir:
+            try:
+                for benchmark in build(SUITES, log_dir, 0, 20):
+                    print(benchmark.name)
+            finally:
+                runner.close_logging()
+        return True
+    return run(args) if args.command == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,105 @@
+# scripts/catalog_benchmark.py
+#!/usr/bin/env python3
+"""
+Drive the product-service catalog cache with Zipf-distributed product lookups
+and check that RSS stays flat once the byte budget is full.
+
+    python scripts/catalog_benchmark.py --requests 1000000 --max-bytes 16777216
+    python scripts/catalog_benchmark.py --via app --requests 50000
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.services import load_service_app, service_module  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bounded-memory benchmark for the product catalog cache")
+    parser.add_argument("--requests", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=200_000, help="distinct product ids requested")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of the key distribution")
+    parser.add_argument("--max-bytes", type=int, default=16 * MB, help="catalog cache byte budget")
+    parser.add_argument("--via", choices=("catalog", "app"), default="catalog",
+                        help="call the Catalog directly or go through the Flask test client")
+    parser.add_argument("--samples", type=int, default=10, help="RSS samples over the run")
+    parser.add_argument("--tolerance-mb", type=float, default=8.0,
+                        help="allowed RSS growth once the cache is full")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args(argv)
+
+    os.environ['PRODUCT_CACHE_MAX_BYTES'] = str(args.max_bytes)
+    app = load_service_app('product-service')
+    catalog = service_module('product-service').catalog
+    catalog.store.count = args.products
+    logging.getLogger('product_service_app').setLevel(logging.WARNING)
+
+    if args.via == "app":
+        client = app.test_client()
+
+        def lookup(product_id):
+            client.get(f"/products/{product_id}")
+    else:
+        lookup = catalog.product_json
+
+    process = psutil.Process()
+    rng = np.random.default_rng(args.seed)
+    step = max(args.requests // args.samples, 1)
+    samples = [(0, process.memory_info().rss, 0)]
+    started = time.perf_counter()
+    done = 0
+    while done < args.requests:
+        batch = min(step, args.requests - done)
+        for product_id in (rng.zipf(args.zipf, batch) - 1) % args.products + 1:
+            lookup(int(product_id))
+        done += batch
+        samples.append((done, process.memory_info().rss, catalog.cache.evictions))
+        logger.info(f"{done:>9,} requests  rss={samples[-1][1] / MB:7.1f}MB  "
+                    f"cache={catalog.cache.bytes / MB:6.1f}MB")
+    elapsed = time.perf_counter() - started
+
+    # Measure from the first sample where the budget was full (evictions
+    # started), or from the midpoint if the cache never filled up
+    full = next((i for i, sample in enumerate(samples) if sample[2]), None)
+    if full is None:
+        full = next(i for i, sample in enumerate(samples) if sample[0] >= args.requests // 2)
+    growth = (max(sample[1] for sample in samples[full:]) - samples[full][1]) / MB
+    result = {
+        'requests': args.requests,
+        'via': args.via,
+        'elapsed_seconds': round(elapsed, 2),
+        'requests_per_second': round(args.requests / elapsed),
+        'rss_mb': [round(sample[1] / MB, 1) for sample in samples],
+        'full_after_requests': samples[full][0],
+        'growth_after_full_mb': round(growth, 2),
+        'bounded': growth <= args.tolerance_mb,
+        'cache': catalog.stats(),
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        stats = result['cache']['local']
+        print(f"{args.requests:,} requests in {elapsed:.1f}s ({result['requests_per_second']:,}/s), "
+              f"hit ratio {stats['hit_ratio']:.1%}, {stats['evictions']:,} evictions")
+        print(f"RSS {result['rss_mb'][0]}MB -> {result['rss_mb'][-1]}MB, "
+              f"growth after {samples[full][0]:,} requests {growth:.2f}MB: "
+              f"{'bounded' if result['bounded'] else 'NOT bounded'}")
+    return result
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main()['bounded'] else 1)
@@ -0,0 +1,198 @@
+# scripts/coalescing_benchmark.py
+#!/usr/bin/env python3
+"""
+Offer user-service /users/<id> the same open-loop load of Zipf-distributed
+ids twice, first with lookup caching and coalescing off, then on, and
+compare connection pool occupancy. Latency counts from each request's
+scheduled arrival, so queueing behind a full pool is included.
+
+    python scripts/coalescing_benchmark.py --rate 15 --duration 10
+    python scripts/coalescing_benchmark.py --worker-class async --rate 18 --zipf 1.3 --json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.histogram import LatencyHistogram  # noqa: E402
+from simulator.services import load_service_app, service_module  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _Sampler(threading.Thread):
+    """Samples the pool's in-use and waiting counts every `interval` seconds"""
+
+    def __init__(self, pool, interval):
+        super().__init__(name="pool-sampler", daemon=True)
+        self.pool = pool
+        self.interval = interval
+        self.in_use = []
+        self.waiting = []
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            self.in_use.append(self.pool.in_use)
+            self.waiting.append(self.pool.waiting)
+
+    def summary(self):
+        in_use = np.array(self.in_use or [0])
+        return {
+            'mean_in_use': round(float(in_use.mean()), 2),
+            'p95_in_use': float(np.percentile(in_use, 95)),
+            'max_in_use': int(in_use.max()),
+            'saturated_fraction': round(float((in_use >= self.pool.size).mean()), 4),
+            'mean_waiting': round(float(np.mean(self.waiting or [0])), 2),
+        }
+
+
+def _arrivals(args):
+    """(offset in seconds, user id) of every request: Poisson arrivals at --rate, Zipf ids"""
+    rng = np.random.default_rng(args.seed)
+    count = int(args.rate * args.duration)
+    offsets = np.cumsum(rng.exponential(1 / args.rate, count))
+    ids = (rng.zipf(args.zipf, count) - 1) % args.users + 1
+    return [(float(offset), str(user_id)) for offset, user_id in zip(offsets, ids) if offset < args.duration]
+
+
+def _drive_threads(app, args, arrivals, started):
+    statuses, latency = Counter(), LatencyHistogram()
+    lock = threading.Lock()
+    local = threading.local()
+
+    def request(scheduled, user_id):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        status = client.get(f"/users/{user_id}").status_code
+        with lock:
+            latency.record_seconds(time.perf_counter() - scheduled)
+            statuses[status] += 1
+
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        for offset, user_id in arrivals:
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(request, started + offset, user_id)
+    return statuses, latency
+
+
+def _drive_async(module, args, arrivals, started):
+    statuses, latency = Counter(), LatencyHistogram()
+
+    async def request(scheduled, user_id):
+        _, status = await module.get_user_async(user_id)
+        latency.record_seconds(time.perf_counter() - scheduled)
+        statuses[status] += 1
+
+    async def main():
+        tasks = []
+        for offset, user_id in arrivals:
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(request(started + offset, user_id)))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    return statuses, latency
+
+
+def run_phase(name, app, module, lookups, args):
+    pool = module.pool
+    while pool.in_use:  # let the previous phase's queries drain
+        time.sleep(0.05)
+    module.lookups = lookups
+    random.seed(args.seed)  # the handler's simulated delays and failures
+    timeouts = pool.timeouts
+    sampler = _Sampler(pool, args.sample_interval)
+    sampler.start()
+    started = time.perf_counter()
+    if args.worker_class == 'async':
+        statuses, latency = _drive_async(module, args, _arrivals(args), started)
+    else:
+        statuses, latency = _drive_threads(app, args, _arrivals(args), started)
+    elapsed = time.perf_counter() - started
+    sampler.stopping.set()
+    sampler.join()
+
+    requests = sum(statuses.values())
+    result = {
+        'phase': name,
+        'requests': requests,
+        'requests_per_second': round(requests / elapsed, 1),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'latency_ms': {key: round(value, 2) for key, value in latency.summary().items()},
+        'pool': {**sampler.summary(), 'size': pool.size, 'timeouts': pool.timeouts - timeouts},
+        'lookup': lookups.stats(),
+    }
+    logger.info(f"{name}: {requests:,} requests, {result['requests_per_second']}/s, "
+                f"pool mean {result['pool']['mean_in_use']}/{pool.size} in use, "
+                f"{lookups.backend_queries:,} backend queries")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pool occupancy with and without user lookup coalescing")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of arrivals per phase")
+    parser.add_argument("--rate", type=float, default=15.0, help="requests per second (open loop)")
+    parser.add_argument("--concurrency", type=int, default=200,
+                        help="request threads (threads worker class); later arrivals queue")
+    parser.add_argument("--worker-class", choices=("threads", "async"), default="threads",
+                        help="threads drive the Flask route, async awaits the async worker's view")
+    parser.add_argument("--users", type=int, default=10000, help="distinct user ids requested")
+    parser.add_argument("--zipf", type=float, default=1.2, help="Zipf exponent of the id distribution")
+    parser.add_argument("--ttl", type=float, default=5.0, help="positive cache TTL of the coalesced phase")
+    parser.add_argument("--negative-ttl", type=float, default=1.0, help="negative cache TTL of the coalesced phase")
+    parser.add_argument("--sample-interval", type=float, default=0.05, help="pool sampling period (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args(argv)
+
+    app = load_service_app('user-service')
+    module = service_module('user-service')
+    logging.getLogger('user_service_app').setLevel(logging.CRITICAL)
+    UserLookup = type(module.lookups)
+
+    phases = [
+        run_phase('baseline', app, module, UserLookup(ttl=0, negative_ttl=0, coalesce=False), args),
+        run_phase('coalesced', app, module, UserLookup(ttl=args.ttl, negative_ttl=args.negative_ttl), args),
+    ]
+    baseline, coalesced = (phase['pool']['mean_in_use'] for phase in phases)
+    result = {
+        'worker_class': args.worker_class,
+        'rate': args.rate,
+        'zipf': args.zipf,
+        'phases': phases,
+        'occupancy_reduction': round(1 - coalesced / baseline, 4) if baseline else 0.0,
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for phase in phases:
+            pool, lookup = phase['pool'], phase['lookup']
+            print(f"{phase['phase']:>9}: {phase['requests']:>7,} requests ({phase['requests_per_second']}/s)  "
+                  f"pool mean {pool['mean_in_use']:5.1f}/{pool['size']} p95 {pool['p95_in_use']:4.0f} "
+                  f"saturated {pool['saturated_fraction']:6.1%}  timeouts {pool['timeouts']:>5,}  "
+                  f"p99 {phase['latency_ms']['p99']:,.0f}ms  backend queries {lookup['backend_queries']:,} "
+                  f"(saved {lookup['saved']:,})")
+        print(f"Mean pool occupancy down {result['occupancy_reduction']:.1%}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# scripts/correlate_incidents.py
+#!/usr/bin/env python3
+"""
+Group a run's error lines and 5xx bursts into incident clusters.
+
+    python scripts/correlate_incidents.py                          # newest run in logs/
+    python scripts/correlate_incidents.py --run 20250819_210000 --json > clusters.jsonl
+    python scripts/correlate_incidents.py --logs out --gap 10m --templates
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.config import parse_duration  # noqa: E402
+from simulator.correlation import Correlator, TemplateMiner, log_runs, read_run  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def describe(summary):
+    services = ", ".join(summary['services']) or "unattributed"
+    incidents = ", ".join(summary['incidents']) or "-"
+    top = summary['templates'][0]['template'] if summary['templates'] else summary['first']
+    return (f"🧩 #{summary['cluster']} {summary['start']} +{summary['duration_s'] / 60:.1f}m [{services}] "
+            f"{summary['errors']} errors ({summary['critical']} critical), {summary['http_5xx']} 5xx "
+            f"(peak {summary['http_5xx_peak_per_min']}/min) incident={incidents} | {top}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming incident correlation over runner logs")
+    parser.add_argument("--logs", default="logs", help="log directory")
+    parser.add_argument("--run", help="run id, e.g. 20250819_210000 (default: the newest run)")
+    parser.add_argument("--gap", default="15m", help="quiet time that closes a cluster")
+    parser.add_argument("--link", default="10s", help="window in which another service's burst joins a cluster")
+    parser.add_argument("--spike-min", type=int, default=3, help="5xx per minute that open a cluster")
+    parser.add_argument("--threshold", type=float, default=0.5, help="template similarity threshold")
+    parser.add_argument("--templates", action="store_true", help="also list every mined template")
+    parser.add_argument("--json", action="store_true", help="print one JSON summary per cluster")
+    args = parser.parse_args(argv)
+
+    runs = log_runs(args.logs)
+    if not runs:
+        parser.error(f"no runner logs in {args.logs}")
+    run = args.run or max(runs)
+    if run not in runs:
+        parser.error(f"no run {run!r} in {args.logs} (found: {', '.join(sorted(runs))})")
+
+    miner = TemplateMiner(args.threshold)
+    correlator = Correlator(miner, gap=parse_duration(args.gap), link=parse_duration(args.link),
+                            spike_min=args.spike_min)
+    started = time.perf_counter()
+    clusters = 0
+    for summary in correlator.stream(read_run(runs[run])):
+        clusters += 1
+        print(json.dumps(summary) if args.json else describe(summary))
+    elapsed = time.perf_counter() - started
+
+    if args.templates and not args.json:
+        for template in sorted(miner.templates, key=lambda t: -t.count):
+            print(f"{template.signature} {template.count:>6}  {template.text}")
+    logger.info(f"🔗 {run}: {correlator.events:,} events -> {clusters} clusters, {len(miner.templates)} templates, "
+                f"{correlator.stray_5xx} stray 5xx in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,96 @@
 # scripts/health_check.py
 #!/usr/bin/env python3
-import requests
+"""
+Health-check every endpoint in config/monitoring.yaml, concurrently.
+
+    python scripts/health_check.py                      # one sweep, exit 1 if anything is down
+    python scripts/health_check.py --format jsonl
+    python scripts/health_check.py --daemon --metrics-port 9105
+    python scripts/health_check.py --daemon --format jsonl --output logs/health.jsonl
+"""
+import argparse
+import asyncio
 import logging
+import os
 import sys
-from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.health import HealthChecker, JsonLinesSink, PrometheusSink, load_endpoints, log_sink  # noqa: E402
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-SERVICES = {
-    'user-service': 'http://localhost:8001/health',
-    'product-service': 'http://localhost:8002/health', 
-    'order-service': 'http://localhost:8003/health',
-    'payment-service': 'http://localhost:8004/health'
-}
-
-def check_service_health():
-    failed_services = []
-    
-    for service, url in SERVICES.items():
+
+def check_service_health(endpoints, sinks, max_concurrency=256):
+    """One concurrent sweep; True if every endpoint answered 2xx in time"""
+    checker = HealthChecker(endpoints, sinks, max_concurrency)
+
+    async def sweep():
         try:
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                logger.info(f"✅ {service}: HEALTHY")
-            else:
-                logger.error(f"❌ {service}: UNHEALTHY (status: {response.status_code})")
-                failed_services.append(service)
-        except requests.exceptions.ConnectionError:
-            logger.error(f"💥 {service}: CONNECTION FAILED")
-            failed_services.append(service)
-        except requests.exceptions.Timeout:
-            logger.error(f"⏱️  {service}: TIMEOUT")  
-            failed_services.append(service)
-        except Exception as e:
-            logger.error(f"🚫 {service}: ERROR - {str(e)}")
-            failed_services.append(service)
-    
+            return await checker.sweep()
+        finally:
+            await checker.close()
+
+    results = asyncio.run(sweep())
+    failed_services = [result['endpoint'] for result in results if not result['healthy']]
     if failed_services:
         logger.critical(f"CRITICAL: {len(failed_services)} services are unhealthy: {failed_services}")
         return False
-    else:
-        logger.info("🎉 All services are healthy!")
-        return True
+    logger.info("🎉 All services are healthy!")
+    return True
 
-if __name__ == "__main__":
-    healthy = check_service_health()
-    sys.exit(0 if healthy else 1)
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent health checks from monitoring.yaml")
+    parser.add_argument("--config", default="monitoring.yaml", help="file with monitoring.endpoints")
+    parser.add_argument("--daemon", action="store_true", help="keep probing each endpoint on its interval")
+    parser.add_argument("--duration", type=float, help="stop the daemon after this many seconds")
+    parser.add_argument("--format", choices=("log", "jsonl", "prometheus"), default="log")
+    parser.add_argument("--output", help="append JSON Lines here instead of stdout")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    parser.add_argument("--concurrency", type=int, default=256, help="probes in flight at once")
+    args = parser.parse_args(argv)
+
+    endpoints = load_endpoints(args.config)
+    sinks = [log_sink] if args.format == "log" else []
+    output = None
+    if args.format == "jsonl":
+        output = open(args.output, 'a') if args.output else None
+        sinks.append(JsonLinesSink(output))
+    prometheus = None
+    if args.format == "prometheus" or args.metrics_port:
+        prometheus = PrometheusSink()
+        sinks.append(prometheus)
+        if args.metrics_port:
+            prometheus.serve(args.metrics_port)
+            logger.info(f"📈 Serving health metrics on :{args.metrics_port}/metrics")
+
+    try:
+        if not args.daemon:
+            healthy = check_service_health(endpoints, sinks, args.concurrency)
+            if args.format == "prometheus":
+                print(prometheus.exposition(), end="")
+            return healthy
+
+        logger.info(f"🩺 Probing {len(endpoints)} endpoints continuously")
+        checker = HealthChecker(endpoints, sinks, args.concurrency)
+
+        async def daemon():
+            try:
+                await checker.run(args.duration)
+            finally:
+                await checker.close()
+
+        try:
+            asyncio.run(daemon())
+        except KeyboardInterrupt:
+            pass
+        return all(result['healthy'] for result in checker.last.values())
+    finally:
+        if output is not None:
+            output.close()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
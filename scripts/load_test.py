@@ -0,0 +1,73 @@
+# scripts/load_test.py
+#!/usr/bin/env python3
+"""
+Real load test against the e-commerce services.
+
+    python scripts/load_test.py --mode open --rate 200 --duration 30
+    python scripts/load_test.py --mode closed --users 50 --target inprocess
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.load_test import HttpTransport, InProcessTransport, run  # noqa: E402
+from simulator.services import SERVICE_PORTS  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def print_report(report):
+    header = f"{'endpoint':<18} {'reqs':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  errors"
+    print(header)
+    print("-" * len(header))
+    rows = list(report['endpoints'].items()) + [('TOTAL', report['total'])]
+    for name, stats in rows:
+        latency = stats['latency_ms']
+        errors = ", ".join(f"{kind}={count}" for kind, count in stats['errors'].items()) or "-"
+        print(f"{name:<18} {stats['requests']:>7} {stats['throughput_rps']:>8.1f} "
+              f"{latency['p50']:>8.1f} {latency['p95']:>8.1f} {latency['p99']:>8.1f} {latency['max']:>8.1f}  {errors}")
+    print(f"(latencies in ms, {report['elapsed_seconds']}s elapsed, {report['dropped']} dropped by the client)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the e-commerce services")
+    parser.add_argument("--mode", choices=("open", "closed"), default="closed",
+                        help="open: constant arrival rate, closed: N virtual users")
+    parser.add_argument("--rate", type=float, default=50.0, help="requests/sec in open-loop mode")
+    parser.add_argument("--users", type=int, default=10, help="virtual users in closed-loop mode")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean think time per user (s)")
+    parser.add_argument("--duration", type=float, default=10.0, help="test length in seconds")
+    parser.add_argument("--target", choices=("http", "inprocess"), default="http",
+                        help="real HTTP services or in-process Flask test clients")
+    parser.add_argument("--host", default="localhost", help="host running the services (http target)")
+    parser.add_argument("--pool-size", type=int, default=100, help="keep-alive connections per service")
+    parser.add_argument("--timeout", type=float, default=10.0, help="per-request timeout (s)")
+    parser.add_argument("--seed", type=int, help="random seed for the request mix")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.target == "inprocess":
+        transport = InProcessTransport(workers=max(args.users, 64))
+    else:
+        base_urls = {name: f"http://{args.host}:{port}" for name, port in SERVICE_PORTS.items()}
+        transport = HttpTransport(base_urls, pool_size=args.pool_size, timeout=args.timeout)
+
+    logger.info(f"🔄 {args.mode}-loop load test against {args.target} for {args.duration}s")
+    report = run(transport, mode=args.mode, rate=args.rate, users=args.users,
+                 duration=args.duration, think_time=args.think_time, seed=args.seed)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return report
+
+
+if __name__ == "__main__":
+    report = main()
+    sys.exit(0 if report['total']['requests'] else 1)
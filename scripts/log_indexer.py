@@ -0,0 +1,87 @@
+# scripts/log_indexer.py
+#!/usr/bin/env python3
+"""
+Index and query the logs/ directory.
+
+    python scripts/log_indexer.py index --follow
+    python scripts/log_indexer.py query --service order-service --level ERROR \\
+        --since 2025-08-19T21:00 --until 2025-08-19T23:00
+    python scripts/log_indexer.py query --incident memory_leak --level ERROR CRITICAL
+    python scripts/log_indexer.py incidents
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.log_index import LogIndex  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def index(log_index, follow, interval):
+    while True:
+        started = time.perf_counter()
+        lines = log_index.update()
+        if lines or not follow:
+            elapsed = time.perf_counter() - started
+            logger.info(f"📇 Indexed {lines:,} new lines in {elapsed:.2f}s")
+        if not follow:
+            return
+        time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental log index for logs/")
+    parser.add_argument("--logs", default="logs", help="log directory")
+    parser.add_argument("--db", help="index database (default: <logs>/log_index.sqlite)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index_cmd = commands.add_parser("index", help="index new log lines")
+    index_cmd.add_argument("--follow", action="store_true", help="keep tailing the log files")
+    index_cmd.add_argument("--interval", type=float, default=2.0, help="poll interval in --follow mode (s)")
+
+    query_cmd = commands.add_parser("query", help="print matching log lines")
+    query_cmd.add_argument("--service", help="e.g. order-service")
+    query_cmd.add_argument("--level", nargs="+", help="ERROR, CRITICAL, ... or ACCESS for 4xx/5xx requests")
+    query_cmd.add_argument("--since", help="ISO timestamp, e.g. 2025-08-19T21:00")
+    query_cmd.add_argument("--until", help="ISO timestamp")
+    query_cmd.add_argument("--incident", help="only lines inside windows of this incident scenario")
+    query_cmd.add_argument("--kind", choices=("application", "error", "access"), help="log file kind")
+    query_cmd.add_argument("--limit", type=int, help="maximum lines to print")
+    query_cmd.add_argument("--no-update", action="store_true", help="query without indexing new lines first")
+
+    incidents_cmd = commands.add_parser("incidents", help="list triggered incidents")
+    incidents_cmd.add_argument("--name", help="incident scenario")
+    incidents_cmd.add_argument("--since", help="ISO timestamp")
+    incidents_cmd.add_argument("--until", help="ISO timestamp")
+    args = parser.parse_args(argv)
+
+    log_index = LogIndex(args.db or os.path.join(args.logs, "log_index.sqlite"), log_dir=args.logs)
+    try:
+        if args.command == "index":
+            index(log_index, args.follow, args.interval)
+        elif args.command == "query":
+            if not args.no_update:
+                log_index.update()
+            for _, path, text in log_index.query(service=args.service, level=args.level, start=args.since,
+                                                 end=args.until, incident=args.incident, kind=args.kind,
+                                                 limit=args.limit):
+                print(f"{os.path.basename(path)}: {text}")
+        else:
+            log_index.update()
+            for ts, run, name in log_index.incidents(args.name, args.since, args.until):
+                print(f"{datetime.fromtimestamp(ts).isoformat(sep=' ', timespec='milliseconds')}  {run}  {name}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log_index.close()
+
+
+if __name__ == "__main__":
+    main()
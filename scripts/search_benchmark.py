@@ -0,0 +1,161 @@
+# scripts/search_benchmark.py
+#!/usr/bin/env python3
+"""
+Build the product-service search index over a synthetic catalog and measure
+query latency by query shape.
+
+    python scripts/search_benchmark.py --products 1000000
+    python scripts/search_benchmark.py --products 200000 --write catalog.jsonl
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from simulator.histogram import LatencyHistogram  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ten', 'vo', 'zu', 'pre', 'lux', 'sol', 'tri', 'gen', 'max', 'nor', 'fi']
+CATEGORIES = [
+    'electronics', 'books', 'home', 'garden', 'toys', 'sports', 'beauty', 'grocery', 'automotive', 'music',
+    'movies', 'games', 'office', 'pets', 'baby', 'health', 'jewelry', 'shoes', 'luggage', 'tools',
+    'kitchen', 'outdoors', 'crafts', 'software', 'cameras', 'audio', 'lighting', 'furniture', 'bedding', 'watches',
+    'handbags', 'fitness', 'cycling', 'camping', 'fishing', 'stationery', 'appliances', 'phones', 'computers', 'snacks',
+]
+
+
+def load_search_module():
+    path = os.path.join(ROOT, "services", "product-service", "search.py")
+    spec = importlib.util.spec_from_file_location("product_search", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_catalog(count, seed):
+    """Products whose name words follow a Zipf-Mandelbrot distribution over ~20k words"""
+    rng = np.random.default_rng(seed)
+    vocabulary = sorted({''.join(rng.choice(SYLLABLES, size=rng.integers(2, 5))) for _ in range(40000)})
+    rng.shuffle(vocabulary)
+    brands = vocabulary[:400]
+    weights = 1.0 / (np.arange(len(vocabulary)) + 10.0) ** 1.05
+    words = rng.choice(len(vocabulary), size=(count, 3), p=weights / weights.sum())
+    brand = rng.integers(0, len(brands), count)
+    category = rng.integers(0, len(CATEGORIES), count)
+    price = np.round(rng.lognormal(3.5, 1.0, count), 2)
+    rating = np.round(rng.uniform(1, 5, count), 1)
+    return [
+        {
+            'id': i + 1,
+            'name': f"{brands[brand[i]]} {vocabulary[a]} {vocabulary[b]} {vocabulary[c]}",
+            'category': CATEGORIES[category[i]],
+            'price': float(price[i]),
+            'rating': float(rating[i]),
+        }
+        for i, (a, b, c) in enumerate(words.tolist())
+    ]
+
+
+def make_queries(products, count, seed):
+    """(shape, kwargs) pairs drawn from real product names so most queries match"""
+    rng = np.random.default_rng(seed + 1)
+    queries = []
+    for i in rng.integers(0, len(products), count).tolist():
+        product = products[i]
+        words = product['name'].split()
+        shape = ('term', 'two_terms', 'prefix', 'faceted')[len(queries) % 4]
+        if shape == 'term':
+            kwargs = {'query': words[1]}
+        elif shape == 'two_terms':
+            kwargs = {'query': f"{words[0]} {words[1]}"}
+        elif shape == 'prefix':
+            kwargs = {'query': f"{words[1]} {words[2][:3]}"}
+        else:
+            kwargs = {'query': words[2], 'category': product['category'],
+                      'min_price': product['price'] / 2, 'max_price': product['price'] * 2}
+        queries.append((shape, kwargs))
+    return queries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search index latency benchmark")
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=10, help="top-k per query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--write", help="also write the catalog as .jsonl (usable as PRODUCT_CATALOG_PATH)")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args(argv)
+
+    search = load_search_module()
+    started = time.perf_counter()
+    products = make_catalog(args.products, args.seed)
+    logger.info(f"Generated {len(products):,} products in {time.perf_counter() - started:.1f}s")
+    if args.write:
+        with open(args.write, 'w') as f:
+            for product in products:
+                f.write(json.dumps(product) + "\n")
+
+    index = search.SearchIndex()
+    started = time.perf_counter()
+    index.add_many(products)
+    build = time.perf_counter() - started
+    logger.info(f"Indexed in {build:.1f}s ({len(products) / build:,.0f} products/s)")
+
+    # Incremental updates: re-index 1% of the catalog with new prices
+    updates = products[::100]
+    started = time.perf_counter()
+    for product in updates:
+        index.add(dict(product, price=round(product['price'] * 0.9, 2)))
+    update = (time.perf_counter() - started) / len(updates)
+
+    queries = make_queries(products, args.queries, args.seed)
+    for shape, kwargs in queries[:200]:
+        index.search(limit=args.limit, **kwargs)  # warm-up
+    histograms = {}
+    totals = []
+    for shape, kwargs in queries:
+        begin = time.perf_counter()
+        result = index.search(limit=args.limit, **kwargs)
+        histograms.setdefault(shape, LatencyHistogram()).record_seconds(time.perf_counter() - begin)
+        totals.append(result['total'])
+
+    overall = LatencyHistogram()
+    for histogram in histograms.values():
+        overall.merge(histogram)
+    report = {
+        'products': args.products,
+        'build_seconds': round(build, 2),
+        'update_us': round(update * 1e6, 1),
+        'index': index.stats(),
+        'median_matches': int(np.median(totals)),
+        'latency_ms': {shape: histogram.summary() for shape, histogram in histograms.items()},
+    }
+    report['latency_ms']['all'] = overall.summary()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{args.products:,} products, {report['index']['terms']:,} terms, "
+              f"{report['index']['postings_bytes'] / 1024 / 1024:.1f}MB postings, "
+              f"build {build:.1f}s, update {report['update_us']}us/product")
+        print(f"{'query shape':<12} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+        for shape, stats in report['latency_ms'].items():
+            print(f"{shape:<12} {stats['count']:>7} {stats['p50']:>8.3f} {stats['p95']:>8.3f} "
+                  f"{stats['p99']:>8.3f} {stats['max']:>8.3f}")
+        print("(latencies in ms)")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# scripts/serve.py
+#!/usr/bin/env python3
+"""
+Run a service under the prefork server instead of Flask's development server.
+
+    python scripts/serve.py user-service                                  # CPU-count workers x 8 threads
+    python scripts/serve.py order-service --workers 4 --threads 16 --keepalive 10
+    python scripts/serve.py user-service --worker-class async --workers 2  # /users/<id> as a coroutine
+    kill -HUP <master pid>                                                # graceful reload
+    kill -TERM <master pid>                                               # graceful stop
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.serving import WORKER_CLASSES, PreforkServer  # noqa: E402
+from simulator.services import SERVICE_PORTS  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(process)d] %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-process server for the e-commerce services")
+    parser.add_argument("service", choices=sorted(SERVICE_PORTS), help="service to serve")
+    parser.add_argument("--host", default="0.0.0.0", help="interface to bind")
+    parser.add_argument("--port", type=int, help="port (default: the service's usual port)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--threads", type=int, default=8,
+                        help="request threads per worker (async workers: threads for non-async routes)")
+    parser.add_argument("--worker-class", choices=WORKER_CLASSES, default='threads',
+                        help="threads (one request per thread) or async (coroutine views on an event loop)")
+    parser.add_argument("--keepalive", type=float, default=5.0, help="idle keep-alive timeout (s)")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0,
+                        help="seconds stopping workers get to finish in-flight requests")
+    parser.add_argument("--backlog", type=int, default=2048, help="listen backlog")
+    args = parser.parse_args(argv)
+
+    server = PreforkServer(args.service, args.host, args.port, workers=args.workers, threads=args.threads,
+                           worker_class=args.worker_class, keepalive=args.keepalive,
+                           graceful_timeout=args.graceful_timeout, backlog=args.backlog)
+    sys.exit(server.run())
+
+
+if __name__ == "__main__":
+    main()
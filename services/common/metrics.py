@@ -0,0 +1,174 @@
+# services/common/metrics.py
+"""
+Prometheus instrumentation shared by the Flask services.
+
+    from common.metrics import instrument
+    instrument(app, 'user-service', gauges={
+        'db_connections_active': ('Connections in use', lambda: active_connections),
+    }, counters={
+        'db_pool_checkouts_total': ('Connections checked out since start', lambda: pool.checkouts),
+    })
+
+Adds GET /metrics plus per-request latency histograms, status counters and an
+in-flight gauge. Labelled children are cached per (method, endpoint, status),
+so the hot path is a dict lookup, one observe() and one inc(). Servers that
+answer some requests outside Flask (the async worker in simulator/serving.py)
+find the Instrumentation in app.extensions['metrics'] and call observe(). When
+PROMETHEUS_MULTIPROC_DIR is set (multi-worker servers) values go through
+prometheus_client's mmap files and /metrics aggregates every worker.
+
+`gauges` are levels (in use, queue depth, entries). `counters` read running
+totals the service already keeps; each sync adds the growth since the last
+one to a real Counter. Counters keep a dead or reloaded worker's share, so
+rate() and increase() work on them, where a livesum gauge would drop it.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from flask import request
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:  # pragma: no cover - metrics are optional for local runs
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+START_KEY = 'metrics.start'
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR') or os.environ.get('prometheus_multiproc_dir'))
+
+_metrics = {}
+
+
+def _metric(kind, name, documentation, labels, **kwargs):
+    """Create each metric once per process so several apps can share a registry"""
+    if name not in _metrics:
+        _metrics[name] = kind(name, documentation, labels, **kwargs)
+    return _metrics[name]
+
+
+def _gauge(name, documentation, labels):
+    if MULTIPROCESS:
+        return _metric(Gauge, name, documentation, labels, multiprocess_mode='livesum')
+    return _metric(Gauge, name, documentation, labels)
+
+
+class _Total:
+    """Feeds a running total read from the service into a Counter"""
+
+    def __init__(self, child, read):
+        self.child = child
+        self.read = read
+        self.last = 0
+
+    def sync(self):
+        value = self.read()
+        # A total that went down was reset (a replaced cache, say): count it from zero
+        delta = value - self.last if value >= self.last else value
+        self.last = value
+        if delta > 0:
+            self.child.inc(delta)
+
+
+class Instrumentation:
+    def __init__(self, app, service, gauges=None, counters=None, path='/metrics'):
+        self.service = service
+        self.path = path
+        self.latency = _metric(Histogram, 'http_request_duration_seconds', 'Request latency',
+                               ['service', 'method', 'endpoint'])
+        self.requests = _metric(Counter, 'http_requests_total', 'Requests by status code',
+                                ['service', 'method', 'endpoint', 'status'])
+        self.in_flight = _gauge('http_requests_in_flight', 'Requests being handled', ['service']).labels(service)
+        self._children = {}
+
+        # Service gauges: read at scrape time in a single process; sampled after
+        # each request in multiprocess mode, where callbacks can't be collected
+        self._sampled = []
+        for name, (documentation, read) in (gauges or {}).items():
+            child = _gauge(name, documentation, ['service']).labels(service)
+            if MULTIPROCESS:
+                child.set(read())
+                self._sampled.append((child, read))
+            else:
+                child.set_function(read)
+        # Service totals: synced after each request and before each scrape
+        self._totals = [_Total(_metric(Counter, name, documentation, ['service']).labels(service), read)
+                        for name, (documentation, read) in (counters or {}).items()]
+        self._totals_lock = threading.Lock()
+        self._sync_totals()
+
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+        app.add_url_rule(path, 'metrics', self.metrics)
+        app.extensions['metrics'] = self
+
+    # Each `request` attribute goes through a context-local proxy, so the
+    # hooks resolve it once and work on the plain object
+    def _before(self):
+        environ = request.environ
+        if environ.get('PATH_INFO') != self.path:
+            environ[START_KEY] = time.perf_counter()
+            self.in_flight.inc()
+
+    def _after(self, response):
+        req = request._get_current_object()
+        start = req.environ.get(START_KEY)
+        if start is None:
+            return response
+        rule = req.url_rule
+        self.observe(req.method, rule.rule if rule is not None else 'unmatched', response.status_code,
+                     time.perf_counter() - start)
+        return response
+
+    def observe(self, method, endpoint, status, elapsed):
+        """Count one finished request; `endpoint` is the URL rule, e.g. '/users/<user_id>'"""
+        key = (method, endpoint, status)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (
+                self.latency.labels(self.service, method, endpoint),
+                self.requests.labels(self.service, method, endpoint, str(status)),
+            )
+        children[0].observe(elapsed)
+        children[1].inc()
+        for child, read in self._sampled:
+            child.set(read())
+        self._sync_totals()
+
+    def _sync_totals(self):
+        if self._totals:
+            with self._totals_lock:
+                for total in self._totals:
+                    total.sync()
+
+    def _teardown(self, exc):
+        if request.environ.pop(START_KEY, None) is not None:
+            self.in_flight.dec()
+
+    def metrics(self):
+        self._sync_totals()
+        if MULTIPROCESS:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = prometheus_client.REGISTRY
+        return prometheus_client.generate_latest(registry), 200, {'Content-Type': prometheus_client.CONTENT_TYPE_LATEST}
+
+
+def instrument(app, service, gauges=None, counters=None, path='/metrics'):
+    """Attach request metrics and a /metrics endpoint to a Flask app"""
+    if prometheus_client is None:
+        logger.warning(f"prometheus-client not installed - {service} will not expose {path}")
+        return None
+    return Instrumentation(app, service, gauges, counters, path)
+
+
+def mark_process_dead(pid):
+    """Drop a dead worker's live gauges (call from the server's child-exit hook)"""
+    if prometheus_client is not None and MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
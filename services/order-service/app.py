@@ -1,39 +1,72 @@
 # services/order-service/app.py
 from flask import Flask, jsonify, request
 import logging
-import redis
+import random
 import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.metrics import instrument  # noqa: E402
+from store import OrderStore, QueueFull, StoreUnavailable, make_client  # noqa: E402
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Intentional configuration error
-try:
-    redis_client = redis.Redis(host='localhost', port=6379, decode_responses=True, socket_timeout=None)  # Bug: timeout=None
-except Exception as e:
-    logger.error(f"Redis connection failed: {str(e)}")
-    redis_client = None
+# memory:// (in-process stub) or fakeredis:// run without a Redis server
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+REDIS_TIMEOUT = float(os.environ.get('REDIS_TIMEOUT', '0.5'))
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', '8'))
+ORDER_QUEUE_SIZE = int(os.environ.get('ORDER_QUEUE_SIZE', '10000'))
+ORDER_BATCH_SIZE = int(os.environ.get('ORDER_BATCH_SIZE', '100'))
+ORDER_FLUSH_INTERVAL = float(os.environ.get('ORDER_FLUSH_INTERVAL', '0.05'))
+
+orders = OrderStore(
+    make_client(REDIS_URL, timeout=REDIS_TIMEOUT, max_connections=REDIS_MAX_CONNECTIONS),
+    max_queue=ORDER_QUEUE_SIZE,
+    batch_size=ORDER_BATCH_SIZE,
+    flush_interval=ORDER_FLUSH_INTERVAL,
+)
+
+instrument(app, 'order-service', gauges={
+    'order_queue_depth': ('Orders waiting to be written to Redis', lambda: orders.depth),
+    'order_queue_capacity': ('Write-behind queue capacity', lambda: orders.max_queue),
+}, counters={
+    'orders_written_total': ('Orders written to Redis', lambda: orders.written),
+    'orders_rejected_total': ('Orders rejected because the queue was full', lambda: orders.rejected),
+    'order_write_failures_total': ('Orders dropped after failed Redis writes', lambda: orders.failed),
+    'order_batches_total': ('Pipelined Redis batches written', lambda: orders.batches),
+})
 
 @app.route('/health')
 def health():
-    return jsonify({'status': 'healthy', 'service': 'order-service'})
+    return jsonify({'status': 'healthy' if orders.available else 'degraded', 'service': 'order-service',
+                    'order_store': orders.stats()})
 
 @app.route('/orders', methods=['POST'])
 def create_order():
     try:
-        order_data = request.json
-        
-        # This will fail due to redis timeout configuration
-        if redis_client:
-            redis_client.set(f"order_{order_data.get('id')}", json.dumps(order_data))
-        
+        order_data = request.get_json(silent=True)
+        if not isinstance(order_data, dict):
+            return jsonify({'error': 'expected a JSON order object'}), 400
+
         # Simulate order processing delay
         if random.random() < 0.25:
             logger.error("Order processing timeout - inventory service unreachable")
             return jsonify({'error': 'Inventory check failed'}), 502
-        
-        return jsonify({'order_id': order_data.get('id'), 'status': 'created'})
+
+        try:
+            orders.submit(order_data.get('id'), json.dumps(order_data))
+        except QueueFull as e:
+            # A burst outran the flusher; it will catch up
+            return jsonify({'error': str(e)}), 429, {'Retry-After': '1'}
+        except StoreUnavailable as e:
+            logger.error(f"Order store unavailable: {e}")
+            return jsonify({'error': 'Order store unavailable'}), 503, {'Retry-After': '5'}
+
+        # Accepted, not yet durable: the flusher writes it within ORDER_FLUSH_INTERVAL
+        return jsonify({'order_id': order_data.get('id'), 'status': 'accepted'}), 202
     
     except Exception as e:
         logger.error(f"Order creation failed: {str(e)}")
@@ -41,4 +74,3 @@ def create_order():
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8003)
-
@@ -0,0 +1,257 @@
+# services/order-service/store.py
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """The write-behind queue is at capacity; the order was not accepted"""
+
+
+class StoreUnavailable(Exception):
+    """Redis writes keep failing; orders are refused rather than queued to be dropped"""
+
+
+class InMemoryRedis:
+    """In-process stand-in for the Redis calls the order store makes
+
+    Used for tests and local runs (REDIS_URL=memory://). Every execute() of a
+    pipeline is one simulated round trip of `latency` seconds. Expiry (ex=) is
+    accepted but not enforced.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.data = {}
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        with self._lock:
+            return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        return self.pipeline().set(key, value, ex=ex).execute()[0]
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+
+class _Pipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value))
+        return self
+
+    def execute(self):
+        if self.client.latency:
+            time.sleep(self.client.latency)
+        with self.client._lock:
+            self.client.round_trips += 1
+            self.client.data.update(self.commands)
+        results = [True] * len(self.commands)
+        self.commands = []
+        return results
+
+
+def make_client(url, timeout=0.5, max_connections=8):
+    """Redis client for `url` with bounded socket, connect and pool-checkout timeouts
+
+    memory:// gives an InMemoryRedis and fakeredis:// a fakeredis client (if
+    installed), so the service and its tests can run without a Redis server.
+    """
+    if url.startswith('memory://'):
+        return InMemoryRedis()
+    if url.startswith('fakeredis://'):
+        import fakeredis
+        return fakeredis.FakeRedis(decode_responses=True)
+    import redis
+    pool = redis.BlockingConnectionPool.from_url(
+        url,
+        max_connections=max_connections,
+        timeout=timeout,  # wait for a free connection at most this long
+        socket_timeout=timeout,
+        socket_connect_timeout=timeout,
+        decode_responses=True,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+class OrderStore:
+    """Write-behind order persistence
+
+    submit() serializes the order into a bounded queue and returns at once; a
+    background thread drains it in batches of up to `batch_size`, or whatever
+    arrived within `flush_interval` seconds of the first order, and writes
+    each batch as one pipelined round trip. A failed batch is retried with
+    exponential backoff, then dropped and counted.
+
+    Back-pressure: submit() raises QueueFull when the queue is at capacity
+    (the service answers 429), and StoreUnavailable once `unhealthy_after`
+    batches in a row have failed every retry (503) until a ping to Redis
+    succeeds again.
+    """
+
+    def __init__(self, client, max_queue=10000, batch_size=100, flush_interval=0.05,
+                 key_prefix='order_', ttl=None, retries=3, retry_backoff=0.1, unhealthy_after=3):
+        self.client = client
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.unhealthy_after = unhealthy_after
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.consecutive_failures = 0
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    @property
+    def available(self):
+        """False while Redis writes keep failing"""
+        return self.consecutive_failures < self.unhealthy_after
+
+    def submit(self, order_id, payload):
+        """Queue one serialized order for writing; raises QueueFull or StoreUnavailable"""
+        self._ensure_flusher()
+        if not self.available:
+            with self._lock:
+                self.rejected += 1
+            raise StoreUnavailable(f"{self.consecutive_failures} consecutive Redis write failures")
+        try:
+            self._queue.put_nowait((f"{self.key_prefix}{order_id}", payload))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise QueueFull(f"order queue full ({self.max_queue} pending)") from None
+        with self._lock:
+            self.accepted += 1
+
+    def _ensure_flusher(self):
+        # Started lazily and per process, so forked workers each get their own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='order-flusher', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._closed:
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+            elif not self.available:
+                self._probe()
+
+    def _probe(self):
+        try:
+            self.client.ping()
+        except Exception:
+            return
+        with self._lock:
+            self.consecutive_failures = 0
+        logger.info("Redis reachable again, accepting orders")
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    pipe = self.client.pipeline(transaction=False)
+                    for key, payload in batch:
+                        pipe.set(key, payload, ex=self.ttl)
+                    pipe.execute()
+                except Exception as e:
+                    logger.warning(f"Order batch write failed (attempt {attempt + 1}): {e}")
+                    if attempt < self.retries:
+                        time.sleep(self.retry_backoff * 2 ** attempt)
+                    continue
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.written += len(batch)
+                    self.batches += 1
+                    self.consecutive_failures = 0
+                    self.flush_seconds += elapsed
+                    self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+                return
+            # One failed batch counts once, however many retries it took
+            with self._lock:
+                self.failed += len(batch)
+                self.consecutive_failures += 1
+            logger.error(f"Dropped {len(batch)} orders after {self.retries + 1} failed writes")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, timeout=5.0):
+        """Wait until every accepted order has been written or dropped"""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=5.0):
+        drained = self.flush(timeout)
+        self._closed = True
+        return drained
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self.max_queue,
+                'accepted': self.accepted,
+                'rejected': self.rejected,
+                'written': self.written,
+                'failed': self.failed,
+                'batches': self.batches,
+                'avg_batch': round(self.written / self.batches, 1) if self.batches else 0.0,
+                'avg_flush_ms': round(self.flush_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+                'max_flush_ms': round(self.max_flush_seconds * 1000, 3),
+                'available': self.available,
+            }
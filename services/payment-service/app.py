@@ -1,45 +1,99 @@
 # services/payment-service/app.py
 from flask import Flask, jsonify, request
 import logging
-import requests
-import random
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.metrics import instrument  # noqa: E402
+from gateway import PaymentProcessor, RetryBudget, make_gateway  # noqa: E402
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Intentional configuration issue
-STRIPE_API_KEY = None  # Missing configuration
-PAYMENT_TIMEOUT = 30
+# stub:// gateways run in-process (see gateway.make_gateway); the default stub
+# answers 30% of calls with 503, as the old simulation did
+GATEWAY_URL = os.environ.get('PAYMENT_GATEWAY_URL', 'stub://?error_rate=0.3')
+FALLBACK_URL = os.environ.get('PAYMENT_FALLBACK_URL')
+STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY')
+PAYMENT_TIMEOUT = float(os.environ.get('PAYMENT_TIMEOUT', '2.0'))
+MAX_BATCH = 500
+
+processor = PaymentProcessor(
+    make_gateway('primary', GATEWAY_URL, api_key=STRIPE_API_KEY, read_timeout=PAYMENT_TIMEOUT),
+    make_gateway('fallback', FALLBACK_URL, read_timeout=PAYMENT_TIMEOUT) if FALLBACK_URL else None,
+    max_attempts=int(os.environ.get('PAYMENT_MAX_ATTEMPTS', '3')),
+    retry_budget=RetryBudget(ratio=float(os.environ.get('PAYMENT_RETRY_RATIO', '0.2'))),
+)
+primary = processor.breakers['primary']
+
+instrument(app, 'payment-service', gauges={
+    'payment_circuit_open': ('1 while the primary gateway circuit is not closed',
+                             lambda: int(primary.state != primary.CLOSED)),
+}, counters={
+    'payment_gateway_calls_total': ('Gateway calls, retries included', lambda: processor.gateway_calls),
+    'payment_retries_total': ('Retries granted by the retry budget', lambda: processor.budget.retries),
+    'payment_retry_budget_exhausted_total': ('Retries denied by the retry budget',
+                                             lambda: processor.budget.exhausted),
+    'payment_fallbacks_total': ('Batches routed to the fallback processor', lambda: processor.fallbacks),
+    'payment_idempotent_replays_total': ('Payments answered from the idempotency store', lambda: processor.replays),
+})
+
+STATUS_CODES = {'processed': 200, 'declined': 402, 'failed': 503, 'unknown': 504}
 
 @app.route('/health')
 def health():
-    return jsonify({'status': 'healthy', 'service': 'payment-service'})
+    return jsonify({'status': 'healthy' if primary.state == primary.CLOSED else 'degraded',
+                    'service': 'payment-service', 'payments': processor.stats()})
+
+def _configured():
+    if GATEWAY_URL.startswith('stub://') or STRIPE_API_KEY:
+        return True
+    logger.error("Payment gateway configuration missing: API key not found")
+    return False
 
 @app.route('/payments', methods=['POST'])
 def process_payment():
-    payment_data = request.json
-    
-    if not STRIPE_API_KEY:
-        logger.error("Payment gateway configuration missing: API key not found")
+    payment_data = request.get_json(silent=True)
+    if not isinstance(payment_data, dict):
+        return jsonify({'error': 'expected a JSON payment object'}), 400
+    if not _configured():
         return jsonify({'error': 'Configuration error'}), 500
-    
+
     try:
-        # Simulate external API call that fails
-        if random.random() < 0.3:
-            logger.error("Stripe API returned 503: Service temporarily unavailable")
-            return jsonify({'error': 'Payment gateway unavailable'}), 503
-        
-        # Simulate authentication failures
-        if random.random() < 0.2:
-            logger.error("Payment authentication failed: Invalid merchant credentials")
-            return jsonify({'error': 'Authentication failed'}), 401
-        
-        return jsonify({'payment_id': payment_data.get('id'), 'status': 'processed'})
-    
+        result = processor.authorize(payment_data, request.headers.get('Idempotency-Key'))
+        return jsonify(dict(result, payment_id=payment_data.get('id'))), STATUS_CODES[result['status']]
+
     except Exception as e:
         logger.error(f"Payment processing failed: {str(e)}")
         return jsonify({'error': 'Payment failed'}), 500
 
+@app.route('/payments/batch', methods=['POST'])
+def process_payment_batch():
+    """Authorize up to MAX_BATCH payments with one gateway round trip per 100
+
+    Body: {"payments": [...]} (or a bare list). Always 200 with a result per
+    payment, in order; each is idempotent on its own key.
+    """
+    body = request.get_json(silent=True)
+    payments = body.get('payments') if isinstance(body, dict) else body
+    if not isinstance(payments, list) or not all(isinstance(p, dict) for p in payments):
+        return jsonify({'error': 'expected {"payments": [payment objects]}'}), 400
+    if len(payments) > MAX_BATCH:
+        return jsonify({'error': f'at most {MAX_BATCH} payments per batch'}), 413
+    if not _configured():
+        return jsonify({'error': 'Configuration error'}), 500
+
+    try:
+        results = processor.authorize_batch(payments)
+    except Exception as e:
+        logger.error(f"Payment batch processing failed: {str(e)}")
+        return jsonify({'error': 'Payment failed'}), 500
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return jsonify({'results': results, 'summary': summary})
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8004)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=8004)
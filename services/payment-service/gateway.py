@@ -0,0 +1,427 @@
+# services/payment-service/gateway.py
+import argparse
+import hashlib
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class GatewayError(Exception):
+    """A gateway call failed
+
+    `retryable` failures (5xx, 429, connection errors) may be retried or
+    routed to the fallback; others (declines, bad credentials) may not.
+    `ambiguous` failures (read timeouts, 500s) may have charged the card, so
+    they are only ever retried against the same gateway with the same
+    idempotency keys, never sent to the fallback.
+    """
+
+    def __init__(self, message, status=None, retryable=True, ambiguous=False):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.ambiguous = ambiguous
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` failures in a row -> half-open
+    after `reset_timeout` seconds, where a single probe call decides whether
+    to close again or re-open"""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=10.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go through; every True must be followed by record_*()"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                self.rejected += 1
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+                self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                logger.error(f"Circuit for {self.name} opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self.opens += 1
+
+    def stats(self):
+        return {'state': self.state, 'failures': self.failures, 'opens': self.opens, 'rejected': self.rejected}
+
+
+class RetryBudget:
+    """Caps retries at `ratio` of first attempts, plus `min_per_second`
+
+    Every first attempt deposits `ratio` of a token and every retry
+    withdraws one, so a failing gateway sees at most (1 + ratio) times the
+    normal load instead of max_attempts times it.
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=5.0, clock=time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.clock = clock
+        self.cap = max(min_per_second * 10, 10.0)
+        self.tokens = self.cap
+        self.retries = 0
+        self.exhausted = 0
+        self._refilled = clock()
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.cap, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.cap, self.tokens + (now - self._refilled) * self.min_per_second)
+            self._refilled = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.retries += 1
+                return True
+            self.exhausted += 1
+            return False
+
+    def stats(self):
+        return {'tokens': round(self.tokens, 2), 'retries': self.retries, 'exhausted': self.exhausted}
+
+
+def full_jitter(attempt, base=0.05, cap=1.0, rng=random):
+    """Backoff before retry `attempt` (0-based): uniform in [0, min(cap, base * 2**attempt)]"""
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class GatewayClient:
+    """HTTP payment gateway: POST {base_url}/v1/authorizations over a pooled session
+
+    The body carries every payment of the batch with its own idempotency key;
+    the Idempotency-Key header covers the request as a whole.
+    """
+
+    def __init__(self, name, base_url, api_key=None, connect_timeout=0.5, read_timeout=2.0, pool_size=20):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if api_key:
+            self.session.headers['Authorization'] = f"Bearer {api_key}"
+
+    def authorize(self, payments, idempotency_key):
+        try:
+            response = self.session.post(f"{self.base_url}/v1/authorizations", json={'payments': payments},
+                                         headers={'Idempotency-Key': idempotency_key}, timeout=self.timeout)
+        except requests.ReadTimeout as e:
+            raise GatewayError(f"{self.name} timed out: {e}", ambiguous=True) from e
+        except requests.RequestException as e:
+            raise GatewayError(f"{self.name} unreachable: {e}") from e
+        if response.status_code in (429, 502, 503):
+            raise GatewayError(f"{self.name} returned {response.status_code}", status=response.status_code)
+        if response.status_code >= 500:
+            raise GatewayError(f"{self.name} returned {response.status_code}", status=response.status_code,
+                               ambiguous=True)
+        if response.status_code >= 400:
+            raise GatewayError(f"{self.name} rejected the request: {response.status_code} {response.text[:200]}",
+                               status=response.status_code, retryable=False)
+        return response.json()['results']
+
+
+class StubGateway:
+    """In-process gateway with injectable latency, 503s, timeouts and declines
+
+    A 503 is answered before charging anything; a timeout happens after the
+    charges went through, as the ambiguous case does in production. Charges
+    are idempotent per payment key, like a real gateway, so `charges` counts
+    what would actually have been billed.
+    """
+
+    def __init__(self, name='stub', latency=0.0, error_rate=0.0, timeout_rate=0.0, decline_rate=0.0, seed=None):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.decline_rate = decline_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.charges = 0
+        self._results = {}  # payment idempotency key -> result
+        self._lock = threading.Lock()
+
+    def authorize(self, payments, idempotency_key):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            if self.rng.random() < self.error_rate:
+                raise GatewayError(f"{self.name} returned 503: Service temporarily unavailable", status=503)
+            results = []
+            for payment in payments:
+                key = payment['idempotency_key']
+                result = self._results.get(key)
+                if result is None:
+                    declined = self.rng.random() < self.decline_rate
+                    if not declined:
+                        self.charges += 1
+                    result = self._results[key] = {
+                        'id': payment.get('id'),
+                        'status': 'declined' if declined else 'processed',
+                        'authorization': None if declined else f"{self.name}_{uuid.uuid4().hex[:12]}",
+                    }
+                results.append(result)
+            if self.rng.random() < self.timeout_rate:
+                raise GatewayError(f"{self.name} timed out", ambiguous=True)
+            return results
+
+
+def make_stub_app(stub):
+    """Flask app serving a StubGateway over HTTP, for exercising GatewayClient"""
+    from flask import Flask, jsonify, request
+
+    app = Flask(f"{stub.name}_gateway")
+
+    @app.route('/v1/authorizations', methods=['POST'])
+    def authorizations():
+        try:
+            results = stub.authorize(request.json['payments'], request.headers.get('Idempotency-Key'))
+        except GatewayError as e:
+            return jsonify({'error': str(e)}), e.status or (500 if e.ambiguous else 503)
+        return jsonify({'results': results})
+
+    return app
+
+
+def make_gateway(name, url, api_key=None, **options):
+    """Gateway for `url`: stub://?latency=0.05&error_rate=0.3&timeout_rate=0.01, or an http(s) base URL"""
+    if url.startswith('stub://'):
+        params = dict(part.split('=', 1) for part in url.partition('?')[2].split('&') if '=' in part)
+        return StubGateway(name, **{key: float(value) for key, value in params.items()})
+    return GatewayClient(name, url, api_key=api_key, **options)
+
+
+class _Attempt:
+    """An in-flight authorization of one idempotency key that concurrent requests wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class PaymentProcessor:
+    """Routes payment batches to the primary gateway, else the fallback
+
+    Each gateway has its own circuit breaker. Retryable failures are retried
+    with full-jitter backoff while the shared retry budget allows it. Every
+    payment carries an idempotency key; settled results are remembered for
+    `idempotency_ttl` seconds and concurrent attempts with the same key wait
+    for the first, so client retries and overlapping batches never charge
+    twice. A waiter whose leader didn't settle gets the leader's outcome:
+    'unknown' if the card may have been charged, never a plain 'failed'.
+    """
+
+    def __init__(self, primary, fallback=None, max_attempts=3, base_backoff=0.05, max_backoff=1.0,
+                 failure_threshold=5, reset_timeout=10.0, retry_budget=None, max_batch=100,
+                 idempotency_ttl=24 * 3600, max_keys=100000, clock=time.monotonic):
+        self.gateways = [gateway for gateway in (primary, fallback) if gateway is not None]
+        self.breakers = {gateway.name: CircuitBreaker(gateway.name, failure_threshold, reset_timeout, clock)
+                         for gateway in self.gateways}
+        self.budget = retry_budget if retry_budget is not None else RetryBudget(clock=clock)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_batch = max_batch
+        self.idempotency_ttl = idempotency_ttl
+        self.max_keys = max_keys
+        self.clock = clock
+        self._results = OrderedDict()  # idempotency key -> (expires_at, result)
+        self._inflight = {}            # idempotency key -> _Attempt finished when it returns
+        self._lock = threading.Lock()
+        self.gateway_calls = 0
+        self.fallbacks = 0
+        self.replays = 0
+
+    @staticmethod
+    def idempotency_key(payment, key=None):
+        """Caller's key, else one derived from the payment id (else random: no protection)"""
+        if key or payment.get('idempotency_key'):
+            return str(key or payment['idempotency_key'])
+        if payment.get('id') is not None:
+            return f"payment:{payment['id']}"
+        return f"anon:{uuid.uuid4().hex}"
+
+    def authorize(self, payment, key=None):
+        return self.authorize_batch([payment], [key])[0]
+
+    def authorize_batch(self, payments, keys=None):
+        """One result dict per payment, in order; gateways see one call per max_batch payments"""
+        keys = [self.idempotency_key(payment, key) for payment, key in zip(payments, keys or [None] * len(payments))]
+        results = [None] * len(payments)
+        claimed, waiting = [], []
+        with self._lock:
+            now = self.clock()
+            for i, key in enumerate(keys):
+                entry = self._results.get(key)
+                if entry is not None and entry[0] > now:
+                    results[i] = dict(entry[1], replayed=True)
+                    self.replays += 1
+                elif key in self._inflight:
+                    waiting.append((i, self._inflight[key]))
+                else:
+                    self._inflight[key] = _Attempt()
+                    claimed.append(i)
+
+        try:
+            for start in range(0, len(claimed), self.max_batch):
+                chunk = claimed[start:start + self.max_batch]
+                batch = [dict(payments[i], idempotency_key=keys[i]) for i in chunk]
+                for i, result in zip(chunk, self._call(batch)):
+                    results[i] = result
+        finally:
+            with self._lock:
+                expires = self.clock() + self.idempotency_ttl
+                for i in claimed:
+                    # Unsettled keys are not remembered, so a retry goes back to the gateway
+                    if results[i] is not None and results[i]['status'] in ('processed', 'declined'):
+                        self._results[keys[i]] = (expires, results[i])
+                        self._results.move_to_end(keys[i])
+                    attempt = self._inflight.pop(keys[i])
+                    attempt.result = results[i]
+                    attempt.done.set()
+                while len(self._results) > self.max_keys:
+                    self._results.popitem(last=False)
+
+        for i, attempt in waiting:
+            attempt.done.wait(self.max_attempts * (self.max_backoff + 5))
+            with self._lock:
+                entry = self._results.get(keys[i])
+                if entry is not None:
+                    self.replays += 1
+            if entry is not None:
+                results[i] = dict(entry[1], replayed=True)
+            elif attempt.result is not None and attempt.result['status'] == 'failed':
+                results[i] = {'id': payments[i].get('id'), 'status': 'failed', 'error': attempt.result['error']}
+            else:
+                # Still running, ended 'unknown' or raised: the card may have been charged
+                results[i] = {'id': payments[i].get('id'), 'status': 'unknown',
+                              'error': 'a concurrent attempt with this idempotency key did not settle; '
+                                       'retry with the same idempotency key'}
+        for i, key in enumerate(keys):
+            results[i]['idempotency_key'] = key
+        return results
+
+    def _call(self, batch):
+        """Results for one gateway batch; failures become per-payment failed/unknown results"""
+        key = hashlib.sha256('\n'.join(payment['idempotency_key'] for payment in batch).encode()).hexdigest()
+        self.budget.deposit()
+        error = None
+        # Sticky: once any attempt may have charged, later errors (a 503 on the
+        # retry, say) don't make the fallback or a plain 'failed' safe again
+        ambiguous = False
+        for gateway in self.gateways:
+            if gateway is not self.gateways[0]:
+                if ambiguous:
+                    break
+                self.fallbacks += 1
+                logger.warning(f"Routing {len(batch)} payments to fallback processor {gateway.name}")
+            breaker = self.breakers[gateway.name]
+            for attempt in range(self.max_attempts):
+                if not breaker.allow():
+                    error = error or GatewayError(f"circuit for {gateway.name} is open")
+                    break
+                try:
+                    self.gateway_calls += 1
+                    results = gateway.authorize(batch, key)
+                except GatewayError as e:
+                    error = e
+                    ambiguous = ambiguous or e.ambiguous
+                    if not e.retryable:
+                        breaker.record_success()  # the gateway answered; the request was bad
+                        logger.error(f"Payment gateway {gateway.name} refused the batch: {e}")
+                        if ambiguous:
+                            return self._failed(batch, 'unknown', f"{e}; retry with the same idempotency key")
+                        return self._failed(batch, 'failed', str(e))
+                    breaker.record_failure()
+                    logger.error(f"Payment gateway {gateway.name} failed: {e}")
+                    if attempt + 1 == self.max_attempts or not self.budget.withdraw():
+                        break
+                    time.sleep(full_jitter(attempt, self.base_backoff, self.max_backoff))
+                    continue
+                except Exception:
+                    breaker.record_failure()
+                    raise
+                breaker.record_success()
+                return [dict(result, processor=gateway.name, replayed=False) for result in results]
+        if len(self.gateways) == 1 and not ambiguous:
+            logger.critical("Fallback payment processor not configured")
+        if ambiguous:
+            return self._failed(batch, 'unknown', f"{error}; retry with the same idempotency key")
+        return self._failed(batch, 'failed', str(error))
+
+    @staticmethod
+    def _failed(batch, status, message):
+        return [{'id': payment.get('id'), 'status': status, 'error': message} for payment in batch]
+
+    def stats(self):
+        return {
+            'gateways': {name: breaker.stats() for name, breaker in self.breakers.items()},
+            'retry_budget': self.budget.stats(),
+            'gateway_calls': self.gateway_calls,
+            'fallbacks': self.fallbacks,
+            'idempotent_replays': self.replays,
+            'remembered_keys': len(self._results),
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a stub payment gateway over HTTP")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per call")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="fraction of calls answered with 503")
+    parser.add_argument("--decline-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    stub = StubGateway('stub', args.latency, args.error_rate, decline_rate=args.decline_rate)
+    make_stub_app(stub).run(host='0.0.0.0', port=args.port, threaded=True)
@@ -1,34 +1,101 @@
 # services/product-service/app.py
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
 import logging
 import gc
 import random
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.metrics import instrument  # noqa: E402
+from catalog import Catalog, LRUCache, ProductStore, RedisTier  # noqa: E402
+from search import SearchIndex, load_products  # noqa: E402
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Memory leak simulation
-memory_hog = []
+# Read-through catalog cache; TTL mirrors cache_settings.default_ttl in config/redis.yaml
+CACHE_MAX_BYTES = int(os.environ.get('PRODUCT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+CACHE_TTL = int(os.environ.get('PRODUCT_CACHE_TTL', 3600))
+REDIS_URL = os.environ.get('PRODUCT_CACHE_REDIS_URL')
+# Local .json/.jsonl/.csv catalog; the synthetic store is used when unset
+CATALOG_PATH = os.environ.get('PRODUCT_CATALOG_PATH')
+
+catalog = Catalog(
+    ProductStore(products=load_products(CATALOG_PATH) if CATALOG_PATH else None),
+    LRUCache(max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL),
+    RedisTier.from_url(REDIS_URL, ttl=CACHE_TTL) if REDIS_URL else None,
+)
+cache = catalog.cache
+
+search_index = SearchIndex()
+search_index.add_many(catalog.store)
+catalog.store.loads = 0
+logger.info(f"Indexed {len(search_index)} products for search")
+
+instrument(app, 'product-service', gauges={
+    'catalog_cache_bytes': ('Bytes held by the catalog cache', lambda: cache.bytes),
+    'catalog_cache_entries': ('Entries in the catalog cache', lambda: len(cache)),
+    'search_index_products': ('Products in the search index', lambda: len(search_index)),
+}, counters={
+    'catalog_cache_hits_total': ('Catalog cache hits', lambda: cache.hits),
+    'catalog_cache_misses_total': ('Catalog cache misses', lambda: cache.misses),
+    'catalog_cache_evictions_total': ('Catalog cache LRU evictions', lambda: cache.evictions),
+})
 
 @app.route('/health')
 def health():
-    return jsonify({'status': 'healthy', 'service': 'product-service'})
+    return jsonify({'status': 'healthy', 'service': 'product-service', 'cache': catalog.stats()})
 
 @app.route('/products')
 def get_products():
-    global memory_hog
-    
-    # Simulate memory leak
-    for i in range(1000):
-        memory_hog.append([0] * 1000)  # Intentional memory leak
-    
     # Simulate image processing errors
     if random.random() < 0.2:
         logger.error("OutOfMemoryError: Java heap space in image processing")
         return jsonify({'error': 'Memory exhausted'}), 500
-    
-    return jsonify({'products': ['Product 1', 'Product 2']})
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    return Response(catalog.page_json(page, per_page), mimetype='application/json')
+
+@app.route('/products/search')
+def search_products():
+    """/products/search?q=smart hea&category=electronics&min_price=10&max_price=99&limit=10&facets=1"""
+    result = search_index.search(
+        request.args.get('q', ''),
+        category=request.args.get('category') or None,
+        min_price=request.args.get('min_price', type=float),
+        max_price=request.args.get('max_price', type=float),
+        limit=min(max(request.args.get('limit', 10, type=int), 1), 100),
+        facets=request.args.get('facets', '0') not in ('0', 'false', ''),
+    )
+    return jsonify(result)
+
+@app.route('/products/search/index', methods=['POST'])
+def index_products():
+    """Add or update products in the catalog and the search index without a rebuild"""
+    products = request.get_json(silent=True)
+    if isinstance(products, dict):
+        products = [products]
+    try:
+        products = [dict(product, id=int(product['id'])) for product in products]
+        for product in products:
+            float(product.get('price') or 0), float(product.get('rating') or 0)
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'expected a product object or list with integer ids and numeric prices'}), 400
+    # Catalog first, so a product is never found by search but missing from /products/<id>
+    for product in products:
+        catalog.put(product)
+    search_index.add_many(products)
+    return jsonify(search_index.stats())
+
+@app.route('/products/<int:product_id>')
+def get_product(product_id):
+    body = catalog.product_json(product_id)
+    if body == b'null':
+        return jsonify({'error': 'Product not found'}), 404
+    return Response(body, mimetype='application/json')
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8002)
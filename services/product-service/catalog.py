@@ -0,0 +1,261 @@
+# services/product-service/catalog.py
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry cost of the OrderedDict node, tuple and key object, added to
+# the key/value byte lengths so the budget tracks real memory more closely
+ENTRY_OVERHEAD = 400
+
+CATEGORIES = ['electronics', 'books', 'home', 'garden', 'toys', 'sports', 'beauty', 'grocery']
+ADJECTIVES = ['Classic', 'Smart', 'Eco', 'Pro', 'Compact', 'Deluxe', 'Ultra', 'Everyday']
+NOUNS = ['Headphones', 'Lamp', 'Backpack', 'Kettle', 'Notebook', 'Sneakers', 'Blender', 'Camera']
+
+
+class ProductStore:
+    """Product "database": a loaded catalog, or a deterministic synthetic one"""
+
+    def __init__(self, count=50000, seed=7, load_delay=0.0, products=None):
+        self.products = None
+        self.overrides = {}  # product id -> product put() over the synthetic catalog
+        if products is not None:
+            self.products = {int(product['id']): product for product in products}
+            count = max(self.products, default=0)
+        self.count = count
+        self.seed = seed
+        self.load_delay = load_delay
+        self.loads = 0
+
+    def get(self, product_id):
+        self.loads += 1
+        if self.load_delay:
+            time.sleep(self.load_delay)
+        if self.products is not None:
+            return self.products.get(product_id)
+        if product_id in self.overrides:
+            return self.overrides[product_id]
+        if not 1 <= product_id <= self.count:
+            return None
+        rng = random.Random(self.seed * 1_000_003 + product_id)
+        return {
+            'id': product_id,
+            'name': f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {product_id}",
+            'category': rng.choice(CATEGORIES),
+            'price': round(rng.uniform(2, 500), 2),
+            'stock': rng.randint(0, 500),
+            'rating': round(rng.uniform(1, 5), 1),
+        }
+
+    def put(self, product):
+        """Add or replace a product (synthetic catalogs keep their id range for paging)"""
+        product_id = int(product['id'])
+        if self.products is not None:
+            self.products[product_id] = product
+            self.count = max(self.count, product_id)
+        else:
+            self.overrides[product_id] = product
+
+    def page(self, page, per_page):
+        first = (page - 1) * per_page + 1
+        products = (self.get(product_id) for product_id in range(first, min(first + per_page, self.count + 1)))
+        return [product for product in products if product is not None]
+
+    def __iter__(self):
+        """Every product, for building the search index"""
+        if self.products is not None:
+            return iter(self.products.values())
+        extra = (product for product_id, product in self.overrides.items() if not 1 <= product_id <= self.count)
+        return itertools.chain((self.get(product_id) for product_id in range(1, self.count + 1)), extra)
+
+
+class LRUCache:
+    """Thread-safe LRU of serialized values with a TTL and a hard byte budget"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=3600, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] <= self.clock():
+                self._remove(key, entry)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = len(key) + len(value) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._entries[key] = (value, self.clock() + self.ttl, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, entry = self._entries.popitem(last=False)
+                self.bytes -= entry[2]
+                self.evictions += 1
+        return True
+
+    def _remove(self, key, entry):
+        del self._entries[key]
+        self.bytes -= entry[2]
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._remove(key, entry)
+
+    def delete_prefix(self, prefix):
+        """Drop every entry whose key starts with `prefix` (a scan of all entries)"""
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                self._remove(key, self._entries[key])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class RedisTier:
+    """Optional shared second tier; any Redis error counts as a miss"""
+
+    def __init__(self, client, ttl=3600, prefix='catalog:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url, ttl=3600, timeout=0.05):
+        import redis
+        client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        return cls(client, ttl)
+
+    def get(self, key):
+        try:
+            value = self.client.get(self.prefix + key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis cache read failed: {e}")
+            return None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        try:
+            self.client.set(self.prefix + key, value, ex=self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis cache write failed: {e}")
+
+    def delete(self, key):
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis cache delete failed: {e}")
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'errors': self.errors}
+
+
+class Catalog:
+    """Read-through product catalog: local LRU, then Redis (if any), then the store
+
+    Values are cached as encoded JSON so hits go straight into the response
+    body without re-serializing.
+    """
+
+    def __init__(self, store=None, cache=None, redis_tier=None):
+        self.store = store if store is not None else ProductStore()
+        self.cache = cache if cache is not None else LRUCache()
+        self.redis = redis_tier
+
+    def _read_through(self, key, load):
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+        if self.redis is not None:
+            value = self.redis.get(key)
+        if value is None:
+            value = json.dumps(load(), separators=(',', ':')).encode()
+            if self.redis is not None:
+                self.redis.set(key, value)
+        self.cache.set(key, value)
+        return value
+
+    def product_json(self, product_id):
+        """Encoded product, or b'null' if it doesn't exist (misses are cached too)"""
+        return self._read_through(f"product:{product_id}", lambda: self.store.get(product_id))
+
+    def put(self, product):
+        """Write a product to the store and drop its cached copies
+
+        Cached pages are dropped locally too. Pages in Redis are left to
+        expire, since they can't be found without a key scan.
+        """
+        self.store.put(product)
+        key = f"product:{int(product['id'])}"
+        self.cache.delete(key)
+        self.cache.delete_prefix("products:")
+        if self.redis is not None:
+            self.redis.delete(key)
+
+    def page_json(self, page=1, per_page=20):
+        return self._read_through(
+            f"products:{page}:{per_page}",
+            lambda: {'page': page, 'per_page': per_page, 'products': self.store.page(page, per_page)},
+        )
+
+    def stats(self):
+        stats = {'local': self.cache.stats(), 'store_loads': self.store.loads}
+        if self.redis is not None:
+            stats['redis'] = self.redis.stats()
+        return stats
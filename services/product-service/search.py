@@ -0,0 +1,345 @@
+# services/product-service/search.py
+import bisect
+import csv
+import heapq
+import json
+import logging
+import math
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r'[a-z0-9]+')
+MAX_PREFIX_TERMS = 64
+PREFIX_CACHE_BYTES = 16 * 1024 * 1024
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens; bare numbers (ids, sizes) are not indexed"""
+    return [token for token in TOKEN.findall(str(text).lower()) if not token.isdigit()]
+
+
+def load_products(path):
+    """Products from a .json (list), .jsonl or .csv file"""
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            return list(csv.DictReader(f))
+    with open(path) as f:
+        if path.endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    return data['products'] if isinstance(data, dict) else data
+
+
+def _contains(sorted_docs, candidates):
+    """Mask of `candidates` present in the sorted array `sorted_docs`"""
+    positions = np.searchsorted(sorted_docs, candidates)
+    positions[positions == len(sorted_docs)] = 0
+    return sorted_docs[positions] == candidates
+
+
+def _top_k(scores, k):
+    """Indices of the k highest scores, best first
+
+    Large candidate sets are first cut down to those above a threshold
+    estimated from a sample, so the partial sort only sees a few k rows.
+    """
+    if len(scores) > 64 * k:
+        sample = scores[::len(scores) // (32 * k)]
+        threshold = np.partition(sample, len(sample) - 2)[len(sample) - 2]
+        candidates = np.flatnonzero(scores >= threshold)
+        if len(candidates) >= k:
+            top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            return top[np.argsort(-scores[top], kind='stable')]
+    top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+class SearchIndex:
+    """Incremental inverted index over product name/category with facet columns
+
+    Every indexed product gets a doc number; postings are array('i') lists of
+    doc numbers in insertion order, so they are already sorted and
+    intersections run on zero-copy NumPy views. A forward index (the term ids
+    of each doc, concatenated, with per-doc offsets) lets a wide prefix be
+    checked against a few candidates in one vectorized pass. Price, rating,
+    category and liveness live in parallel typed arrays. Updating a product
+    drops the old doc from its postings and appends a new one, so nothing is
+    rebuilt; compact() reclaims the dead rows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._term_ids = {}       # term -> term id
+        self._term_names = []     # term id -> term
+        self._postings = []       # term id -> array('i') of doc numbers
+        self._terms = []          # sorted terms with live postings, for prefix lookups
+        self._forward = array('i')       # term ids of every doc, concatenated
+        self._offsets = array('q', [0])  # doc number -> start of its run in _forward
+        self._categories = {}     # category -> code
+        self._category_names = []
+        self._docs = {}           # product id -> live doc number
+        self._ids = array('q')    # doc number -> product id
+        self._names = []          # doc number -> display name
+        self._price = array('f')
+        self._rating = array('f')
+        self._category = array('h')
+        self._alive = array('b')
+        self._prefix_cache = OrderedDict()  # prefix -> union of its expansions
+        self._prefix_cache_bytes = 0
+        self.dead = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, product):
+        """Index (or re-index) one product dict with id, name, category, price, rating"""
+        with self._lock:
+            self._add(product)
+
+    def add_many(self, products):
+        with self._lock:
+            for product in products:
+                self._add(product)
+
+    def remove(self, product_id):
+        with self._lock:
+            doc = self._docs.pop(product_id, None)
+            if doc is not None:
+                self._unpost(doc)
+            return doc is not None
+
+    def _invalidate(self):
+        if self._prefix_cache:
+            self._prefix_cache.clear()
+            self._prefix_cache_bytes = 0
+
+    def _unpost(self, doc):
+        """Tombstone a doc and drop it from its postings, so queries never see it"""
+        self._invalidate()
+        self._alive[doc] = 0
+        self.dead += 1
+        for term_id in self._forward[self._offsets[doc]:self._offsets[doc + 1]]:
+            postings = self._postings[term_id]
+            position = int(np.searchsorted(np.frombuffer(postings, dtype=np.int32), np.int32(doc)))
+            del postings[position]
+            if not postings:
+                del self._terms[bisect.bisect_left(self._terms, self._term_names[term_id])]
+
+    def _add(self, product):
+        self._invalidate()
+        product_id = int(product['id'])
+        old = self._docs.get(product_id)
+        if old is not None:
+            self._unpost(old)
+        doc = len(self._ids)
+        self._docs[product_id] = doc
+        self._ids.append(product_id)
+        name = product.get('name', '')
+        self._names.append(name)
+        category = str(product.get('category', ''))
+        code = self._categories.get(category)
+        if code is None:
+            code = self._categories[category] = len(self._category_names)
+            self._category_names.append(category)
+        self._category.append(code)
+        self._price.append(float(product.get('price') or 0))
+        self._rating.append(float(product.get('rating') or 0))
+        self._alive.append(1)
+        for term in set(tokenize(name) + tokenize(category)):
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                term_id = self._term_ids[term] = len(self._term_names)
+                self._term_names.append(term)
+                self._postings.append(array('i'))
+            postings = self._postings[term_id]
+            if not postings:
+                bisect.insort(self._terms, term)
+            postings.append(doc)
+            self._forward.append(term_id)
+        self._offsets.append(len(self._forward))
+
+    def compact(self):
+        """Rebuild without tombstoned docs (only needed after many updates)"""
+        with self._lock:
+            live = [
+                {'id': self._ids[doc], 'name': self._names[doc], 'category': self._category_names[self._category[doc]],
+                 'price': self._price[doc], 'rating': self._rating[doc]}
+                for doc in sorted(self._docs.values())
+            ]
+            fresh = SearchIndex()
+            for product in live:
+                fresh._add(product)
+            fresh._lock = self._lock
+            self.__dict__.update(fresh.__dict__)
+
+    def search(self, query='', category=None, min_price=None, max_price=None, limit=10, facets=False):
+        """Top `limit` live products matching every query term (the last one as a prefix)
+
+        Results are ranked by rating, boosted when the last term matched a
+        whole word rather than only a prefix of one. Returns {'total',
+        'results'}, plus 'facets' (matches per category before the category
+        filter) when asked for, since counting them touches every match.
+        """
+        with self._lock:
+            # NumPy views pin the arrays' buffers; keep them inside _search so
+            # they are released before another thread can append
+            return self._search(tokenize(query), category, min_price, max_price, limit, facets)
+
+    def _view(self, term_id):
+        return np.frombuffer(self._postings[term_id], dtype=np.int32)
+
+    def _expand(self, prefix):
+        """Ids of the MAX_PREFIX_TERMS most frequent terms starting with `prefix`"""
+        start = end = bisect.bisect_left(self._terms, prefix)
+        while end < len(self._terms) and self._terms[end].startswith(prefix):
+            end += 1
+        term_ids = [self._term_ids[term] for term in self._terms[start:end]]
+        if len(term_ids) > MAX_PREFIX_TERMS:
+            term_ids = heapq.nlargest(MAX_PREFIX_TERMS, term_ids, key=lambda term_id: len(self._postings[term_id]))
+        return term_ids
+
+    def _union(self, term_ids):
+        lists = [self._view(term_id) for term_id in term_ids]
+        if sum(len(docs) for docs in lists) * 8 > len(self._ids):
+            # Dense union: mark a flag per doc instead of sorting
+            seen = np.zeros(len(self._ids), dtype=bool)
+            for docs in lists:
+                seen[docs] = True
+            return np.flatnonzero(seen).astype(np.int32)
+        merged = np.sort(np.concatenate(lists))
+        keep = np.empty(len(merged), dtype=bool)
+        keep[0] = True
+        np.not_equal(merged[1:], merged[:-1], out=keep[1:])
+        return merged[keep]
+
+    def _prefix_docs(self, prefix, term_ids):
+        """Docs matching any expansion of `prefix`; unions are cached until the next write"""
+        if len(term_ids) == 1:
+            return self._view(term_ids[0])
+        docs = self._prefix_cache.get(prefix)
+        if docs is not None:
+            self._prefix_cache.move_to_end(prefix)
+            return docs
+        docs = self._union(term_ids)
+        self._prefix_cache[prefix] = docs
+        self._prefix_cache_bytes += docs.nbytes
+        while self._prefix_cache_bytes > PREFIX_CACHE_BYTES and len(self._prefix_cache) > 1:
+            _, evicted = self._prefix_cache.popitem(last=False)
+            self._prefix_cache_bytes -= evicted.nbytes
+        return docs
+
+    def _has_terms(self, docs, term_ids):
+        """Mask of `docs` containing any of `term_ids`, read from the forward index"""
+        offsets = np.frombuffer(self._offsets, dtype=np.int64)
+        starts = offsets[docs]
+        counts = offsets[docs + 1] - starts
+        owners = np.repeat(np.arange(len(docs)), counts)
+        positions = np.arange(len(owners)) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        found = np.isin(np.frombuffer(self._forward, dtype=np.int32)[positions], term_ids)
+        hit = np.zeros(len(docs), dtype=bool)
+        hit[owners[found]] = True
+        return hit
+
+    def _search(self, terms, category, min_price, max_price, limit, facets):
+        result = {'total': 0, 'results': []}
+        if facets:
+            result['facets'] = {}
+        if not self._docs:
+            return result
+
+        # Whole words are intersected smallest first, probing the longer
+        # postings by binary search. The trailing prefix then filters those
+        # candidates through the forward index, or on its own is the union of
+        # its expansions.
+        exact = None
+        if terms:
+            words = []
+            for term in terms[:-1]:
+                term_id = self._term_ids.get(term)
+                if term_id is None or not self._postings[term_id]:
+                    return result
+                words.append(self._view(term_id))
+            expansions = self._expand(terms[-1])
+            if not expansions:
+                return result
+            if len(expansions) > 1:
+                term_id = self._term_ids.get(terms[-1])
+                if term_id is not None and self._postings[term_id]:
+                    exact = self._view(term_id)
+            if words:
+                words.sort(key=len)
+                docs = words[0]
+                for other in words[1:]:
+                    docs = docs[_contains(other, docs)]
+                # Reading a candidate's terms costs about as much as one
+                # union element per term; the union is cached for later queries
+                if len(expansions) == 1 or terms[-1] in self._prefix_cache or (
+                        sum(len(self._postings[term_id]) for term_id in expansions)
+                        < len(docs) * len(self._forward) / len(self._ids)):
+                    docs = docs[_contains(self._prefix_docs(terms[-1], expansions), docs)]
+                else:
+                    docs = docs[self._has_terms(docs, np.array(expansions, dtype=np.int32))]
+            else:
+                docs = self._prefix_docs(terms[-1], expansions)
+        else:
+            # No terms: browse everything that is still live
+            docs = np.flatnonzero(np.frombuffer(self._alive, dtype=np.int8)).astype(np.int32)
+
+        if min_price is not None or max_price is not None:
+            prices = np.frombuffer(self._price, dtype=np.float32)[docs]
+            mask = np.ones(len(docs), dtype=bool)
+            if min_price is not None:
+                mask &= prices >= min_price
+            if max_price is not None:
+                mask &= prices <= max_price
+            docs = docs[mask]
+
+        if facets or category is not None:
+            codes = np.frombuffer(self._category, dtype=np.int16)[docs]
+            if facets:
+                counts = np.bincount(codes, minlength=len(self._category_names))
+                result['facets'] = {self._category_names[code]: int(count)
+                                    for code, count in enumerate(counts) if count}
+            if category is not None:
+                docs = docs[codes == self._categories.get(category, -1)]
+
+        result['total'] = total = len(docs)
+        if not total:
+            return result
+
+        # Static rank: rating, plus a boost when the last term matched exactly
+        scores = np.frombuffer(self._rating, dtype=np.float32)[docs]
+        if exact is not None:
+            idf = math.log(1 + len(self._docs) / len(exact))
+            scores = scores + np.float32(idf) * _contains(exact, docs)
+        for i in _top_k(scores, limit):
+            doc = int(docs[i])
+            result['results'].append({
+                'id': self._ids[doc],
+                'name': self._names[doc],
+                'category': self._category_names[self._category[doc]],
+                'price': round(self._price[doc], 2),
+                'rating': round(self._rating[doc], 1),
+                'score': round(float(scores[i]), 3),
+            })
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'products': len(self._docs),
+                'docs': len(self._ids),
+                'tombstones': self.dead,
+                'terms': len(self._terms),
+                'postings': sum(len(postings) for postings in self._postings),
+                'postings_bytes': sum(len(postings) * postings.itemsize for postings in self._postings),
+                'forward_bytes': (len(self._forward) * self._forward.itemsize
+                                  + len(self._offsets) * self._offsets.itemsize),
+                'prefix_cache_bytes': self._prefix_cache_bytes,
+            }
@@ -1,42 +1,136 @@
 # services/user-service/app.py
 from flask import Flask, jsonify, request
+import asyncio
 import logging
 import time
 import random
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.metrics import instrument  # noqa: E402
+from db import PoolTimeout  # noqa: E402
+from lookup import UserLookup  # noqa: E402
+from models import UserModel  # noqa: E402
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Simulated database connection issues
 CONNECTION_POOL_SIZE = 20
-active_connections = 0
+ACQUIRE_TIMEOUT = float(os.environ.get('USER_DB_ACQUIRE_TIMEOUT', '2.0'))
+
+users = UserModel(pool_size=CONNECTION_POOL_SIZE, acquire_timeout=ACQUIRE_TIMEOUT)
+pool = users.pool
+
+# /users/<id>: concurrent requests for one id share a query, and rows are cached briefly
+lookups = UserLookup(
+    ttl=float(os.environ.get('USER_CACHE_TTL', '5')),
+    negative_ttl=float(os.environ.get('USER_NEGATIVE_CACHE_TTL', '1')),
+    max_entries=int(os.environ.get('USER_CACHE_MAX_ENTRIES', '10000')),
+    coalesce=os.environ.get('USER_COALESCE', '1') != '0',
+)
+
+instrument(app, 'user-service', gauges={
+    'db_connections_active': ('Database connections in use', lambda: pool.in_use),
+    'db_connections_max': ('Database connection pool size', lambda: pool.size),
+    'db_pool_waiting': ('Requests waiting for a connection', lambda: pool.waiting),
+    'user_cache_entries': ('Entries in the user lookup cache', lambda: len(lookups)),
+}, counters={
+    'db_pool_checkouts_total': ('Connections checked out', lambda: pool.checkouts),
+    'db_pool_timeouts_total': ('Connection acquire timeouts', lambda: pool.timeouts),
+    'db_pool_wait_seconds_total': ('Time spent waiting for a connection', lambda: pool.wait_seconds),
+    'db_pool_checkout_seconds_total': ('Time connections were checked out', lambda: pool.checkout_seconds),
+    'user_lookup_backend_queries_total': ('User lookups that ran a database query', lambda: lookups.backend_queries),
+    'user_lookup_cache_hits_total': ('User lookups answered from the cache (found and not found)',
+                                     lambda: lookups.hits + lookups.negative_hits),
+    'user_lookup_coalesced_total': ('User lookups that shared an in-flight query', lambda: lookups.coalesced),
+    'user_lookup_saved_total': ('Database queries saved by caching and coalescing', lambda: lookups.saved),
+})
 
 @app.route('/health')
 def health():
-    return jsonify({'status': 'healthy', 'service': 'user-service'})
+    return jsonify({'status': 'healthy', 'service': 'user-service', 'db_pool': pool.stats(),
+                    'user_lookup': lookups.stats()})
+
+def _user_json(row):
+    user_id, name, email, created_at = row
+    return {'user_id': str(user_id), 'name': name, 'email': email, 'created_at': created_at}
+
+class QueryTimeout(Exception):
+    """The simulated slow query failed"""
+
+def _query_user(user_id):
+    """One backend lookup: the row for `user_id` or None"""
+    with pool.connection() as conn:
+        # Simulate slow database queries (the connection stays checked out)
+        time.sleep(random.uniform(0.1, 2.0))
+
+        # Random failure for incident simulation
+        if random.random() < 0.15:
+            logger.error(f"Database timeout for user {user_id}")
+            raise QueryTimeout(user_id)
+
+        return users.get_user(user_id, conn=conn)
+
+async def _query_user_async(user_id):
+    """_query_user for the async worker: the slow query and pool waits are awaited, not slept in a thread"""
+    async with pool.connection_async() as conn:
+        await asyncio.sleep(random.uniform(0.1, 2.0))
+
+        if random.random() < 0.15:
+            logger.error(f"Database timeout for user {user_id}")
+            raise QueryTimeout(user_id)
+
+        return users.get_user(user_id, conn=conn)
 
 @app.route('/users/<user_id>')
 def get_user(user_id):
-    global active_connections
-    
-    # Simulate connection pool exhaustion
-    if active_connections >= CONNECTION_POOL_SIZE:
-        logger.error(f"Connection pool exhausted: {active_connections}/{CONNECTION_POOL_SIZE}")
-        return jsonify({'error': 'Database unavailable'}), 503
-    
-    active_connections += 1
-    
-    # Simulate slow database queries
-    time.sleep(random.uniform(0.1, 2.0))
-    
-    # Random failure for incident simulation
-    if random.random() < 0.15:
-        logger.error(f"Database timeout for user {user_id}")
+    try:
+        row = lookups.get(user_id, lambda: _query_user(user_id))
+    except QueryTimeout:
         return jsonify({'error': 'Query timeout'}), 500
-    
-    active_connections -= 1
-    return jsonify({'user_id': user_id, 'name': f'User {user_id}'})
+    except PoolTimeout as e:
+        logger.error(f"Connection pool exhausted: {e}")
+        return jsonify({'error': 'Database unavailable'}), 503
+
+    if row is None:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify(_user_json(row))
+
+async def get_user_async(user_id):
+    try:
+        row = await lookups.get_async(user_id, lambda: _query_user_async(user_id))
+    except QueryTimeout:
+        return {'error': 'Query timeout'}, 500
+    except PoolTimeout as e:
+        logger.error(f"Connection pool exhausted: {e}")
+        return {'error': 'Database unavailable'}, 503
+
+    if row is None:
+        return {'error': 'User not found'}, 404
+    return _user_json(row), 200
+
+# Endpoints the async worker (scripts/serve.py --worker-class async) serves natively;
+# everything else still goes through Flask
+async_views = {'get_user': get_user_async}
+
+@app.route('/users')
+def get_users():
+    """Batch lookup: /users?ids=1,2,3"""
+    try:
+        ids = [int(part) for part in request.args.get('ids', '').split(',') if part.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids must be comma-separated integers'}), 400
+    try:
+        rows = users.get_users(ids)
+    except PoolTimeout as e:
+        logger.error(f"Connection pool exhausted: {e}")
+        return jsonify({'error': 'Database unavailable'}), 503
+    return jsonify({
+        'users': [_user_json(rows[user_id]) for user_id in ids if user_id in rows],
+        'missing': [user_id for user_id in ids if user_id not in rows],
+    })
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8001)
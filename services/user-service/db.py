@@ -0,0 +1,246 @@
+# services/user-service/db.py
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the acquire timeout"""
+
+
+class ConnectionPool:
+    """Bounded checkout/checkin pool of SQLite connections in WAL mode
+
+    Connections are opened lazily up to `size` and reused LIFO so the warmest
+    statement caches are used first. `acquire()` waits up to `acquire_timeout`
+    seconds for a free connection before raising PoolTimeout. Coroutines use
+    acquire_async(), which waits on the event loop instead of blocking a
+    thread, so sync and async callers share one pool.
+    """
+
+    def __init__(self, path, size=20, acquire_timeout=5.0, statement_cache=64):
+        self.path = path
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.statement_cache = statement_cache
+        self._idle = []
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._async_waiters = deque()  # futures of coroutines waiting in acquire_async()
+
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.acquire_timeout, check_same_thread=False,
+                               cached_statements=self.statement_cache)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def acquire(self, timeout=None):
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = start + timeout
+        with self._cond:
+            while not self._idle and self._created >= self.size:
+                if self._closed:
+                    raise PoolTimeout("connection pool is closed")
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"no connection free after {timeout:.1f}s ({self.in_use}/{self.size} in use)")
+                self.waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            conn = self._checkout(start)
+        return conn if conn is not None else self._open_new()
+
+    async def acquire_async(self, timeout=None):
+        """acquire() for coroutines: waiting for a free connection doesn't hold a thread"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = start + timeout
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._idle or self._created < self.size:
+                    conn = self._checkout(start)
+                    break
+                if self._closed:
+                    raise PoolTimeout("connection pool is closed")
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"no connection free after {timeout:.1f}s ({self.in_use}/{self.size} in use)")
+                waiter = loop.create_future()
+                self._async_waiters.append(waiter)
+                self.waiting += 1
+            cancelled = False
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), remaining)
+            except asyncio.TimeoutError:
+                pass  # re-check once more: a connection may have been freed just now
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            finally:
+                with self._cond:
+                    self.waiting -= 1
+                    try:
+                        self._async_waiters.remove(waiter)
+                    except ValueError:
+                        # Already picked by release(); hand the wake-up on if we won't use it
+                        if cancelled:
+                            self._wake_async()
+                    waiter.cancel()
+        return conn if conn is not None else self._open_new()
+
+    def _checkout(self, start):
+        """Book a checkout (lock held); returns an idle connection or None to open a new one"""
+        conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            self._created += 1
+        self.in_use += 1
+        self.checkouts += 1
+        waited = time.perf_counter() - start
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return conn
+
+    def _open_new(self):
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self.in_use -= 1
+                self._cond.notify()
+                self._wake_async()
+            raise
+
+    def _wake_async(self):
+        """Wake the oldest coroutine in acquire_async() (lock held, any thread)"""
+        while self._async_waiters:
+            waiter = self._async_waiters.popleft()
+            if not waiter.done():
+                waiter.get_loop().call_soon_threadsafe(_resolve, waiter)
+                return
+
+    def release(self, conn, held=0.0):
+        with self._cond:
+            self.in_use -= 1
+            self.checkout_seconds += held
+            self.max_checkout_seconds = max(self.max_checkout_seconds, held)
+            if self._closed:
+                self._created -= 1
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+            self._wake_async()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Check a connection out for the duration of the block"""
+        conn = self.acquire(timeout)
+        start = time.perf_counter()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn, time.perf_counter() - start)
+
+    @asynccontextmanager
+    async def connection_async(self, timeout=None):
+        """connection() for coroutines"""
+        conn = await self.acquire_async(timeout)
+        start = time.perf_counter()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn, time.perf_counter() - start)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'open': self._created,
+                'in_use': self.in_use,
+                'waiting': self.waiting,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_seconds': round(self.wait_seconds, 6),
+                'max_wait_seconds': round(self.max_wait_seconds, 6),
+                'avg_checkout_seconds': round(self.checkout_seconds / self.checkouts, 6) if self.checkouts else 0.0,
+                'max_checkout_seconds': round(self.max_checkout_seconds, 6),
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            for conn in self._idle:
+                conn.close()
+            self._created -= len(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+            while self._async_waiters:
+                self._wake_async()
+
+
+def _resolve(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def seed_database(path, users=10000, seed=42):
+    """Create a users table with deterministic rows (ids 1..users)
+
+    The database is built under a temporary name and moved into place, so
+    worker processes starting together never open a half-seeded file.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    final, path = path, f"{path}.{os.getpid()}.tmp"
+    rng = random.Random(seed)
+    first = ['Ava', 'Liam', 'Noah', 'Emma', 'Mia', 'Lucas', 'Zoe', 'Omar', 'Priya', 'Chen']
+    last = ['Smith', 'Garcia', 'Patel', 'Kim', 'Novak', 'Silva', 'Okafor', 'Rossi', 'Tanaka', 'Berg']
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+                     "email TEXT NOT NULL, created_at TEXT NOT NULL)")
+        rows = []
+        for user_id in range(1, users + 1):
+            name = f"{rng.choice(first)} {rng.choice(last)}"
+            created = time.strftime('%Y-%m-%d', time.gmtime(1577836800 + rng.randrange(5 * 365 * 86400)))
+            rows.append((user_id, name, f"user{user_id}@example.com", created))
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?)", rows)
+    finally:
+        conn.close()
+    os.replace(path, final)
+    logger.info(f"Seeded {users} users into {final}")
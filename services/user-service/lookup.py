@@ -0,0 +1,172 @@
+# services/user-service/lookup.py
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+_MISS = object()
+
+
+class _Call:
+    """One in-flight backend lookup that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class UserLookup:
+    """Single-flight lookups behind a short-TTL cache of user rows
+
+    A lookup first checks the cache. Found users are kept for `ttl` seconds,
+    missing ones (None) for `negative_ttl`. On a miss, the first caller for
+    a key runs the backend query. Concurrent callers for the same key wait
+    for that query and get its row or its exception, so a hot id costs one
+    pooled connection however many requests ask for it. Errors are shared
+    but never cached. A TTL of 0 turns that side of the cache off.
+
+    Threads use get() and coroutines use get_async(). The cache and the
+    counters are shared, but a coroutine never waits on a thread's query
+    or the other way round.
+    """
+
+    def __init__(self, ttl=5.0, negative_ttl=1.0, max_entries=10000, coalesce=True, clock=time.monotonic):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.coalesce = coalesce
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (row or None, expires_at)
+        self._calls = {}  # key -> _Call of a thread's lookup
+        self._futures = {}  # key -> future of a coroutine's lookup
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.coalesced = 0
+        self.backend_queries = 0
+        self.errors = 0
+
+    def get(self, key, load):
+        """Row for `key`, running `load()` only if no cached or in-flight result exists"""
+        with self._lock:
+            value = self._cached(key)
+            if value is not _MISS:
+                return value
+            call = self._calls.get(key) if self.coalesce else None
+            if call is not None:
+                self.coalesced += 1
+            else:
+                self.backend_queries += 1
+                leader = _Call()
+                if self.coalesce:
+                    self._calls[key] = leader
+        if call is not None:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            leader.value = load()
+        except BaseException as e:
+            leader.error = e
+            raise
+        finally:
+            with self._lock:
+                self._finish(key, leader.value, leader.error, self._calls, leader)
+            leader.done.set()
+        return leader.value
+
+    async def get_async(self, key, load):
+        """get() for coroutines: `load` is a coroutine function and waiters don't block the loop"""
+        with self._lock:
+            value = self._cached(key)
+            if value is not _MISS:
+                return value
+            future = self._futures.get(key) if self.coalesce else None
+            if future is not None:
+                self.coalesced += 1
+            else:
+                self.backend_queries += 1
+                leader = asyncio.get_running_loop().create_future()
+                if self.coalesce:
+                    self._futures[key] = leader
+        if future is not None:
+            # shield: a waiter that goes away must not cancel the shared query
+            return await asyncio.shield(future)
+
+        value = error = None
+        try:
+            value = await load()
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._lock:
+                self._finish(key, value, error, self._futures, leader)
+            if error is None:
+                leader.set_result(value)
+            elif isinstance(error, Exception):
+                leader.set_exception(error)
+                leader.exception()  # retrieved here, so asyncio doesn't warn when nobody was waiting
+            else:
+                leader.cancel()
+        return value
+
+    def _cached(self, key):
+        """Cached row, None for a cached miss, or _MISS (lock held)"""
+        self.lookups += 1
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISS
+        if entry[1] <= self.clock():
+            del self._entries[key]
+            return _MISS
+        self._entries.move_to_end(key)
+        if entry[0] is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return entry[0]
+
+    def _finish(self, key, value, error, calls, leader):
+        """Record a finished backend query and cache its row (lock held)"""
+        if calls.get(key) is leader:
+            del calls[key]
+        if error is not None:
+            self.errors += 1
+            return
+        ttl = self.ttl if value is not None else self.negative_ttl
+        if ttl > 0:
+            self._entries[key] = (value, self.clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @property
+    def saved(self):
+        """Backend queries avoided by the cache or by sharing an in-flight query"""
+        return self.hits + self.negative_hits + self.coalesced
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._calls) + len(self._futures),
+            'backend_queries': self.backend_queries,
+            'errors': self.errors,
+            'saved': self.saved,
+            'saved_ratio': round(self.saved / self.lookups, 4) if self.lookups else 0.0,
+        }
@@ -1,24 +1,52 @@
-
 # services/user-service/models.py
-import sqlite3
+import json
 import logging
+import os
+
+from db import ConnectionPool, seed_database
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'users.db')
+
+GET_USER = "SELECT * FROM users WHERE id = ?"
+# One statement for any batch size, so it stays in the per-connection cache
+GET_USERS = "SELECT * FROM users WHERE id IN (SELECT value FROM json_each(?))"
+
+
 class UserModel:
-    def __init__(self):
-        # Intentional bug: database path doesn't exist
-        self.db_path = '/nonexistent/path/users.db'
-    
-    def get_user(self, user_id):
+    def __init__(self, db_path=None, pool_size=20, acquire_timeout=5.0):
+        self.db_path = db_path or os.environ.get('USER_DB_PATH', DEFAULT_DB_PATH)
+        if not os.path.exists(self.db_path):
+            seed_database(self.db_path)
+        self.pool = ConnectionPool(self.db_path, size=pool_size, acquire_timeout=acquire_timeout)
+
+    def get_user(self, user_id, conn=None):
+        """Row for one user, or None; pass `conn` to reuse an already checked-out connection"""
+        try:
+            if conn is not None:
+                return conn.execute(GET_USER, (user_id,)).fetchone()
+            with self.pool.connection() as conn:
+                return conn.execute(GET_USER, (user_id,)).fetchone()
+        except Exception as e:
+            logger.error(f"Database error: {str(e)}")
+            raise
+
+    def get_users(self, user_ids, conn=None):
+        """{id: row} for every id that exists, resolved in a single query"""
+        ids = [int(user_id) for user_id in user_ids]
+        if not ids:
+            return {}
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-            result = cursor.fetchone()
-            conn.close()
-            return result
+            if conn is not None:
+                rows = conn.execute(GET_USERS, (json.dumps(ids),)).fetchall()
+            else:
+                with self.pool.connection() as conn:
+                    rows = conn.execute(GET_USERS, (json.dumps(ids),)).fetchall()
         except Exception as e:
             logger.error(f"Database error: {str(e)}")
             raise
+        return {row[0]: row for row in rows}
 
+    def close(self):
+        self.pool.close()
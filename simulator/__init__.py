@@ -0,0 +1,2 @@
+# simulator/__init__.py
+"""Shared library code for run_ecommerce_platform.py and the scripts/ tools"""
@@ -0,0 +1,224 @@
+# simulator/access_logs.py
+"""
+Vectorized access-log generation.
+
+Endpoints, user agents, status codes (conditioned on each service's status),
+response sizes and timestamps are drawn as NumPy arrays one chunk at a time,
+then formatted into Apache-style lines identical to the ones the runner has
+always written:
+
+    127.0.0.1 - - [19/Aug/2025:21:58:07 +0000] "GET /products HTTP/1.1" 200 1744 "-" "monitoring/1.0"
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from simulator.traffic import DEFAULT_IMPACT, TrafficPlan
+
+# (path, method, port)
+ENDPOINTS = (
+    ('/users/123', 'GET', 8001),
+    ('/users/456', 'GET', 8001),
+    ('/products', 'GET', 8002),
+    ('/products/search', 'GET', 8002),
+    ('/orders', 'POST', 8003),
+    ('/orders/789', 'GET', 8003),
+    ('/payments', 'POST', 8004),
+    ('/health', 'GET', 8001),
+    ('/health', 'GET', 8002),
+    ('/health', 'GET', 8003),
+    ('/health', 'GET', 8004),
+)
+
+# /health is one logical endpoint spread over the four services
+ENDPOINT_WEIGHTS = (1, 1, 1, 1, 1, 1, 1, 0.25, 0.25, 0.25, 0.25)
+
+USER_AGENTS = (
+    'curl/7.68.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'PostmanRuntime/7.28.4',
+    'monitoring/1.0',
+    'python-requests/2.28.2',
+)
+
+# Status code distribution for each service status
+STATUS_CODES = {
+    'running': ((200, 201, 400, 404), (85, 5, 7, 3)),
+    'degraded': ((200, 500, 502, 503), (60, 20, 10, 10)),
+    'critical': ((500, 502, 503, 504), (40, 20, 30, 10)),
+    'down': ((502, 503, 504), (30, 50, 20)),
+}
+
+CLIENT = '127.0.0.1'
+
+
+class AccessLogGenerator:
+    """Draw and format access log lines in NumPy-sized chunks"""
+
+    def __init__(self, services, rng, endpoints=ENDPOINTS, weights=ENDPOINT_WEIGHTS, latency=None,
+                 user_agents=USER_AGENTS, chunk_size=65536):
+        self.rng = rng
+        self.chunk_size = chunk_size
+        self.service_names = list(services)
+        ports = {config['port']: index for index, (_, config) in enumerate(services.items())}
+        self.endpoints = endpoints
+        self.weights = np.array(weights if weights is not None else [1] * len(endpoints), dtype=float)
+        self.weights /= self.weights.sum()
+        self.latency = np.array(latency if latency is not None else [0.1] * len(endpoints), dtype=float)
+        self.paths = np.array([path for path, _, _ in endpoints], dtype=object)
+        self.methods = np.array([method for _, method, _ in endpoints], dtype=object)
+        self.requests = np.array([f'{method} {path} HTTP/1.1' for path, method, _ in endpoints], dtype=object)
+        self.user_agents = np.array(user_agents, dtype=object)
+        self._service_labels = np.array(self.service_names, dtype=object)
+        self._endpoint_services = np.array([ports[port] for _, _, port in endpoints], dtype=np.int64)
+        self._status_tables = {
+            status: (np.array(codes, dtype=np.int16), np.array(weights, dtype=float) / sum(weights))
+            for status, (codes, weights) in STATUS_CODES.items()
+        }
+        self._stamps = {}
+        self.window_stats = None
+
+    def generate(self, count, start, end, statuses):
+        """Yield (text, columns) chunks for `count` requests spread over [start, end] epoch seconds
+
+        `statuses` maps service name to its current status. `text` holds the
+        formatted lines joined by newlines (no trailing newline); `columns`
+        matches the telemetry 'access' schema.
+        """
+        counts = self.rng.multinomial(count, self.weights)[None, :]
+        plan = TrafficPlan(np.array([float(start)]), np.array([float(end - start)]), counts,
+                           np.zeros((1, len(self.service_names))))
+        latency = np.array([DEFAULT_IMPACT[statuses[name]]['latency'] for name in self.service_names])
+        return self.generate_plan(plan, statuses, latency)
+
+    def generate_plan(self, plan, statuses, latency_multipliers):
+        """Yield (text, columns) chunks for a TrafficPlan, in timestamp order"""
+        status_of = [statuses[name] for name in self.service_names]
+        self.window_stats = {
+            'seconds': float(plan.bucket_seconds.sum()),
+            'requests': np.zeros(len(self.service_names), dtype=np.int64),
+            'errors': np.zeros(len(self.service_names), dtype=np.int64),
+            'latency': np.zeros(len(self.service_names)),
+        }
+
+        pending = []
+        pending_rows = 0
+        for bucket in range(len(plan.bucket_starts)):
+            counts = plan.counts[bucket]
+            total = int(counts.sum())
+            if not total:
+                continue
+            load = plan.load[bucket]
+            shed = np.clip(1 - 1 / np.maximum(load, 1e-9), 0, 1)
+            queueing = 1 / (1 - np.minimum(load, 0.95))
+
+            # Split big buckets into equal time slices of at most one chunk each
+            slices = -(-total // self.chunk_size)
+            slice_seconds = plan.bucket_seconds[bucket] / slices
+            if slices > 1:
+                split = np.stack([self.rng.multinomial(int(c), [1 / slices] * slices) for c in counts], axis=1)
+            else:
+                split = counts[None, :]
+
+            for index in range(slices):
+                endpoint_idx = np.repeat(np.arange(len(self.endpoints)), split[index])
+                start = plan.bucket_starts[bucket] + index * slice_seconds
+                if slice_seconds:
+                    times = start + self.rng.uniform(0, slice_seconds, len(endpoint_idx))
+                else:
+                    times = np.full(len(endpoint_idx), start)
+                order = np.argsort(times, kind='stable')
+                pending.append((endpoint_idx[order], times[order], shed, queueing))
+                pending_rows += len(endpoint_idx)
+                if pending_rows >= self.chunk_size:
+                    yield self._chunk(pending, status_of, latency_multipliers)
+                    pending = []
+                    pending_rows = 0
+        if pending_rows:
+            yield self._chunk(pending, status_of, latency_multipliers)
+
+    def _chunk(self, pieces, status_of, latency_multipliers):
+        rng = self.rng
+        endpoint_idx = np.concatenate([piece[0] for piece in pieces])
+        times = np.concatenate([piece[1] for piece in pieces])
+        piece_rows = [len(piece[0]) for piece in pieces]
+        shed = np.repeat(np.stack([piece[2] for piece in pieces]), piece_rows, axis=0)
+        queueing = np.repeat(np.stack([piece[3] for piece in pieces]), piece_rows, axis=0)
+        n = len(endpoint_idx)
+
+        agent_idx = rng.integers(len(self.user_agents), size=n)
+        sizes = rng.integers(45, 2049, size=n)
+        service_idx = self._endpoint_services[endpoint_idx]
+        rows = np.arange(n)
+
+        codes = np.empty(n, dtype=np.int16)
+        for index, status in enumerate(status_of):
+            mask = service_idx == index
+            hits = int(mask.sum())
+            if hits:
+                table, weights = self._status_tables[status]
+                codes[mask] = rng.choice(table, size=hits, p=weights)
+        # Offered load beyond capacity is shed with 503s
+        codes[rng.random(n) < shed[rows, service_idx]] = 503
+
+        latency = (self.latency[endpoint_idx] * latency_multipliers[service_idx]
+                   * queueing[rows, service_idx] * rng.lognormal(0, 0.5, n))
+
+        stats = self.window_stats
+        services = len(self.service_names)
+        stats['requests'] += np.bincount(service_idx, minlength=services)
+        stats['errors'] += np.bincount(service_idx[codes >= 500], minlength=services)
+        stats['latency'] += np.bincount(service_idx, weights=latency, minlength=services)
+
+        seconds = times.astype(np.int64)
+        unique_seconds, second_idx = np.unique(seconds, return_inverse=True)
+        stamps = np.array([self._stamp(second) for second in unique_seconds.tolist()], dtype=object)
+
+        text = '\n'.join([
+            f'{CLIENT} - - [{stamp}] "{request}" {code} {size} "-" "{agent}"'
+            for stamp, request, code, size, agent in zip(
+                stamps[second_idx].tolist(),
+                self.requests[endpoint_idx].tolist(),
+                codes.tolist(),
+                sizes.tolist(),
+                self.user_agents[agent_idx].tolist(),
+            )
+        ])
+
+        columns = {
+            'timestamp': (times * 1000).astype(np.int64),
+            'client': np.full(n, CLIENT, dtype=object),
+            'method': self.methods[endpoint_idx],
+            'path': self.paths[endpoint_idx],
+            'service': self._service_labels[service_idx],
+            'status': codes,
+            'bytes': sizes.astype(np.int32),
+            'user_agent': self.user_agents[agent_idx],
+            'latency_ms': (latency * 1000).astype(np.float32),
+        }
+        return text, columns
+
+    def service_stats(self):
+        """Throughput, error rate and mean latency per service for the last generated window"""
+        stats = self.window_stats
+        if not stats or not stats['requests'].sum():
+            return None
+        result = {}
+        for index, name in enumerate(self.service_names):
+            requests = int(stats['requests'][index])
+            result[name] = {
+                'response_time': stats['latency'][index] / requests if requests else 0.0,
+                'error_rate': 100.0 * stats['errors'][index] / requests if requests else 0.0,
+                'throughput': int(round(requests / stats['seconds'])) if stats['seconds'] else requests,
+            }
+        return result
+
+    def _stamp(self, second):
+        stamp = self._stamps.get(second)
+        if stamp is None:
+            if len(self._stamps) > 100000:
+                self._stamps.clear()
+            stamp = datetime.fromtimestamp(second).strftime('%d/%b/%Y:%H:%M:%S +0000')
+            self._stamps[second] = stamp
+        return stamp
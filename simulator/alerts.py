@@ -0,0 +1,221 @@
+# simulator/alerts.py
+"""
+Embedded evaluator for Prometheus-style alert rules (monitoring/alerts.yml).
+
+Rules are compiled once into `<operand> <op> <operand>` comparisons, where
+an operand is a metric (optionally with {label="value"} matchers) or a
+number. The evaluator keeps the latest value of every series and an index
+from metric name to the rules that read it. observe() only re-evaluates rules
+for the series whose value changed; pending alerts wait in a heap keyed by
+the time their `for:` duration runs out, so tick() only looks at alerts that
+are due. Work per tick is O(changed series + due alerts), never a rescan.
+
+Fire and resolve transitions are logged and returned as events.
+"""
+
+import heapq
+import logging
+import operator
+import os
+import re
+
+from simulator.config import ROOT, load_yaml, parse_duration
+
+DEFAULT_RULES = os.path.join(ROOT, "monitoring", "alerts.yml")
+
+OPERATORS = {
+    '>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le,
+    '==': operator.eq, '!=': operator.ne,
+}
+_OPERAND = r'([A-Za-z_:][\w:]*(?:\{[^}]*\})?|[-+]?\d+(?:\.\d+)?)'
+_EXPR = re.compile(rf'^\s*{_OPERAND}\s*(>=|<=|==|!=|>|<)\s*{_OPERAND}\s*$')
+_MATCHER = re.compile(r'\s*(\w+)\s*(!=|=)\s*"([^"]*)"\s*')
+_TEMPLATE = re.compile(r'\{\{\s*\$(labels\.(\w+)|value)\s*\}\}')
+
+logger = logging.getLogger(__name__)
+
+
+class Operand:
+    def __init__(self, text):
+        self.metric = None
+        self.matchers = ()
+        try:
+            self.number = float(text)
+        except ValueError:
+            self.number = None
+            name, _, matchers = text.partition('{')
+            self.metric = name
+            self.matchers = tuple(_MATCHER.fullmatch(part).groups()
+                                  for part in matchers.rstrip('}').split(',') if part.strip())
+
+    def matches(self, labels):
+        values = dict(labels)
+        return all((values.get(name) == value) == (op == '=') for name, op, value in self.matchers)
+
+    def value(self, values, labels):
+        if self.number is not None:
+            return self.number
+        if not self.matches(labels):
+            return None
+        return values.get((self.metric, labels))
+
+
+class Rule:
+    def __init__(self, name, expr, duration=0.0, labels=None, annotations=None):
+        match = _EXPR.match(expr)
+        if not match:
+            raise ValueError(f"alert {name!r}: unsupported expression {expr!r} (expected '<operand> <op> <operand>')")
+        left, op, right = match.groups()
+        self.name = name
+        self.expr = expr
+        self.left = Operand(left)
+        self.right = Operand(right)
+        self.compare = OPERATORS[op]
+        self.duration = duration
+        self.labels = dict(labels or {})
+        self.annotations = dict(annotations or {})
+        self.metrics = {operand.metric for operand in (self.left, self.right) if operand.metric}
+        if not self.metrics:
+            raise ValueError(f"alert {name!r}: expression {expr!r} references no metric")
+
+    @classmethod
+    def from_config(cls, spec):
+        return cls(spec['alert'], str(spec['expr']), parse_duration(spec.get('for', 0)) or 0.0,
+                   spec.get('labels'), spec.get('annotations'))
+
+    def evaluate(self, values, labels):
+        """Left-hand value if the comparison holds for this label set, else None"""
+        left = self.left.value(values, labels)
+        right = self.right.value(values, labels)
+        if left is None or right is None or not self.compare(left, right):
+            return None
+        return left
+
+    def render(self, template, labels, value):
+        labels = dict(labels)
+        return _TEMPLATE.sub(lambda m: f"{value:g}" if m.group(1) == 'value' else labels.get(m.group(2), ''),
+                             template)
+
+
+def load_rules(path=DEFAULT_RULES):
+    config = load_yaml(path)
+    return [Rule.from_config(spec) for group in config.get('groups') or [] for spec in group.get('rules') or []]
+
+
+class AlertEvaluator:
+    """Incremental alert state machine: inactive -> pending -> firing -> resolved"""
+
+    def __init__(self, rules, log=None):
+        self.rules = list(rules)
+        self.log = log or logger
+        self.values = {}   # (metric, labels) -> latest value
+        self.by_metric = {}
+        for rule in self.rules:
+            for metric in rule.metrics:
+                self.by_metric.setdefault(metric, []).append(rule)
+        self.active = {}   # (rule name, labels) -> {'rule', 'labels', 'state', 'since', 'value'}
+        self._due = []     # heap of (fire_at, since, rule name, labels) for pending alerts
+        self.fired = 0
+        self.resolved = 0
+        self.evaluations = 0
+
+    @classmethod
+    def from_yaml(cls, path=DEFAULT_RULES, log=None):
+        return cls(load_rules(path), log)
+
+    def observe(self, samples, ts):
+        """Apply {(metric, labels): value} updates (None drops a series), then tick()
+
+        `labels` is a sorted tuple of (name, value) pairs. Unchanged values
+        cost a dict lookup each and trigger no rule evaluation.
+        """
+        events = []
+        for key, value in samples.items():
+            if value is None:
+                if self.values.pop(key, None) is None:
+                    continue
+            elif self.values.get(key) == value:
+                continue
+            else:
+                self.values[key] = value
+            metric, labels = key
+            for rule in self.by_metric.get(metric, ()):
+                self.evaluations += 1
+                self._update(rule, labels, rule.evaluate(self.values, labels), ts, events)
+        events.extend(self.tick(ts))
+        return events
+
+    def _update(self, rule, labels, value, ts, events):
+        key = (rule.name, labels)
+        alert = self.active.get(key)
+        if value is None:
+            if alert is not None:
+                del self.active[key]
+                if alert['state'] == 'firing':
+                    events.append(self._event('resolved', alert, ts))
+            return
+        if alert is not None:
+            alert['value'] = value
+            return
+        alert = self.active[key] = {'rule': rule, 'labels': labels, 'state': 'pending', 'since': ts, 'value': value}
+        if rule.duration <= 0:
+            alert['state'] = 'firing'
+            events.append(self._event('firing', alert, ts))
+        else:
+            heapq.heappush(self._due, (ts + rule.duration, ts, rule.name, labels))
+
+    def next_due(self):
+        """Earliest time a pending alert could fire (None if nothing is pending)"""
+        return self._due[0][0] if self._due else None
+
+    def tick(self, ts):
+        """Fire pending alerts whose `for:` duration has elapsed by `ts`"""
+        events = []
+        while self._due and self._due[0][0] <= ts:
+            _, since, name, labels = heapq.heappop(self._due)
+            alert = self.active.get((name, labels))
+            # Skip alerts that resolved (or resolved and re-triggered) meanwhile
+            if alert is not None and alert['state'] == 'pending' and alert['since'] == since:
+                alert['state'] = 'firing'
+                events.append(self._event('firing', alert, ts))
+        return events
+
+    def _event(self, state, alert, ts):
+        rule = alert['rule']
+        labels = dict(alert['labels'])
+        event = {
+            'ts': ts,
+            'alert': rule.name,
+            'state': state,
+            'labels': {**labels, **rule.labels},
+            'value': alert['value'],
+            'active_seconds': round(ts - alert['since'], 3),
+            'summary': rule.render(rule.annotations.get('summary', ''), alert['labels'], alert['value']),
+        }
+        where = " ".join(f"{name}={value}" for name, value in sorted(labels.items()))
+        severity = rule.labels.get('severity', 'warning')
+        if state == 'firing':
+            self.fired += 1
+            description = rule.render(rule.annotations.get('description', ''), alert['labels'], alert['value'])
+            level = logging.CRITICAL if severity == 'critical' else logging.WARNING
+            self.log.log(level, f"🔔 ALERT FIRING: {rule.name} [{severity}] {where} "
+                                f"value={alert['value']:g} - {event['summary']}: {description}")
+        else:
+            self.resolved += 1
+            self.log.info(f"🔕 ALERT RESOLVED: {rule.name} [{severity}] {where} "
+                          f"after {event['active_seconds']:.0f}s")
+        return event
+
+    def firing(self):
+        return [alert for alert in self.active.values() if alert['state'] == 'firing']
+
+    def stats(self):
+        return {
+            'rules': len(self.rules),
+            'series': len(self.values),
+            'pending': sum(1 for alert in self.active.values() if alert['state'] == 'pending'),
+            'firing': len(self.firing()),
+            'fired': self.fired,
+            'resolved': self.resolved,
+            'evaluations': self.evaluations,
+        }
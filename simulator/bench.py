@@ -0,0 +1,189 @@
+# simulator/bench.py
+"""
+Benchmark harness: timing, machine metadata, JSON results and comparison.
+
+A Benchmark wraps a zero-argument callable. measure() calibrates how many
+calls fill `min_time`, then times `repeat` rounds of that many calls and
+keeps wall and CPU time per call. Results are saved as JSON together with
+machine metadata (psutil) and the git commit, so compare() can flag
+regressions between two runs taken on the same machine.
+"""
+
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+import psutil
+
+from simulator.config import ROOT
+
+RESULT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+class Benchmark:
+    """`op` is timed; it handles `ops` items per call (lines, requests, incidents)
+
+    `before` runs ahead of every round (e.g. to reseed RNGs) and is not timed.
+    """
+
+    def __init__(self, name, op, ops=1, unit='call', before=None, number=None):
+        self.name = name
+        self.op = op
+        self.ops = ops
+        self.unit = unit
+        self.before = before
+        self.number = number
+
+    @property
+    def group(self):
+        return self.name.partition('/')[0]
+
+
+def measure(benchmark, repeat=5, min_time=0.2, max_number=1_000_000):
+    """Time `repeat` rounds of N calls, where N makes a round last about `min_time`"""
+    if benchmark.before:
+        benchmark.before()
+    started = time.perf_counter()
+    benchmark.op()  # warm-up, also sizes the rounds
+    first = time.perf_counter() - started
+    number = benchmark.number or min(max(1, math.ceil(min_time / max(first, 1e-9))), max_number)
+
+    wall, cpu = [], []
+    for _ in range(repeat):
+        if benchmark.before:
+            benchmark.before()
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        for _ in range(number):
+            benchmark.op()
+        wall.append((time.perf_counter() - start) / number)
+        cpu.append((time.process_time() - cpu_start) / number)
+
+    median = statistics.median(wall)
+    return {
+        'group': benchmark.group,
+        'unit': benchmark.unit,
+        'ops': benchmark.ops,
+        'number': number,
+        'repeat': repeat,
+        'median_s': median,
+        'min_s': min(wall),
+        'max_s': max(wall),
+        'mean_s': statistics.fmean(wall),
+        'stdev_s': statistics.stdev(wall) if len(wall) > 1 else 0.0,
+        'cpu_s': statistics.median(cpu),
+        'ops_per_second': benchmark.ops / median if median else None,
+    }
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def machine_info():
+    """Hardware/OS/Python facts that decide whether two results are comparable"""
+    memory = psutil.virtual_memory()
+    frequency = psutil.cpu_freq()
+    commit = _git('rev-parse', 'HEAD')
+    return {
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count_logical': psutil.cpu_count(logical=True),
+        'cpu_count_physical': psutil.cpu_count(logical=False),
+        'cpu_freq_mhz': round(frequency.max or frequency.current) if frequency else None,
+        'memory_total_mb': round(memory.total / 2**20),
+        'memory_available_mb': round(memory.available / 2**20),
+        'load_average': [round(load, 2) for load in psutil.getloadavg()],
+        'python': f"{platform.python_implementation()} {platform.python_version()}",
+        'git_commit': commit or None,
+        'git_dirty': bool(_git('status', '--porcelain', '--untracked-files=no')) if commit else None,
+    }
+
+
+def run_benchmarks(benchmarks, repeat=5, min_time=0.2):
+    """Measure each benchmark in turn; returns the JSON-ready result document"""
+    results = {}
+    started = time.perf_counter()
+    for benchmark in benchmarks:
+        result = results[benchmark.name] = measure(benchmark, repeat, min_time)
+        logger.info(f"⏱️  {benchmark.name:<50} {format_seconds(result['median_s']):>10} "
+                    f"±{result['stdev_s'] / result['median_s']:.1%}  "
+                    f"{result['ops_per_second']:,.0f} {benchmark.unit}/s")
+    return {
+        'version': RESULT_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'duration_s': round(time.perf_counter() - started, 2),
+        'settings': {'repeat': repeat, 'min_time': min_time},
+        'machine': machine_info(),
+        'benchmarks': results,
+    }
+
+
+def save(result, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
+    return path
+
+
+def load(path):
+    with open(path) as f:
+        result = json.load(f)
+    if result.get('version') != RESULT_VERSION:
+        raise ValueError(f"{path}: unsupported benchmark result version {result.get('version')!r}")
+    return result
+
+
+MACHINE_KEYS = ('processor', 'cpu_count_logical', 'cpu_freq_mhz', 'memory_total_mb', 'python')
+
+
+def compare(baseline, current, threshold=0.1):
+    """Per-benchmark verdicts, current vs baseline median
+
+    A benchmark regressed if its median is more than `threshold` slower
+    and even its fastest round is slower than the baseline median, so
+    one noisy round can't fail a run; 'improved' is the mirror image.
+    Returns (rows, machine differences).
+    """
+    rows = []
+    before, after = baseline['benchmarks'], current['benchmarks']
+    for name in sorted(set(before) | set(after)):
+        old, new = before.get(name), after.get(name)
+        if old is None or new is None:
+            rows.append({'name': name, 'verdict': 'new' if old is None else 'missing',
+                         'baseline_s': old and old['median_s'], 'current_s': new and new['median_s'],
+                         'ratio': None})
+            continue
+        ratio = new['median_s'] / old['median_s']
+        if ratio > 1 + threshold and new['min_s'] > old['median_s']:
+            verdict = 'regression'
+        elif ratio < 1 - threshold and new['max_s'] < old['median_s']:
+            verdict = 'improved'
+        else:
+            verdict = 'ok'
+        rows.append({'name': name, 'verdict': verdict, 'baseline_s': old['median_s'],
+                     'current_s': new['median_s'], 'ratio': ratio})
+    differences = {key: (baseline['machine'].get(key), current['machine'].get(key)) for key in MACHINE_KEYS
+                   if baseline['machine'].get(key) != current['machine'].get(key)}
+    return rows, differences
+
+
+def format_seconds(seconds):
+    if seconds is None:
+        return '-'
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
@@ -0,0 +1,82 @@
+# simulator/clock.py
+"""
+Clocks used by the platform simulation.
+
+RealClock follows wall-clock time and really sleeps. SimulatedClock only
+advances a virtual timestamp, so a fast-forward run can cover hours of
+simulated traffic as fast as the CPU allows.
+"""
+
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+
+
+class RealClock:
+    """Wall-clock time with real sleeps (default interactive behaviour)"""
+
+    simulated = False
+
+    def __init__(self):
+        self.started = time.time()
+
+    def now(self):
+        return datetime.now()
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def elapsed(self):
+        return time.time() - self.started
+
+
+class SimulatedClock:
+    """Virtual time that advances on sleep() instead of blocking"""
+
+    simulated = True
+
+    def __init__(self, start=None):
+        start = start or datetime.now()
+        self._start = start.timestamp()
+        self._now = self._start
+        self._lock = threading.Lock()
+
+    def now(self):
+        return datetime.fromtimestamp(self._now)
+
+    def time(self):
+        return self._now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            with self._lock:
+                self._now += seconds
+
+    def advance(self, delta):
+        """Advance by a number of seconds or a timedelta"""
+        if isinstance(delta, timedelta):
+            delta = delta.total_seconds()
+        self.sleep(delta)
+
+    def elapsed(self):
+        return self._now - self._start
+
+
+class ClockFilter(logging.Filter):
+    """Stamp log records with the clock's time and count them"""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.records = 0
+
+    def filter(self, record):
+        created = self.clock.time()
+        record.created = created
+        record.msecs = (created - int(created)) * 1000
+        self.records += 1
+        return True
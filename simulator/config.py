@@ -0,0 +1,53 @@
+# simulator/config.py
+"""Helpers for reading the YAML files under config/ and monitoring/"""
+
+import os
+import re
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_DIR = os.path.join(ROOT, "config")
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h|d|w)?\s*$")
+_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]i?b?|b)?\s*$", re.IGNORECASE)
+
+
+def parse_duration(value, default_unit='s'):
+    """Parse '500ms', '30s', '2m', '1h' (or a bare number) into seconds"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) * _UNITS[default_unit]
+    match = _DURATION.match(str(value))
+    if not match:
+        raise ValueError(f"invalid duration: {value!r}")
+    number, unit = match.groups()
+    return float(number) * _UNITS[unit or default_unit]
+
+
+def parse_size(value):
+    """Parse '512KB', '100MB', '1.5GiB' (or a bare number of bytes) into bytes
+
+    Decimal and binary prefixes are both treated as powers of 1024.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _SIZE.match(str(value))
+    if not match:
+        raise ValueError(f"invalid size: {value!r}")
+    number, unit = match.groups()
+    power = 'bkmgt'.index(unit[0].lower()) if unit else 0
+    return int(float(number) * 1024 ** power)
+
+
+def load_yaml(path):
+    """Load a YAML file, resolving bare names against config/"""
+    if not os.path.isabs(path) and not os.path.exists(path):
+        path = os.path.join(CONFIG_DIR, path)
+    with open(path) as f:
+        return yaml.safe_load(f) or {}
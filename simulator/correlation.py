@@ -0,0 +1,366 @@
+# simulator/correlation.py
+"""
+Streaming incident correlation over one run's logs.
+
+Error/critical lines and HTTP 5xx access lines are merged into one
+time-ordered stream and grouped into incident clusters:
+
+* A Drain-style template miner reduces each message to a template
+  ("service=<*> timeout=<NUM>s ..."), identified by a short hash signature
+  of the message that created it, so it doesn't change as the template
+  generalizes.
+* Clusters stay open while events keep arriving within `gap` seconds. A
+  per-service index finds a service's open cluster in O(1).
+* Error lines less than `burst` seconds apart form a burst; an INCIDENT
+  TRIGGERED marker always starts a new one. A burst's lines all land in
+  one cluster: the one its first service line joins. Lines that name no
+  service wait for that line, so an incident's header isn't split off.
+* A service's lines in a new burst don't rejoin its older cluster: the
+  burst takes the service over, and the old cluster just ages out. Only
+  a 5xx spike that no error line has joined yet is taken over instead,
+  since it is usually the incident's own early symptom.
+* A burst that isn't started by a marker joins the cluster of another
+  service that was active within `link` seconds (cascades).
+* A 5xx response only opens a cluster once its service sees `spike_min` of
+  them within `spike_window`. Stray shed 503s don't become incidents.
+
+Each event does O(1) index work plus template matching within its
+(length, first token) bucket, so a run is processed in near-linear time.
+Closed clusters come out as compact summary dicts.
+"""
+
+import hashlib
+import heapq
+import re
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+
+from simulator.log_index import ACCESS_LINE, APP_LINE, INCIDENT, SERVICE, _path_service, _Timestamps, log_files
+from simulator.log_rotation import open_log
+
+WILDCARD = '<*>'
+
+# Masked before tokenizing so values with the same shape share a template
+MASKS = (
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'), '<IP>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b|\b[0-9a-f]{12,}\b'), '<HEX>'),
+    (re.compile(r'(?<![A-Za-z])[-+]?\d+(?:\.\d+)?'), '<NUM>'),
+)
+
+
+def _mask(message):
+    for pattern, token in MASKS:
+        message = pattern.sub(token, message)
+    return message
+
+
+class Template:
+    def __init__(self, template_id, tokens):
+        self.id = template_id
+        self.tokens = tokens
+        self.count = 0
+        # Fixed at creation: merges widen the tokens but keep the identity
+        self.signature = hashlib.blake2b(' '.join(tokens).encode(), digest_size=6).hexdigest()
+
+    @property
+    def text(self):
+        return ' '.join(self.tokens)
+
+    def similarity(self, tokens):
+        """Share of positions that match exactly (wildcards count as matches)"""
+        same = sum(1 for mine, theirs in zip(self.tokens, tokens) if mine == theirs or mine == WILDCARD)
+        return same / len(tokens) if tokens else 1.0
+
+    def merge(self, tokens):
+        for i, (mine, theirs) in enumerate(zip(self.tokens, tokens)):
+            if mine != theirs and not mine.endswith(WILDCARD):
+                key, sep, _ = mine.partition('=')
+                self.tokens[i] = f"{key}={WILDCARD}" if sep and theirs.startswith(key + '=') else WILDCARD
+
+
+class TemplateMiner:
+    """Drain-style online template mining
+
+    Messages are bucketed by (token count, first token), then matched
+    against that bucket's templates. The best match at or above `threshold`
+    similarity absorbs the message: differing positions become <*>.
+    Otherwise the message starts a new template.
+    """
+
+    def __init__(self, threshold=0.5, max_per_bucket=64):
+        self.threshold = threshold
+        self.max_per_bucket = max_per_bucket
+        self.templates = []
+        self._buckets = {}
+
+    def add(self, message):
+        tokens = _mask(message).split()
+        first = tokens[0] if tokens and not any(c.isdigit() for c in tokens[0]) else WILDCARD
+        bucket = self._buckets.setdefault((len(tokens), first), [])
+        best, best_score = None, -1.0
+        for template in bucket:
+            score = template.similarity(tokens)
+            if score > best_score:
+                best, best_score = template, score
+        if best is not None and (best_score >= self.threshold or len(bucket) >= self.max_per_bucket):
+            best.merge(tokens)
+        else:
+            best = Template(len(self.templates), tokens)
+            self.templates.append(best)
+            bucket.append(best)
+        best.count += 1
+        return best
+
+
+class Cluster:
+    def __init__(self, cluster_id, ts):
+        self.id = cluster_id
+        self.start = self.last = ts
+        self.services = set()
+        self.incidents = []
+        self.levels = Counter()
+        self.templates = Counter()  # Template -> events
+        self.status_codes = Counter()
+        self.minutes = Counter()    # 5xx per minute bucket
+        self.first = None
+
+    def summary(self, limit=5):
+        errors = self.levels['ERROR'] + self.levels['CRITICAL']
+        return {
+            'cluster': self.id,
+            'start': datetime.fromtimestamp(self.start).isoformat(sep=' ', timespec='seconds'),
+            'end': datetime.fromtimestamp(self.last).isoformat(sep=' ', timespec='seconds'),
+            'duration_s': round(self.last - self.start, 3),
+            'services': sorted(self.services),
+            'incidents': self.incidents,
+            'errors': errors,
+            'critical': self.levels['CRITICAL'],
+            'http_5xx': sum(self.status_codes.values()),
+            'http_5xx_peak_per_min': max(self.minutes.values(), default=0),
+            'status_codes': {str(code): count for code, count in sorted(self.status_codes.items())},
+            'templates': [{'signature': template.signature, 'template': template.text, 'count': count}
+                          for template, count in self.templates.most_common(limit)],
+            'first': self.first,
+        }
+
+
+class Correlator:
+    """Groups a time-ordered event stream into incident clusters
+
+    Feed events with error(), access() and marker() (or stream() for a
+    merged iterator); each call returns the summaries of clusters that
+    closed because the stream moved `gap` seconds past their last event.
+    flush() closes the rest.
+    """
+
+    def __init__(self, miner=None, gap=900.0, burst=5.0, link=10.0, spike_window=60.0, spike_min=3):
+        self.miner = miner or TemplateMiner()
+        self.gap = gap
+        self.burst = burst
+        self.link = link
+        self.spike_window = spike_window
+        self.spike_min = spike_min
+        self._open = OrderedDict()  # cluster id -> Cluster, least recently active first
+        self._by_service = {}       # service -> its open Cluster
+        self._recent_5xx = {}       # service -> deque of recent 5xx timestamps
+        self._burst_last = None     # ts of the current burst's latest error line
+        self._burst_marker = None   # incident name of the marker that started the burst
+        self._burst_cluster = None  # where the current burst's lines go, once a service line placed it
+        self._pending = []          # service-less (ts, level, message, template) waiting for that
+        self._next_id = 0
+        self.events = 0
+        self.stray_5xx = 0
+        self.closed = 0
+
+    def _expire(self, ts):
+        if self._pending and ts - self._burst_last > self.burst:
+            self._settle()
+        closed = []
+        while self._open:
+            cluster = next(iter(self._open.values()))
+            if ts - cluster.last <= self.gap:
+                break
+            del self._open[cluster.id]
+            for service in cluster.services:
+                if self._by_service.get(service) is cluster:
+                    del self._by_service[service]
+            self.closed += 1
+            closed.append(cluster.summary())
+        return closed
+
+    def _latest(self, ts, within):
+        if not self._open:
+            return None
+        cluster = next(reversed(self._open.values()))
+        return cluster if ts - cluster.last <= within else None
+
+    def _new_cluster(self, ts):
+        cluster = Cluster(self._next_id, ts)
+        self._next_id += 1
+        self._open[cluster.id] = cluster
+        return cluster
+
+    def _touch(self, cluster, ts):
+        cluster.last = max(cluster.last, ts)
+        self._open.move_to_end(cluster.id)
+
+    def _start_burst(self, marker=None):
+        self._settle()
+        self._burst_cluster = None
+        self._burst_marker = marker
+
+    def _place_burst(self, ts, within, service=None):
+        """Pick the current burst's cluster and move its waiting service-less lines there"""
+        if self._burst_marker:
+            # A new incident only takes over its service's 5xx spike, never an earlier incident
+            cluster = self._by_service.get(service) if service else None
+            if cluster is not None and (cluster.incidents or cluster.levels):
+                cluster = None
+        else:
+            cluster = self._latest(ts, within)
+        if cluster is None:
+            cluster = self._new_cluster(self._pending[0][0] if self._pending else ts)
+        if self._burst_marker:
+            cluster.incidents.append(self._burst_marker)
+            self._burst_marker = None
+        self._burst_cluster = cluster
+        pending, self._pending = self._pending, []
+        for event in pending:
+            self._add_error(cluster, *event)
+        return cluster
+
+    def _settle(self):
+        """The burst ended with service-less lines only: they get a cluster of their own (or the latest one)"""
+        if self._pending:
+            self._place_burst(self._pending[0][0], self.burst)
+
+    def _add_error(self, cluster, ts, level, message, template):
+        cluster.levels[level] += 1
+        cluster.templates[template] += 1
+        if cluster.first is None:
+            cluster.first = message
+        self._touch(cluster, ts)
+
+    def marker(self, ts, name):
+        """An INCIDENT TRIGGERED line: starts a new burst and labels the cluster it lands in"""
+        closed = self._expire(ts)
+        self._start_burst(name)
+        self._burst_last = ts
+        return closed
+
+    def error(self, ts, level, service, message):
+        closed = self._expire(ts)
+        self.events += 1
+        template = self.miner.add(message)
+        if self._burst_last is None or ts - self._burst_last > self.burst:
+            self._start_burst()
+        self._burst_last = ts
+        cluster = self._burst_cluster
+        if cluster is None:
+            if not service:
+                self._pending.append((ts, level, message, template))
+                return closed
+            cluster = self._place_burst(ts, self.link, service)
+        if service:
+            cluster.services.add(service)
+            self._by_service[service] = cluster
+        self._add_error(cluster, ts, level, message, template)
+        return closed
+
+    def access(self, ts, service, status, request=''):
+        """A 5xx response (other statuses are ignored)"""
+        if status < 500:
+            return []
+        closed = self._expire(ts)
+        self.events += 1
+        recent = self._recent_5xx.setdefault(service, deque())
+        recent.append(ts)
+        while ts - recent[0] > self.spike_window:
+            recent.popleft()
+        cluster = (self._by_service.get(service) if service else None) or self._latest(ts, self.link)
+        if cluster is None:
+            if len(recent) < self.spike_min:
+                self.stray_5xx += 1
+                return closed
+            cluster = self._new_cluster(ts)
+        if service:
+            cluster.services.add(service)
+            self._by_service[service] = cluster
+        self._touch(cluster, ts)
+        cluster.status_codes[status] += 1
+        cluster.minutes[int(ts // 60)] += 1
+        if cluster.first is None:
+            cluster.first = f"HTTP {status} {request}".strip()
+        return closed
+
+    def stream(self, events):
+        """Consume (ts, kind, ...) tuples from read_run(); yield closed cluster summaries"""
+        handlers = {'marker': self.marker, 'error': self.error, 'access': self.access}
+        for ts, kind, *fields in events:
+            yield from handlers[kind](ts, *fields)
+        yield from self.flush()
+
+    def flush(self):
+        self._settle()
+        closed = [cluster.summary() for cluster in self._open.values()]
+        self.closed += len(closed)
+        self._open.clear()
+        self._by_service.clear()
+        return closed
+
+
+def _lines(paths):
+    """Lines of a kind's segments in order, decompressing as needed"""
+    for path in paths:
+        with open_log(path) as f:
+            yield from f
+
+
+def _app_events(paths, timestamps):
+    for line in _lines(paths):
+        match = APP_LINE.match(line.rstrip(b'\r\n'))
+        if not match:
+            continue  # continuation of a multi-line record
+        second, millis, level, message = match.groups()
+        ts = timestamps.app(second, millis)
+        if b'INCIDENT TRIGGERED' in message:
+            name = INCIDENT.search(message.decode('utf-8', 'replace'))
+            if name:
+                yield ts, 'marker', name.group(1)
+        elif level in (b'ERROR', b'CRITICAL'):
+            service = SERVICE.search(message)
+            yield (ts, 'error', level.decode(), service.group(0).decode() if service else None,
+                   message.decode('utf-8', 'replace'))
+
+
+def _access_events(paths, timestamps):
+    for line in _lines(paths):
+        if b'" 5' not in line:
+            continue  # cheap pre-filter: most lines aren't 5xx
+        match = ACCESS_LINE.match(line)
+        if match and match.group(4)[:1] == b'5':
+            stamp, method, request_path, status = match.groups()
+            request = request_path.decode()
+            yield timestamps.access(stamp), 'access', _path_service(request), int(status), \
+                f"{method.decode()} {request}"
+
+
+def log_runs(log_dir="logs"):
+    """{run id: {kind: [paths]}} for the runner's log files in `log_dir`, segments oldest first"""
+    runs = {}
+    for path, kind, run in log_files(log_dir):
+        runs.setdefault(run, {}).setdefault(kind, []).append(path)
+    return runs
+
+
+def read_run(files):
+    """Time-ordered event tuples from one run's {kind: [paths]} log files
+
+    INCIDENT TRIGGERED markers come from the application log and
+    ERROR/CRITICAL lines from the error log; only 5xx access lines are kept.
+    """
+    timestamps = _Timestamps()
+    streams = [_app_events(files[kind], timestamps) for kind in ('application', 'error') if kind in files]
+    if 'access' in files:
+        streams.append(_access_events(files['access'], timestamps))
+    return heapq.merge(*streams, key=lambda event: event[0])
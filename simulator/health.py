@@ -0,0 +1,181 @@
+# simulator/health.py
+"""
+Concurrent health checker for the endpoints in config/monitoring.yaml.
+
+Every endpoint is probed on its own `interval` with its own `timeout`, over
+one shared HttpTransport (a keep-alive connection per endpoint, even when
+instances of one service share a name), so a sweep takes as long as the
+slowest endpoint rather than the sum of all of them, and hundreds of
+instances cost little more than four. Results go to sinks:
+log lines, JSON Lines, or Prometheus gauges.
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import time
+from urllib.parse import urlsplit
+
+from simulator.config import load_yaml, parse_duration
+from simulator.load_test import HttpTransport
+
+try:
+    from prometheus_client import CollectorRegistry, Counter, Gauge, generate_latest, start_http_server
+except ImportError:  # pragma: no cover - only needed for Prometheus output
+    CollectorRegistry = None
+
+logger = logging.getLogger(__name__)
+
+
+class Endpoint:
+    def __init__(self, name, url, timeout=5.0, interval=30.0):
+        parts = urlsplit(url)
+        self.name = name
+        self.url = url
+        self.base_url = f"{parts.scheme}://{parts.netloc}"
+        self.path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        self.timeout = timeout
+        self.interval = interval
+
+
+def load_endpoints(path='monitoring.yaml'):
+    """Endpoints from the monitoring.endpoints list (timeouts/intervals as '5s', '500ms', ...)"""
+    config = load_yaml(path).get('monitoring') or {}
+    return [
+        Endpoint(str(item['name']).strip(), item['url'],
+                 parse_duration(item.get('timeout', '5s')), parse_duration(item.get('interval', '30s')))
+        for item in config.get('endpoints') or []
+    ]
+
+
+class HealthChecker:
+    """Probes endpoints concurrently; each result dict is passed to every sink"""
+
+    def __init__(self, endpoints, sinks=(), max_concurrency=256):
+        self.endpoints = list(endpoints)
+        self.sinks = list(sinks)
+        self.max_concurrency = max_concurrency
+        timeout = max((endpoint.timeout for endpoint in self.endpoints), default=5.0)
+        # keyed by position: instances of one service share a name but not a URL
+        self.transport = HttpTransport(dict(enumerate(endpoint.base_url for endpoint in self.endpoints)),
+                                       pool_size=1, timeout=timeout)
+        self._keys = {id(endpoint): i for i, endpoint in enumerate(self.endpoints)}
+        self.last = {}  # endpoint name -> latest result
+        self._slots = None
+
+    async def probe(self, endpoint):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        status = error = None
+        async with self._slots:
+            started = time.perf_counter()
+            try:
+                status, _ = await asyncio.wait_for(self.transport.request(self._keys[id(endpoint)], 'GET', endpoint.path),
+                                                   endpoint.timeout)
+            except asyncio.TimeoutError:
+                error = 'timeout'
+            except OSError:
+                error = 'connection_failed'
+            except Exception as e:
+                error = type(e).__name__
+            latency = time.perf_counter() - started
+        result = {
+            'ts': round(time.time(), 3),
+            'endpoint': endpoint.name,
+            'url': endpoint.url,
+            'healthy': error is None and 200 <= status < 300,
+            'status': status,
+            'latency_ms': round(latency * 1000, 2),
+            'error': error,
+        }
+        self.last[endpoint.name] = result
+        for sink in self.sinks:
+            sink(result)
+        return result
+
+    async def sweep(self):
+        """Probe every endpoint once, all at the same time"""
+        return await asyncio.gather(*(self.probe(endpoint) for endpoint in self.endpoints))
+
+    async def run(self, duration=None):
+        """Probe each endpoint every `interval` seconds until cancelled (or for `duration`)
+
+        First probes are spread over the first second so hundreds of
+        instances don't all connect at once; a probe slower than its interval
+        skips the slots it missed instead of bursting to catch up.
+        """
+        loop = asyncio.get_running_loop()
+        begin = loop.time()
+        count = max(len(self.endpoints), 1)
+
+        async def schedule(endpoint, offset):
+            due = begin + offset
+            while duration is None or due - begin < duration:
+                await asyncio.sleep(max(0.0, due - loop.time()))
+                await self.probe(endpoint)
+                due += endpoint.interval
+                while due < loop.time():
+                    due += endpoint.interval
+
+        await asyncio.gather(*(schedule(endpoint, min(endpoint.interval, 1.0) * i / count)
+                               for i, endpoint in enumerate(self.endpoints)))
+
+    async def close(self):
+        await self.transport.close()
+
+
+def log_sink(result):
+    """The classic one-line-per-service console output"""
+    name = result['endpoint']
+    if result['healthy']:
+        logger.info(f"✅ {name}: HEALTHY ({result['latency_ms']:.0f}ms)")
+    elif result['error'] == 'timeout':
+        logger.error(f"⏱️  {name}: TIMEOUT")
+    elif result['error'] == 'connection_failed':
+        logger.error(f"💥 {name}: CONNECTION FAILED")
+    elif result['error']:
+        logger.error(f"🚫 {name}: ERROR - {result['error']}")
+    else:
+        logger.error(f"❌ {name}: UNHEALTHY (status: {result['status']})")
+
+
+class JsonLinesSink:
+    """One JSON object per probe, flushed immediately so `tail -f` works"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def __call__(self, result):
+        self.stream.write(json.dumps(result) + "\n")
+        self.stream.flush()
+
+
+class PrometheusSink:
+    """Gauges per endpoint, in a registry of its own (served or rendered on demand)"""
+
+    def __init__(self):
+        if CollectorRegistry is None:
+            raise RuntimeError("prometheus_client is required for Prometheus output")
+        self.registry = CollectorRegistry()
+        labels = ['endpoint']
+        self.up = Gauge('health_check_up', 'Whether the last probe succeeded', labels, registry=self.registry)
+        self.latency = Gauge('health_check_latency_seconds', 'Duration of the last probe', labels,
+                             registry=self.registry)
+        self.status = Gauge('health_check_status_code', 'HTTP status of the last probe (0 if none)', labels,
+                            registry=self.registry)
+        self.probes = Counter('health_checks', 'Probes by outcome', labels + ['result'], registry=self.registry)
+
+    def __call__(self, result):
+        name = result['endpoint']
+        self.up.labels(name).set(1 if result['healthy'] else 0)
+        self.latency.labels(name).set(result['latency_ms'] / 1000)
+        self.status.labels(name).set(result['status'] or 0)
+        outcome = 'healthy' if result['healthy'] else result['error'] or f"http_{result['status']}"
+        self.probes.labels(name, outcome).inc()
+
+    def serve(self, port, addr='0.0.0.0'):
+        start_http_server(port, addr=addr, registry=self.registry)
+
+    def exposition(self):
+        return generate_latest(self.registry).decode()
@@ -0,0 +1,294 @@
+# simulator/load_test.py
+"""
+Concurrent load generator for the Flask services.
+
+Two transports share one interface:
+
+  HttpTransport       - asyncio HTTP/1.1 client with a keep-alive connection
+                        pool per service
+  InProcessTransport  - calls each app's Flask test client on a thread pool,
+                        so a load test runs with no network at all
+
+LoadTest drives either transport open-loop (constant arrival rate, latency
+measured from the scheduled send time so a slow server can't hide queueing)
+or closed-loop (N virtual users back to back), and records per-endpoint
+HDR-style latency histograms, status codes and error breakdowns.
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from simulator.histogram import LatencyHistogram
+from simulator.services import SERVICE_PORTS, load_service_app
+
+
+def _user_request(rng, n):
+    return '/users/' + str(rng.choice([123, 456, rng.randint(1, 10000)])), None
+
+
+def _order_request(rng, n):
+    return '/orders', {'id': n, 'user_id': rng.randint(1, 10000),
+                       'items': [{'sku': f'SKU-{rng.randint(1, 500)}', 'qty': rng.randint(1, 3)}]}
+
+
+def _payment_request(rng, n):
+    return '/payments', {'id': n, 'order_id': n, 'amount': round(rng.uniform(5, 500), 2), 'currency': 'USD'}
+
+
+# (endpoint name, method, service, weight, request factory -> (path, json body))
+DEFAULT_SCENARIO = (
+    ('GET /users/<id>', 'GET', 'user-service', 4, _user_request),
+    ('GET /products', 'GET', 'product-service', 4, lambda rng, n: ('/products', None)),
+    ('POST /orders', 'POST', 'order-service', 1, _order_request),
+    ('POST /payments', 'POST', 'payment-service', 1, _payment_request),
+)
+
+
+class _Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class HttpTransport:
+    """Minimal asyncio HTTP/1.1 client with a bounded keep-alive pool per service"""
+
+    def __init__(self, base_urls=None, pool_size=100, timeout=10.0):
+        base_urls = base_urls or {name: f"http://localhost:{port}" for name, port in SERVICE_PORTS.items()}
+        self.targets = {}
+        for service, url in base_urls.items():
+            parts = urlsplit(url)
+            self.targets[service] = (parts.hostname, parts.port or 80)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = {service: [] for service in self.targets}
+        self._slots = {}
+        self.connections_opened = 0
+
+    def _slot(self, service):
+        if service not in self._slots:
+            self._slots[service] = asyncio.Semaphore(self.pool_size)
+        return self._slots[service]
+
+    async def request(self, service, method, path, body=None):
+        """Send one request, return (status, response bytes)"""
+        async with self._slot(service):
+            idle = self._idle[service]
+            connection = idle.pop() if idle else None
+            try:
+                if connection is None:
+                    host, port = self.targets[service]
+                    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.timeout)
+                    connection = _Connection(reader, writer)
+                    self.connections_opened += 1
+                status, size, keep_alive = await asyncio.wait_for(
+                    self._exchange(connection, service, method, path, body), self.timeout
+                )
+            except BaseException:
+                if connection is not None:
+                    connection.close()
+                raise
+            if keep_alive:
+                idle.append(connection)
+            else:
+                connection.close()
+            return status, size
+
+    async def _exchange(self, connection, service, method, path, body):
+        host, port = self.targets[service]
+        payload = json.dumps(body).encode() if body is not None else b''
+        head = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}", "Connection: keep-alive",
+                f"Content-Length: {len(payload)}"]
+        if body is not None:
+            head.append("Content-Type: application/json")
+        connection.writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + payload)
+        await connection.writer.drain()
+
+        reader = connection.reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by server")
+        version, status = status_line.split(b' ', 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            size = 0
+            while True:
+                length = int((await reader.readline()).split(b';')[0], 16)
+                if length == 0:
+                    await reader.readline()
+                    break
+                size += len(await reader.readexactly(length))
+                await reader.readline()
+        elif 'content-length' in headers:
+            size = len(await reader.readexactly(int(headers['content-length'])))
+        else:
+            size = len(await reader.read())
+            keep_alive = False
+        return int(status), size, keep_alive
+
+    async def close(self):
+        for idle in self._idle.values():
+            while idle:
+                idle.pop().close()
+
+
+class InProcessTransport:
+    """Drive the Flask apps through their test clients - no sockets involved"""
+
+    def __init__(self, services=None, workers=64):
+        self.apps = {service: load_service_app(service) for service in (services or SERVICE_PORTS)}
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inprocess-load")
+
+    def _call(self, service, method, path, body):
+        client = self.apps[service].test_client()
+        response = client.open(path, method=method, json=body)
+        return response.status_code, len(response.get_data())
+
+    async def request(self, service, method, path, body=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._call, service, method, path, body)
+
+    async def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class EndpointStats:
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.bytes = 0
+
+    @property
+    def requests(self):
+        return self.histogram.total
+
+    def report(self, seconds):
+        errors = sum(self.errors.values())
+        return {
+            'requests': self.requests,
+            'throughput_rps': round(self.requests / seconds, 2) if seconds else 0,
+            'latency_ms': {key: round(value, 3) for key, value in self.histogram.summary().items()},
+            'status_codes': {str(code): count for code, count in sorted(self.statuses.items())},
+            'errors': dict(self.errors.most_common()),
+            'error_rate': round(100.0 * errors / self.requests, 2) if self.requests else 0.0,
+            'bytes': self.bytes,
+        }
+
+
+class LoadTest:
+    """Open- or closed-loop load against a transport, with per-endpoint statistics"""
+
+    def __init__(self, transport, scenario=DEFAULT_SCENARIO, seed=None):
+        self.transport = transport
+        self.scenario = scenario
+        self.rng = random.Random(seed)
+        self._weights = [weight for _, _, _, weight, _ in scenario]
+        self.stats = {name: EndpointStats() for name, _, _, _, _ in scenario}
+        self.sent = 0
+        self.dropped = 0
+        self.elapsed = 0.0
+
+    async def _one(self, started=None):
+        name, method, service, _, factory = self.rng.choices(self.scenario, self._weights)[0]
+        self.sent += 1
+        path, body = factory(self.rng, self.sent)
+        stats = self.stats[name]
+        started = started if started is not None else time.perf_counter()
+        try:
+            status, size = await self.transport.request(service, method, path, body)
+        except Exception as e:
+            stats.histogram.record_seconds(time.perf_counter() - started)
+            stats.errors[type(e).__name__] += 1
+            return
+        stats.histogram.record_seconds(time.perf_counter() - started)
+        stats.statuses[status] += 1
+        stats.bytes += size
+        if status >= 400:
+            stats.errors[f"HTTP {status}"] += 1
+
+    async def open_loop(self, rate, duration, max_in_flight=10000):
+        """Send `rate` requests/sec for `duration` seconds regardless of response times"""
+        interval = 1.0 / rate
+        begin = time.perf_counter()
+        in_flight = set()
+        n = 0
+        while True:
+            scheduled = begin + n * interval
+            if scheduled - begin >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            n += 1
+            if len(in_flight) >= max_in_flight:
+                self.dropped += 1
+                continue
+            # Latency counts from the scheduled time (coordinated-omission safe)
+            task = asyncio.ensure_future(self._one(started=scheduled))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        self.elapsed = time.perf_counter() - begin
+
+    async def closed_loop(self, users, duration, think_time=0.0):
+        """`users` virtual users each send back-to-back requests for `duration` seconds"""
+        begin = time.perf_counter()
+        deadline = begin + duration
+
+        async def user():
+            while time.perf_counter() < deadline:
+                await self._one()
+                if think_time:
+                    await asyncio.sleep(self.rng.expovariate(1 / think_time))
+
+        await asyncio.gather(*(user() for _ in range(users)))
+        self.elapsed = time.perf_counter() - begin
+
+    def report(self):
+        total = EndpointStats()
+        for stats in self.stats.values():
+            total.histogram.merge(stats.histogram)
+            total.statuses.update(stats.statuses)
+            total.errors.update(stats.errors)
+            total.bytes += stats.bytes
+        return {
+            'elapsed_seconds': round(self.elapsed, 3),
+            'dropped': self.dropped,
+            'endpoints': {name: stats.report(self.elapsed) for name, stats in self.stats.items()},
+            'total': total.report(self.elapsed),
+        }
+
+
+def run(transport, mode='closed', rate=50.0, users=10, duration=10.0, think_time=0.0, seed=None):
+    """Run a load test to completion and return its report"""
+    test = LoadTest(transport, seed=seed)
+
+    async def main():
+        try:
+            if mode == 'open':
+                await test.open_loop(rate, duration)
+            else:
+                await test.closed_loop(users, duration, think_time)
+        finally:
+            await transport.close()
+
+    asyncio.run(main())
+    return test.report()
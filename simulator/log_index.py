@@ -0,0 +1,351 @@
+# simulator/log_index.py
+"""
+Incremental log indexer for the logs/ directory.
+
+Application, error and access logs are read from the last remembered byte
+offset, so a growing file is tailed rather than re-read. Each indexed line is
+stored in SQLite as (timestamp, file, byte offset, length, level, service,
+status) - the text itself stays in the log file and queries seek straight to
+it. Access logs are large, so only 4xx/5xx lines are indexed individually;
+every file also gets sparse time checkpoints for range scans.
+
+Rotated segments (`<kind>_<run>.NNNN.log`, optionally .gz/.zst) are indexed
+like any other file. A segment renamed away from the active file keeps its
+row and offset, and a segment compressed after indexing is not read again.
+"""
+
+import glob
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+from simulator.log_rotation import open_log, split_compression
+
+# kind, run, segment number (rotated files only), compression
+LOG_PATTERN = re.compile(r'^(application|error|access)_(.+?)(?:\.(\d+))?\.log(?:\.(gz|zst))?$')
+KIND_ORDER = {'application': 0, 'error': 1, 'access': 2}
+APP_LINE = re.compile(rb'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) - [^ ]+ - ([A-Z]+) - (.*)$')
+ACCESS_LINE = re.compile(rb'^\S+ \S+ \S+ \[([^\]]+?)(?: [+-]\d{4})?\] "(\S+) (\S+)[^"]*" (\d{3}) ')
+SERVICE = re.compile(rb'\b(user|product|order|payment)-service\b')
+INCIDENT = re.compile(r'INCIDENT TRIGGERED: (\S+)')
+
+PATH_SERVICES = (('/users', 'user-service'), ('/products', 'product-service'),
+                 ('/orders', 'order-service'), ('/payments', 'payment-service'))
+
+CHECKPOINT_EVERY = 4096
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    run TEXT NOT NULL,
+    inode INTEGER,
+    offset INTEGER NOT NULL DEFAULT 0,
+    lines INTEGER NOT NULL DEFAULT 0,
+    open_entry INTEGER
+);
+CREATE TABLE IF NOT EXISTS entries (
+    ts REAL NOT NULL,
+    file_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    level TEXT,
+    service TEXT,
+    status INTEGER
+);
+CREATE INDEX IF NOT EXISTS entries_service_level_ts ON entries (service, level, ts);
+CREATE INDEX IF NOT EXISTS entries_level_ts ON entries (level, ts);
+CREATE INDEX IF NOT EXISTS entries_ts ON entries (ts);
+CREATE TABLE IF NOT EXISTS incidents (
+    ts REAL NOT NULL,
+    run TEXT NOT NULL,
+    name TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS incidents_name_ts ON incidents (name, ts);
+CREATE INDEX IF NOT EXISTS incidents_run_ts ON incidents (run, ts);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    file_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS checkpoints_file_ts ON checkpoints (file_id, ts);
+"""
+
+
+class _Timestamps:
+    """Parse log timestamps with a per-second cache"""
+
+    def __init__(self):
+        self._cache = {}
+
+    def app(self, second, millis):
+        base = self._cache.get(second)
+        if base is None:
+            base = self._cache[second] = datetime.strptime(second.decode(), '%Y-%m-%d %H:%M:%S').timestamp()
+        return base + int(millis) / 1000
+
+    def access(self, stamp):
+        base = self._cache.get(stamp)
+        if base is None:
+            base = self._cache[stamp] = datetime.strptime(stamp.decode(), '%d/%b/%Y:%H:%M:%S').timestamp()
+        return base
+
+
+def _path_service(path):
+    for prefix, service in PATH_SERVICES:
+        if path.startswith(prefix):
+            return service
+    return None
+
+
+def log_files(log_dir="logs"):
+    """Runner log files in `log_dir` as (path, kind, run)
+
+    Files are grouped by run and kind, application logs first. Each kind's
+    rotated segments come oldest first, then the active file. While a
+    segment is being compressed, only its plain file is listed.
+    """
+    found = {}
+    for path in glob.glob(os.path.join(log_dir, "*.log*")):
+        match = LOG_PATTERN.match(os.path.basename(path))
+        if match:
+            kind, run, segment, compression = match.groups()
+            plain = split_compression(path)[0]
+            if compression is None or plain not in found:
+                segment = int(segment) if segment else float('inf')
+                found[plain] = (path, kind, run, segment)
+    ordered = sorted(found.values(), key=lambda item: (item[2], KIND_ORDER[item[1]], item[3]))
+    return [(path, kind, run) for path, kind, run, _ in ordered]
+
+
+def _to_epoch(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+
+class LogIndex:
+    """SQLite index over application/error/access logs with resumable offsets"""
+
+    def __init__(self, db_path, log_dir="logs"):
+        self.log_dir = log_dir
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._timestamps = _Timestamps()
+
+    def close(self):
+        self.db.close()
+
+    def log_files(self):
+        """Log files under log_dir as (path, kind, run), application logs first"""
+        return log_files(self.log_dir)
+
+    def update(self):
+        """Index whatever was appended since the last call; returns lines indexed"""
+        total = 0
+        for path, kind, run in self.log_files():
+            total += self._index_file(path, kind, run)
+        return total
+
+    def _file_row(self, path, kind, run, inode, compressed=False):
+        """(file id, offset, lines) to resume `path` (its uncompressed name) from, or None if done"""
+        row = self.db.execute("SELECT id, inode, offset, lines FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None and not compressed:
+            row = self._renamed(path, kind, run, inode)
+        if row is None:
+            cursor = self.db.execute(
+                "INSERT INTO files (path, kind, run, inode) VALUES (?, ?, ?, ?)", (path, kind, run, inode)
+            )
+            return cursor.lastrowid, 0, 0
+        file_id, known_inode, offset, lines = row
+        if compressed:
+            # Closed segments never change: a new inode only means it was compressed since
+            if known_inode == inode:
+                return None
+            self.db.execute("UPDATE files SET inode = ? WHERE id = ?", (inode, file_id))
+            return file_id, offset, lines
+        if known_inode != inode or os.path.getsize(path) < offset:
+            # Rotated or truncated: start over for this path
+            for table in ("entries", "incidents", "checkpoints"):
+                self.db.execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
+            self.db.execute("UPDATE files SET inode = ?, offset = 0, lines = 0, open_entry = NULL WHERE id = ?",
+                            (inode, file_id))
+            return file_id, 0, 0
+        return file_id, offset, lines
+
+    def _renamed(self, path, kind, run, inode):
+        """The row of a file that was rotated to `path`: same inode, and its old path no longer has it"""
+        for row in self.db.execute("SELECT id, path, inode, offset, lines FROM files "
+                                   "WHERE inode = ? AND kind = ? AND run = ? AND path != ?",
+                                   (inode, kind, run, path)).fetchall():
+            file_id, old_path, known_inode, offset, lines = row
+            try:
+                moved = os.stat(old_path).st_ino != inode
+            except FileNotFoundError:
+                moved = True
+            if moved and os.path.getsize(path) >= offset:
+                self.db.execute("UPDATE files SET path = ? WHERE id = ?", (path, file_id))
+                return file_id, known_inode, offset, lines
+        return None
+
+    def _index_file(self, path, kind, run):
+        inode = os.stat(path).st_ino
+        plain, compression = split_compression(path)
+        with self.db:
+            row = self._file_row(plain, kind, run, inode, compressed=compression is not None)
+            if row is None:
+                return 0
+            file_id, offset, lines = row
+            if compression is None and os.path.getsize(path) == offset:
+                return 0
+            entries, incidents, checkpoints = [], [], []
+            last = None  # [ts, offset, length, level, service, status] of the open record
+            # The last record indexed by the previous pass may continue here
+            # (a METRICS JSON flushed mid-record): its entry is extended
+            open_entry = self.db.execute("SELECT open_entry FROM files WHERE id = ?", (file_id,)).fetchone()[0]
+            extend = 0
+            count = 0
+            with open_log(path) as f:
+                f.seek(offset)
+                position = offset
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # partial line still being written; pick it up next time
+                    length = len(line)
+                    if kind == 'access':
+                        record = self._access(line)
+                        if record is not None:
+                            ts, service, status = record
+                            if status >= 400:
+                                entries.append((ts, file_id, position, length, 'ACCESS', service, status))
+                            if lines % CHECKPOINT_EVERY == 0:
+                                checkpoints.append((file_id, ts, position))
+                    else:
+                        match = APP_LINE.match(line.rstrip(b'\r\n'))
+                        if match:
+                            if last is not None:
+                                entries.append(tuple([last[0], file_id] + last[1:]))
+                            second, millis, level, message = match.groups()
+                            ts = self._timestamps.app(second, millis)
+                            service = SERVICE.search(message)
+                            last = [ts, position, length, level.decode(),
+                                    service.group(0).decode() if service else None, None]
+                            if b'INCIDENT TRIGGERED' in message:
+                                name = INCIDENT.search(message.decode('utf-8', 'replace'))
+                                if name:
+                                    incidents.append((ts, run, name.group(1), file_id, position))
+                            if lines % CHECKPOINT_EVERY == 0:
+                                checkpoints.append((file_id, ts, position))
+                        elif last is not None:
+                            # Continuation of a multi-line record (e.g. METRICS JSON)
+                            last[2] += length
+                        elif open_entry is not None:
+                            extend += length
+                    position += length
+                    lines += 1
+                    count += 1
+            if extend:
+                self.db.execute("UPDATE entries SET length = length + ? WHERE rowid = ?", (extend, open_entry))
+
+            self.db.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", entries)
+            if last is not None:
+                # Kept apart so the next pass can find it by rowid
+                open_entry = self.db.execute("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                             tuple([last[0], file_id] + last[1:])).lastrowid
+            self.db.executemany("INSERT INTO incidents VALUES (?, ?, ?, ?, ?)", incidents)
+            self.db.executemany("INSERT INTO checkpoints VALUES (?, ?, ?)", checkpoints)
+            self.db.execute("UPDATE files SET offset = ?, lines = ?, open_entry = ? WHERE id = ?",
+                            (position, lines, open_entry, file_id))
+        return count
+
+    def _access(self, line):
+        match = ACCESS_LINE.match(line)
+        if not match:
+            return None
+        stamp, _, path, status = match.groups()
+        return self._timestamps.access(stamp), _path_service(path.decode()), int(status)
+
+    def incidents(self, name=None, start=None, end=None):
+        """(ts, run, name) of triggered incidents, optionally filtered"""
+        sql, args = "SELECT ts, run, name FROM incidents WHERE 1=1", []
+        if name:
+            sql += " AND name = ?"
+            args.append(name)
+        if start is not None:
+            sql += " AND ts >= ?"
+            args.append(_to_epoch(start))
+        if end is not None:
+            sql += " AND ts <= ?"
+            args.append(_to_epoch(end))
+        return self.db.execute(sql + " ORDER BY ts", args).fetchall()
+
+    def query(self, service=None, level=None, start=None, end=None, incident=None, kind=None, limit=None):
+        """Yield (ts, path, text) for matching lines, read by seeking into the log files
+
+        `level` is a level name or a list of them ('ACCESS' selects 4xx/5xx
+        access lines); `incident` limits results to the windows between each
+        trigger of that scenario and the next incident in the same run.
+        """
+        sql = ("SELECT e.ts, f.path, e.offset, e.length FROM entries e JOIN files f ON f.id = e.file_id "
+               "WHERE 1=1")
+        args = []
+        if service:
+            sql += " AND e.service = ?"
+            args.append(service)
+        if level:
+            levels = [level] if isinstance(level, str) else list(level)
+            sql += f" AND e.level IN ({','.join('?' * len(levels))})"
+            args.extend(name.upper() for name in levels)
+        if start is not None:
+            sql += " AND e.ts >= ?"
+            args.append(_to_epoch(start))
+        if end is not None:
+            sql += " AND e.ts <= ?"
+            args.append(_to_epoch(end))
+        if kind:
+            sql += " AND f.kind = ?"
+            args.append(kind)
+        if incident:
+            sql += (" AND EXISTS (SELECT 1 FROM incidents i WHERE i.name = ? AND i.run = f.run AND i.ts <= e.ts"
+                    " AND NOT EXISTS (SELECT 1 FROM incidents j WHERE j.run = i.run"
+                    " AND j.ts > i.ts AND j.ts <= e.ts))")
+            args.append(incident)
+        sql += " ORDER BY e.ts, e.file_id, e.offset"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+
+        handles = {}
+        compressed = set()
+        try:
+            for ts, path, offset, length in self.db.execute(sql, args):
+                handle = handles.get(path)
+                if handle is not None and path in compressed and offset < handle.tell():
+                    # Compressed segments only seek forward cheaply (zstd not at all): reopen to go back
+                    handle.close()
+                    handle = None
+                if handle is None:
+                    handle = handles[path] = open_log(path)
+                    if not os.path.exists(path):
+                        compressed.add(path)
+                handle.seek(offset)
+                yield ts, path, handle.read(length).decode('utf-8', 'replace').rstrip('\n')
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+    def seek_time(self, path, ts):
+        """Byte offset in `path` at or before the first line at time `ts` (for raw range scans)"""
+        row = self.db.execute(
+            "SELECT c.offset FROM checkpoints c JOIN files f ON f.id = c.file_id "
+            "WHERE f.path = ? AND c.ts <= ? ORDER BY c.ts DESC LIMIT 1", (path, _to_epoch(ts))
+        ).fetchone()
+        return row[0] if row else 0
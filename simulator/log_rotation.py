@@ -0,0 +1,361 @@
+# simulator/log_rotation.py
+"""
+Segmented log files: rotation, background compression and retention.
+
+A RotatingFile is the active segment `<name>.log`. When the segment reaches
+`max_bytes`, or a record's time crosses an `interval` boundary (the record's
+own timestamp, so simulated time in fast-forward runs), the segment is
+renamed to `<name>.NNNN.log` and a fresh `<name>.log` is opened. Sequence
+numbers increase, so sorting by number puts the segments in time order.
+
+Closed segments go to a SegmentArchiver. It runs on its own thread, so the
+log writer only pays for a rename. The archiver compresses each segment
+(`.log.gz` or `.log.zst`), then deletes the oldest closed segments once
+they are older than `max_age` or their total size is over `max_total_bytes`.
+The active segment is never compressed or deleted. When the sink starts,
+the archiver also adopts the files of the same kinds that earlier runs
+left in the directory. They are compressed and pruned the same way, by
+modification time since they carry no record time, and always count as
+older than this run's segments.
+
+open_log() opens any of these files for reading in binary mode. A plain
+path whose segment has since been compressed is resolved to the compressed
+file, so readers can keep using the paths they stored.
+"""
+
+import glob
+import gzip
+import io
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - only needed for zstd compression
+    zstandard = None
+
+COMPRESSIONS = ('gzip', 'zstd')
+SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+SEGMENT = re.compile(r'\.(\d+)\.log(?:\.gz|\.zst)?$')
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+def split_compression(path):
+    """(uncompressed path, compression or None) for a log path"""
+    for compression, suffix in SUFFIXES.items():
+        if path.endswith(suffix):
+            return path[:-len(suffix)], compression
+    return path, None
+
+
+def open_log(path):
+    """Open a plain, .gz or .zst log file for binary reading
+
+    If `path` is a plain segment that has since been compressed, the
+    compressed file is opened instead.
+    """
+    if not os.path.exists(path) and split_compression(path)[1] is None:
+        for suffix in SUFFIXES.values():
+            if os.path.exists(path + suffix):
+                path += suffix
+                break
+    compression = split_compression(path)[1]
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        _require_zstandard()
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return io.BufferedReader(reader, 1 << 20)
+    return open(path, 'rb')
+
+
+def compress_file(path, compression):
+    """Compress `path` to `path.gz`/`path.zst` and remove it; returns the new path
+
+    The output goes to a temporary name first, so readers never see a
+    half-written archive.
+    """
+    target = path + SUFFIXES[compression]
+    partial = target + '.tmp'
+    with open(path, 'rb') as source:
+        if compression == 'gzip':
+            with gzip.open(partial, 'wb', compresslevel=GZIP_LEVEL) as sink:
+                shutil.copyfileobj(source, sink, 1 << 20)
+        else:
+            _require_zstandard()
+            with open(partial, 'wb') as raw:
+                with zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False) as sink:
+                    shutil.copyfileobj(source, sink, 1 << 20)
+    os.replace(partial, target)
+    os.unlink(path)
+    return target
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise RuntimeError("zstd log compression needs the 'zstandard' package")
+
+
+class RotationPolicy:
+    """When to rotate, how to compress and what to keep
+
+    `interval` and `max_age` are seconds in the records' own time. Each
+    size is a number of bytes on disk.
+    """
+
+    def __init__(self, max_bytes=None, interval=None, compression=None, max_age=None, max_total_bytes=None):
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"compression must be one of {COMPRESSIONS}, got {compression!r}")
+        if compression == 'zstd':
+            _require_zstandard()
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.compression = compression
+        self.max_age = max_age
+        self.max_total_bytes = max_total_bytes
+
+    @property
+    def archives(self):
+        """Whether closed segments need any background work"""
+        return bool(self.compression or self.max_age or self.max_total_bytes)
+
+
+class SegmentArchiver:
+    """Background thread that compresses closed segments and applies retention"""
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.segments = []  # [path, end time or None if adopted, bytes] of closed segments still on disk
+        self.archived = 0
+        self.adopted = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.deleted = 0
+        self.deleted_bytes = 0
+        self.errors = 0
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def submit(self, path, end):
+        """Queue a closed segment whose last record was written at time `end`"""
+        self._put(self._archive, path, end)
+
+    def adopt(self, paths):
+        """Queue closed log files left by earlier runs for compression and retention"""
+        if paths:
+            self._put(self._adopt, sorted(paths))
+
+    def _put(self, method, *args):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-archiver", daemon=True)
+            self._thread.start()
+        self._queue.put((method, args))
+
+    def wait(self):
+        """Block until every submitted segment has been processed"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is _STOP:
+                    return
+                method, args = job
+                method(*args)
+            except OSError as e:
+                # A failed segment stays on disk uncompressed; the writer keeps going
+                self.errors += 1
+                logger.warning(f"log archiver: {getattr(e, 'filename', None) or job[1][0]}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _archive(self, path, end):
+        size = os.path.getsize(path)
+        if self.policy.compression:
+            path = compress_file(path, self.policy.compression)
+            self.bytes_in += size
+            size = os.path.getsize(path)
+            self.bytes_out += size
+            self.archived += 1
+        self.segments.append([path, end, size])
+        self._prune(end)
+
+    def _adopt(self, paths):
+        now = time.time()
+        found = []
+        for path in paths:
+            try:
+                found.append((os.path.getmtime(path), path))
+            except OSError:
+                continue  # compressed or removed since it was listed
+        adopted = []
+        for mtime, path in sorted(found):
+            try:
+                if self.policy.max_age is not None and now - mtime > self.policy.max_age:
+                    self._delete([path, None, os.path.getsize(path)])
+                    continue
+                size = os.path.getsize(path)
+                if self.policy.compression and split_compression(path)[1] is None:
+                    path = compress_file(path, self.policy.compression)
+                    self.bytes_in += size
+                    size = os.path.getsize(path)
+                    self.bytes_out += size
+                    self.archived += 1
+            except OSError as e:
+                self.errors += 1
+                logger.warning(f"log archiver: {path}: {e}")
+                continue
+            adopted.append([path, None, size])
+        self.adopted += len(adopted)
+        # Earlier runs come before anything this run closes (None sorts first)
+        self.segments[:0] = adopted
+        self._prune(None)
+
+    def _prune(self, now):
+        self.segments.sort(key=lambda segment: segment[1] if segment[1] is not None else float('-inf'))
+        if self.policy.max_age is not None and now is not None:
+            while self.segments and self.segments[0][1] is not None \
+                    and now - self.segments[0][1] > self.policy.max_age:
+                self._delete(self.segments.pop(0))
+        if self.policy.max_total_bytes is not None:
+            total = sum(segment[2] for segment in self.segments)
+            while self.segments and total > self.policy.max_total_bytes:
+                segment = self.segments.pop(0)
+                total -= segment[2]
+                self._delete(segment)
+
+    def _delete(self, segment):
+        os.unlink(segment[0])
+        self.deleted += 1
+        self.deleted_bytes += segment[2]
+
+    def stats(self):
+        return {
+            'archived': self.archived,
+            'adopted': self.adopted,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'deleted': self.deleted,
+            'deleted_bytes': self.deleted_bytes,
+            'retained': len(self.segments),
+            'retained_bytes': sum(segment[2] for segment in self.segments),
+            'errors': self.errors,
+        }
+
+
+class RotatingFile:
+    """Append-only `<name>.log` that rotates into numbered segments
+
+    Only the LogSink writer thread calls write_lines(), so no locking is
+    needed. Rotation happens between records, except that a single item
+    too big for the remaining space (a multi-line access log chunk) is
+    split at a line boundary.
+    """
+
+    def __init__(self, path, policy, archiver=None, buffer_size=1 << 20):
+        self.path = path
+        self.policy = policy
+        self.archiver = archiver
+        self.buffer_size = buffer_size
+        self.stem, self.ext = os.path.splitext(path)
+        # Continue numbering after segments left by an earlier run with the same name
+        existing = [int(match.group(1)) for match in map(SEGMENT.search, glob.glob(f"{glob.escape(self.stem)}.*"))
+                    if match]
+        self.sequence = max(existing, default=0)
+        self.rotations = 0
+        self.boundary = None  # next interval boundary, set from the first timestamped record after one
+        self.last = None  # newest record time written
+        self._open()
+
+    def earlier_files(self):
+        """Closed files of this log's kind (`<kind>_*.log[.gz|.zst]`) already in its directory"""
+        directory = os.path.dirname(self.path)
+        kind = os.path.basename(self.stem).partition('_')[0]
+        name = re.compile(rf'{re.escape(kind)}_.+{re.escape(self.ext)}(?:\.gz|\.zst)?$')
+        return [path for path in glob.glob(os.path.join(glob.escape(directory), f"{glob.escape(kind)}_*"))
+                if name.match(os.path.basename(path)) and path != self.path]
+
+    def _open(self):
+        self._file = open(self.path, 'ab', buffering=self.buffer_size)
+        self.size = self._file.tell()
+
+    def write_lines(self, lines, times):
+        """Write each line (without newline); `times[i]` is its record time or None"""
+        pending, pending_size = [], 0
+        max_bytes = self.policy.max_bytes
+        interval = self.policy.interval
+        for line, ts in zip(lines, times):
+            data = line.encode('utf-8') + b'\n'
+            if ts is not None:
+                if self.boundary is not None and ts >= self.boundary:
+                    if self.size + pending_size:
+                        self._write(pending)
+                        pending_size = 0
+                        self.rotate()
+                    self.boundary = None
+                if interval and self.boundary is None:
+                    self.boundary = (ts // interval + 1) * interval
+                self.last = ts
+            while max_bytes and self.size + pending_size + len(data) > max_bytes:
+                used = self.size + pending_size
+                cut = data.rfind(b'\n', 0, max_bytes - used) + 1 if max_bytes > used else 0
+                if cut == 0 and used == 0:
+                    cut = data.find(b'\n') + 1  # one line longer than max_bytes gets a segment to itself
+                if cut == len(data):
+                    break
+                if cut:
+                    pending.append(data[:cut])
+                    data = data[cut:]
+                self._write(pending)
+                pending_size = 0
+                self.rotate()
+            pending.append(data)
+            pending_size += len(data)
+        self._write(pending)
+
+    def _write(self, pending):
+        if pending:
+            data = b''.join(pending)
+            self._file.write(data)
+            self.size += len(data)
+            pending.clear()
+
+    def rotate(self):
+        """Close the active segment as `<name>.NNNN.log` and start a new one"""
+        if self.size == 0:
+            return None
+        self._file.close()
+        self.sequence += 1
+        closed = f"{self.stem}.{self.sequence:04d}{self.ext}"
+        os.replace(self.path, closed)
+        self.rotations += 1
+        end = self.last
+        self._open()
+        if self.archiver is not None:
+            self.archiver.submit(closed, end)
+        return closed
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,261 @@
+# simulator/log_sink.py
+"""
+Queue-based log sink.
+
+Producers only enqueue (stream name, record or preformatted line). A single
+background writer drains the queue in batches, formats records and issues one
+large buffered write per stream per batch, so logging never touches the disk
+on the calling thread. With a RotationPolicy, file streams rotate into
+segments on that same writer thread, and a SegmentArchiver thread compresses
+and prunes the closed segments. A record may carry `line_times`, one time
+per line of a multi-line message, so a chunk of access log lines rotates
+at the right line instead of as one item.
+
+A failing stream (disk full, I/O error, a record that doesn't format) never
+stops the writer: the items are counted in `write_errors` and dropped, and the
+writer keeps draining, so flush() and blocking put() calls always return.
+"""
+
+import atexit
+import logging
+import queue
+import sys
+import threading
+
+from simulator.log_rotation import RotatingFile, SegmentArchiver
+
+OVERFLOW_POLICIES = ('block', 'drop_newest', 'drop_oldest')
+
+_STOP = object()
+
+
+class _Stream:
+    def __init__(self, name, target, formatter, owned):
+        self.name = name
+        self.target = target
+        self.formatter = formatter
+        self.owned = owned
+        self.rotating = isinstance(target, RotatingFile)
+
+
+class LogSink:
+    """Bounded queue plus a background writer that batches writes per stream"""
+
+    def __init__(self, max_queue=100000, overflow='block', batch_size=4096,
+                 flush_interval=0.5, buffer_size=1 << 20, rotation=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.rotation = rotation
+        self.archiver = SegmentArchiver(rotation) if rotation and rotation.archives else None
+        self.streams = {}
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_errors = 0
+        self._errors_reported = set()  # streams whose first error went to stderr
+        self._counter_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._closed = False
+
+    def open_file(self, name, path, formatter=None):
+        """Route stream `name` to a buffered file opened in append mode (rotating with a policy)"""
+        if self.rotation:
+            target = RotatingFile(path, self.rotation, self.archiver, self.buffer_size)
+        else:
+            target = open(path, 'a', encoding='utf-8', buffering=self.buffer_size)
+        self.streams[name] = _Stream(name, target, formatter, owned=True)
+
+    def open_console(self, name='console', formatter=None, target=None):
+        """Route stream `name` to stderr (or another text stream we don't own)"""
+        self.streams[name] = _Stream(name, target or sys.stderr, formatter, owned=False)
+
+    def start(self):
+        if self._thread is None:
+            if self.archiver:
+                # Files earlier runs left behind fall under the same compression and retention
+                self.archiver.adopt([path for stream in self.streams.values() if stream.rotating
+                                     for path in stream.target.earlier_files()])
+            self._thread = threading.Thread(target=self._run, name="log-sink-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def put(self, stream, item):
+        """Enqueue a LogRecord or a preformatted line (without newline) for `stream`"""
+        entry = (stream, item)
+        if self.overflow == 'block':
+            self._queue.put(entry)
+        else:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                if self.overflow == 'drop_newest':
+                    with self._counter_lock:
+                        self.dropped += 1
+                    return False
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    with self._counter_lock:
+                        self.dropped += 1
+                except queue.Empty:
+                    pass
+                self._queue.put(entry)
+        with self._counter_lock:
+            self.enqueued += 1
+        return True
+
+    def flush(self):
+        """Block until everything enqueued so far has been written"""
+        if self._thread is None:
+            return
+        self._queue.join()
+        self._flush_all()
+
+    def close(self):
+        """Drain the queue, flush and close owned files (idempotent)"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            atexit.unregister(self.close)
+        self._flush_all()
+        for stream in self.streams.values():
+            if stream.owned:
+                try:
+                    stream.target.close()
+                except Exception as e:
+                    self._failed(stream, e)
+        if self.archiver:
+            self.archiver.close()
+
+    def _run(self):
+        pending = {}
+        while True:
+            try:
+                entry = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._flush_all()
+                continue
+
+            batch = [entry]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for entry in batch:
+                if entry is _STOP:
+                    stop = True
+                    continue
+                name, item = entry
+                lines = pending.get(name)
+                if lines is None:
+                    lines = pending[name] = []
+                lines.append(item)
+
+            try:
+                for name, items in pending.items():
+                    if items:
+                        self._write(name, items)
+                        items.clear()
+                self.batches += 1
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, name, items):
+        stream = self.streams.get(name)
+        if stream is None:
+            return
+        lines, times = [], []
+        count = 0
+        for item in items:
+            if isinstance(item, logging.LogRecord):
+                try:
+                    line = stream.formatter.format(item) if stream.formatter else item.getMessage()
+                except Exception as e:
+                    self._failed(stream, e)
+                    continue
+                count += 1
+                line_times = getattr(item, 'line_times', None)
+                if line_times is not None and stream.rotating and stream.formatter is None:
+                    # A multi-line chunk (access log) whose lines each carry their own time
+                    chunk = line.split('\n')
+                    lines.extend(chunk)
+                    times.extend(line_times if len(line_times) == len(chunk) else [item.created] * len(chunk))
+                else:
+                    lines.append(line)
+                    times.append(item.created)
+            else:
+                count += 1
+                lines.append(item)
+                times.append(None)
+        try:
+            if stream.rotating:
+                # Rotation needs each record's time, so lines are handed over individually
+                stream.target.write_lines(lines, times)
+            else:
+                lines.append('')
+                stream.target.write('\n'.join(lines))
+        except Exception as e:
+            self._failed(stream, e, count)
+            return
+        self.written += count
+
+    def _flush_all(self):
+        for stream in self.streams.values():
+            try:
+                stream.target.flush()
+            except Exception as e:
+                self._failed(stream, e, 0)
+
+    def _failed(self, stream, error, count=1):
+        """Count `count` lost items of `stream`; the first error per stream goes to stderr"""
+        with self._counter_lock:
+            self.write_errors += count
+            first = stream.name not in self._errors_reported
+            self._errors_reported.add(stream.name)
+        if first and stream.target is not sys.stderr:
+            try:
+                print(f"log sink: stream {stream.name!r} failed, dropping its lines: {error!r}", file=sys.stderr)
+            except Exception:
+                pass
+
+
+class SinkHandler(logging.Handler):
+    """Logging handler that only enqueues records onto a LogSink"""
+
+    def __init__(self, sink, stream, error_stream=None, echo_stream=None, level=logging.NOTSET):
+        super().__init__(level)
+        self.sink = sink
+        self.stream = stream
+        self.error_stream = error_stream
+        self.echo_stream = echo_stream
+
+    def handle(self, record):
+        # Skip Handler.handle(): no per-record lock or filters on the producer side
+        if record.levelno < self.level:
+            return False
+        if self.error_stream and record.levelno >= logging.ERROR:
+            self.sink.put(self.error_stream, record)
+        else:
+            self.sink.put(self.stream, record)
+        if self.echo_stream:
+            self.sink.put(self.echo_stream, record)
+        return True
+
+    def emit(self, record):
+        self.handle(record)
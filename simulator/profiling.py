@@ -0,0 +1,286 @@
+# simulator/profiling.py
+"""
+Opt-in per-phase instrumentation for the runner.
+
+PhaseProfiler.instrument() wraps chosen methods of an object (the
+EcommercePlatform) so each call is timed as a phase: wall and process CPU
+time, call count and slowest call. Timing costs two clock reads on each
+side of a call, which is well under 1% of any phase. On top of that:
+
+* ResourceSampler polls the process with psutil on a background thread
+  (RSS, CPU %, threads, I/O bytes), and each phase records its I/O delta.
+* One phase can carry a profiler: cProfile (exact, slower) or StackSampler
+  (walks the main thread's stack every few ms, collapsed-stack output for
+  flamegraph.pl/speedscope).
+
+report() returns everything as one JSON-ready dict; write() saves it, plus
+the profile, next to the run's logs.
+"""
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import psutil
+
+PROFILERS = ('cprofile', 'sampling')
+
+
+def _io_bytes(process):
+    try:
+        counters = process.io_counters()
+    except (AttributeError, psutil.Error):  # not available on every platform
+        return None
+    return counters.read_bytes, counters.write_bytes
+
+
+class ResourceSampler:
+    """Background psutil samples of this process every `interval` seconds"""
+
+    def __init__(self, interval=0.5, process=None):
+        self.interval = interval
+        self.process = process or psutil.Process()
+        self.samples = []  # (elapsed s, rss bytes, cpu %, threads, read bytes, write bytes)
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self.process.cpu_percent(None)  # prime: the first reading is always 0
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        with self.process.oneshot():
+            io_bytes = _io_bytes(self.process) or (None, None)
+            self.samples.append((round(time.perf_counter() - self._started, 3), self.process.memory_info().rss,
+                                 self.process.cpu_percent(None), self.process.num_threads(), *io_bytes))
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.sample()
+
+    def summary(self):
+        if not self.samples:
+            return None
+        rss = [sample[1] for sample in self.samples]
+        cpu = [sample[2] for sample in self.samples]
+        first, last = self.samples[0], self.samples[-1]
+        return {
+            'interval_s': self.interval,
+            'samples': len(self.samples),
+            'rss_mb_peak': round(max(rss) / 2**20, 1),
+            'rss_mb_mean': round(sum(rss) / len(rss) / 2**20, 1),
+            'rss_mb_last': round(rss[-1] / 2**20, 1),
+            'cpu_percent_mean': round(sum(cpu) / len(cpu), 1),
+            'cpu_percent_peak': max(cpu),
+            'threads_peak': max(sample[3] for sample in self.samples),
+            'read_mb': round((last[4] - first[4]) / 2**20, 2) if last[4] is not None else None,
+            'write_mb': round((last[5] - first[5]) / 2**20, 2) if last[5] is not None else None,
+            'timeline': self.samples,
+        }
+
+
+class StackSampler:
+    """Statistical profiler: counts the target thread's call stacks every `interval` seconds"""
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.stacks = Counter()
+        self._active = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enable(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+            self._thread.start()
+        self._active.set()
+
+    def disable(self):
+        self._active.clear()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self._active.is_set():
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self):
+        """Brendan Gregg's folded format: 'outer;inner count' per line"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, limit=15):
+        total = sum(self.stacks.values()) or 1
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return [{'function': name, 'samples': count, 'share': round(count / total, 4)}
+                for name, count in leaves.most_common(limit)]
+
+
+class PhaseProfiler:
+    """Wall/CPU time per named phase, optional resource sampling and a profiler on one phase"""
+
+    def __init__(self, resources_interval=None, profile_phase=None, profiler='cprofile', sample_interval=0.005):
+        if profiler not in PROFILERS:
+            raise ValueError(f"unknown profiler {profiler!r}; expected one of {PROFILERS}")
+        self.process = psutil.Process()
+        self.phases = {}  # name -> [calls, wall s, cpu s, max wall s, read bytes, write bytes]
+        self.sampler = ResourceSampler(resources_interval, self.process) if resources_interval else None
+        self.profile_phase = profile_phase
+        self.profiler_kind = profiler
+        self.profiler = None
+        if profile_phase:
+            self.profiler = cProfile.Profile() if profiler == 'cprofile' else StackSampler(sample_interval)
+        self._depth = 0
+        self._started = None
+        self._cpu_started = None
+        self.wall_seconds = None
+        self.cpu_seconds = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        if self.sampler:
+            self.sampler.start()
+
+    def stop(self):
+        if self._started is not None and self.wall_seconds is None:
+            self.wall_seconds = time.perf_counter() - self._started
+            self.cpu_seconds = time.process_time() - self._cpu_started
+        if self.sampler:
+            self.sampler.stop()
+        if isinstance(self.profiler, StackSampler):
+            self.profiler.close()
+
+    @contextmanager
+    def phase(self, name):
+        profiled = self.profiler is not None and name == self.profile_phase and self._depth == 0
+        io_before = _io_bytes(self.process) if self.sampler else None
+        if profiled:
+            self.profiler.enable()
+        self._depth += profiled
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            if profiled:
+                self._depth -= 1
+                self.profiler.disable()
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = [0, 0.0, 0.0, 0.0, 0, 0]
+            stats[0] += 1
+            stats[1] += wall
+            stats[2] += cpu
+            if wall > stats[3]:
+                stats[3] = wall
+            if io_before is not None:
+                io_after = _io_bytes(self.process)
+                stats[4] += io_after[0] - io_before[0]
+                stats[5] += io_after[1] - io_before[1]
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return timed
+
+    def instrument(self, obj, names):
+        """Time calls to obj.<name> for each name (bound methods are shadowed on the instance)"""
+        for name in names:
+            setattr(obj, name, self.wrap(name, getattr(obj, name)))
+
+    def overhead_per_call(self, calls=2000):
+        """Measured cost of one empty timed phase, in seconds"""
+        probe = PhaseProfiler()
+        started = time.perf_counter()
+        for _ in range(calls):
+            with probe.phase('probe'):
+                pass
+        return (time.perf_counter() - started) / calls
+
+    def report(self):
+        wall = self.wall_seconds or sum(stats[1] for stats in self.phases.values()) or 1e-9
+        calls = sum(stats[0] for stats in self.phases.values())
+        overhead = self.overhead_per_call() * calls
+        report = {
+            'wall_s': round(wall, 4),
+            'cpu_s': round(self.cpu_seconds, 4) if self.cpu_seconds is not None else None,
+            'phases': {
+                name: {
+                    'calls': stats[0],
+                    'wall_s': round(stats[1], 6),
+                    'cpu_s': round(stats[2], 6),
+                    'mean_ms': round(stats[1] / stats[0] * 1000, 4),
+                    'max_ms': round(stats[3] * 1000, 4),
+                    'share': round(stats[1] / wall, 4),
+                    **({'read_bytes': stats[4], 'write_bytes': stats[5]} if self.sampler else {}),
+                }
+                for name, stats in sorted(self.phases.items(), key=lambda item: -item[1][1])
+            },
+            'timing_overhead_s': round(overhead, 6),
+            'timing_overhead_pct': round(overhead / wall * 100, 4),
+            'resources': self.sampler.summary() if self.sampler else None,
+            'profile': None,
+        }
+        if self.profiler is not None:
+            report['profile'] = {'phase': self.profile_phase, 'profiler': self.profiler_kind}
+            if isinstance(self.profiler, StackSampler):
+                report['profile']['top'] = self.profiler.top()
+            else:
+                text = io.StringIO()
+                pstats.Stats(self.profiler, stream=text).sort_stats('cumulative').print_stats(15)
+                report['profile']['top'] = text.getvalue().splitlines()
+        return report
+
+    def write(self, directory, run_id):
+        """performance_<run>.json, plus profile_<run>.prof (cProfile) or .folded (sampling); returns the paths"""
+        paths = {'report': os.path.join(directory, f"performance_{run_id}.json")}
+        report = self.report()
+        if self.profiler is not None:
+            if isinstance(self.profiler, StackSampler):
+                paths['profile'] = os.path.join(directory, f"profile_{run_id}.folded")
+                with open(paths['profile'], 'w') as f:
+                    f.write(self.profiler.collapsed())
+            else:
+                paths['profile'] = os.path.join(directory, f"profile_{run_id}.prof")
+                self.profiler.dump_stats(paths['profile'])
+            report['profile']['path'] = os.path.basename(paths['profile'])
+        with open(paths['report'], 'w') as f:
+            json.dump(report, f, indent=2)
+        return paths, report
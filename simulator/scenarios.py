@@ -0,0 +1,177 @@
+# simulator/scenarios.py
+"""
+Incident scenario registry.
+
+Scenarios are declared in YAML (config/scenarios.yaml by default) and compiled
+once at load time: every log template is pre-split into literal text and
+field renderers, and every parameter into a sampler, so triggering an incident
+is a weighted pick plus a handful of joins.
+"""
+
+import bisect
+import itertools
+import logging
+import string
+
+from simulator.config import load_yaml, parse_duration
+from simulator.services import SERVICE_PORTS, SERVICE_STATUSES
+
+DEFAULT_SCENARIOS = "scenarios.yaml"  # under config/, always loaded first
+
+LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+    'critical': logging.CRITICAL,
+}
+
+
+def compile_param(name, spec):
+    """Turn a parameter spec into a function of the random generator"""
+    if not isinstance(spec, dict):
+        return lambda rng: spec
+    if 'int' in spec:
+        low, high = spec['int']
+        return lambda rng: rng.randint(low, high)
+    if 'float' in spec:
+        low, high = spec['float']
+        return lambda rng: rng.uniform(low, high)
+    if 'choice' in spec:
+        options = list(spec['choice'])
+        return lambda rng: rng.choice(options)
+    raise ValueError(f"parameter {name!r}: expected a constant, int, float or choice, got {spec!r}")
+
+
+def compile_template(template, known):
+    """Pre-parse a str.format template into a renderer over a params dict"""
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        if literal:
+            parts.append(literal)
+        if field is None:
+            continue
+        if field not in known:
+            raise ValueError(f"template {template!r} uses unknown parameter {field!r}")
+        if conversion:
+            raise ValueError(f"template {template!r}: conversions are not supported")
+        parts.append((field, spec or ''))
+
+    if all(isinstance(part, str) for part in parts):
+        text = ''.join(parts)
+        return lambda values: text
+
+    def render(values):
+        return ''.join(
+            part if isinstance(part, str) else format(values[part[0]], part[1]) for part in parts
+        )
+    return render
+
+
+def _coerce(text):
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+class Incident:
+    """One triggered scenario: rendered log lines plus the state change to apply"""
+
+    def __init__(self, scenario, lines, transition, duration):
+        self.scenario = scenario
+        self.lines = lines            # [(levelno, message)]
+        self.transition = transition  # {field: value} for scenario.service
+        self.duration = duration      # seconds
+
+    @property
+    def name(self):
+        return self.scenario.name
+
+    @property
+    def service(self):
+        return self.scenario.service
+
+
+class Scenario:
+    def __init__(self, name, logs, weight=1.0, service=None, transition=None, duration=None, params=None):
+        self.name = name
+        self.weight = float(weight)
+        if service is not None and service not in SERVICE_PORTS:
+            raise ValueError(f"scenario {name!r}: unknown service {service!r}, expected one of {list(SERVICE_PORTS)}")
+        self.service = service
+        params = params or {}
+        self._params = [(key, compile_param(key, spec)) for key, spec in params.items()]
+        known = set(params)
+        self._logs = []
+        for entry in logs:
+            (level, template), = entry.items()
+            if level not in LEVELS:
+                raise ValueError(f"scenario {name!r}: unknown log level {level!r}")
+            self._logs.append((LEVELS[level], compile_template(str(template), known)))
+        self._transition = []
+        for field, value in (transition or {}).items():
+            if field == 'status' and value not in SERVICE_STATUSES:
+                raise ValueError(f"scenario {name!r}: unknown transition status {value!r}, "
+                                 f"expected one of {list(SERVICE_STATUSES)}")
+            if isinstance(value, str):
+                render = compile_template(value, known)
+                self._transition.append((field, lambda values, render=render: _coerce(render(values))))
+            else:
+                self._transition.append((field, lambda values, value=value: value))
+        if service is None and self._transition:
+            raise ValueError(f"scenario {name!r}: a transition needs a service")
+        low, high = duration or (60, 900)
+        self.duration = (parse_duration(low), parse_duration(high))
+
+    def trigger(self, rng):
+        values = {key: sample(rng) for key, sample in self._params}
+        lines = [(level, render(values)) for level, render in self._logs]
+        transition = {field: resolve(values) for field, resolve in self._transition}
+        return Incident(self, lines, transition, rng.uniform(*self.duration))
+
+
+class ScenarioRegistry:
+    """Named scenarios with precomputed cumulative weights for fast picks"""
+
+    def __init__(self):
+        self.scenarios = {}
+        self._names = []
+        self._cumulative = []
+
+    def register(self, scenario):
+        self.scenarios[scenario.name] = scenario
+        self._names = list(self.scenarios)
+        self._cumulative = list(itertools.accumulate(s.weight for s in self.scenarios.values()))
+        return scenario
+
+    def load(self, path):
+        """Add (or replace) scenarios from a YAML file"""
+        for name, spec in (load_yaml(path).get('scenarios') or {}).items():
+            self.register(Scenario(name, **spec))
+        return self
+
+    @classmethod
+    def from_yaml(cls, *paths):
+        """config/scenarios.yaml, then each of `paths` on top (same name: replaced)"""
+        registry = cls().load(DEFAULT_SCENARIOS)
+        for path in paths:
+            registry.load(path)
+        return registry
+
+    def names(self):
+        return list(self._names)
+
+    def choose(self, rng):
+        if not self._names:
+            raise LookupError("no incident scenarios registered")
+        point = rng.random() * self._cumulative[-1]
+        return self.scenarios[self._names[bisect.bisect_right(self._cumulative, point)]]
+
+    def __getitem__(self, name):
+        return self.scenarios[name]
+
+    def __len__(self):
+        return len(self.scenarios)
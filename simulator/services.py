@@ -0,0 +1,54 @@
+# simulator/services.py
+"""Locate and import the Flask apps under services/ for in-process use"""
+
+import importlib.util
+import os
+import sys
+
+from simulator.config import ROOT
+
+SERVICES_DIR = os.path.join(ROOT, "services")
+
+SERVICE_PORTS = {
+    'user-service': 8001,
+    'product-service': 8002,
+    'order-service': 8003,
+    'payment-service': 8004,
+}
+
+# Every status a service can be in; traffic impact and access log status codes cover each
+SERVICE_STATUSES = ('running', 'degraded', 'critical', 'down')
+
+_apps = {}
+
+
+def load_service_app(service):
+    """Import services/<service>/app.py (directories have dashes, so not importable by name)"""
+    if service not in _apps:
+        service_dir = os.path.join(SERVICES_DIR, service)
+        if not os.path.isdir(service_dir):
+            raise ValueError(f"unknown service {service!r}")
+        module_name = service.replace('-', '_') + "_app"
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(service_dir, "app.py"))
+        module = importlib.util.module_from_spec(spec)
+        # Let the app import its sibling modules (e.g. models.py), then forget
+        # them so another service's models.py isn't shadowed
+        before = set(sys.modules)
+        sys.path.insert(0, service_dir)
+        try:
+            spec.loader.exec_module(module)
+        finally:
+            sys.path.remove(service_dir)
+            for name in set(sys.modules) - before:
+                path = getattr(sys.modules[name], '__file__', None) or ''
+                if os.path.dirname(os.path.abspath(path)) == service_dir:
+                    del sys.modules[name]
+        sys.modules[module_name] = module
+        _apps[service] = module
+    return _apps[service].app
+
+
+def service_module(service):
+    """The imported app.py module for a service (loads it on first use)"""
+    load_service_app(service)
+    return _apps[service]
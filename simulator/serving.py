@@ -0,0 +1,623 @@
+# simulator/serving.py
+"""
+Prefork server for the Flask services (stdlib only, no extra dependency).
+
+The master binds the listening socket once, then forks `workers` processes
+that all accept on it. Each worker imports the service after the fork, so
+worker state (connection pools, the order write-behind thread, Prometheus
+values) is per process. The master only supervises the workers:
+
+* A worker that dies is replaced.
+* SIGHUP reloads gracefully (workers ignore it, so it may be sent to the
+  whole process group). A new generation of workers is forked, and
+  the old one gets SIGTERM only once every new worker has loaded the app.
+  If the new code fails to load, the old workers keep serving.
+* SIGTERM/SIGINT stop the server. Workers stop accepting, finish their
+  in-flight requests, and are killed after `graceful_timeout` seconds.
+
+There are two worker classes:
+
+* `threads`: blocking HTTP/1.1 with keep-alive on a fixed pool of
+  `threads`, one connection per thread. A worker only accepts while one of
+  its threads is free, so busy workers leave new connections to idle ones.
+* `async`: an asyncio HTTP/1.1 loop. Endpoints the service lists in its
+  `async_views` run as coroutines on the loop, so a slow request costs no
+  thread. Every other route runs through the WSGI app on `threads` threads.
+
+When prometheus_client is installed, the master points
+PROMETHEUS_MULTIPROC_DIR at a temporary directory (unless it's already
+set), so /metrics adds up all the workers and survives reloads.
+"""
+
+import asyncio
+import importlib.util
+import io
+import logging
+import os
+import select
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+from urllib.parse import unquote_to_bytes
+
+from werkzeug.exceptions import HTTPException
+
+from simulator.services import SERVICE_PORTS, SERVICES_DIR, load_service_app, service_module
+
+WORKER_CLASSES = ('threads', 'async')
+
+BOOT_ERROR = 3  # worker exit code: the app failed to import
+MAX_LINE = 65536  # longest request/header line accepted
+SKIPPED_HEADERS = ('connection', 'content-length', 'transfer-encoding', 'date', 'keep-alive')
+
+logger = logging.getLogger(__name__)
+
+
+class _BadRequest(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.status = f"{code} {HTTPStatus(code).phrase}"
+
+
+def _parse_request_line(line):
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise _BadRequest(400) from None
+    if not version.startswith('HTTP/1.'):
+        raise _BadRequest(505)
+    return method, target, version
+
+
+def _add_header(headers, line):
+    if len(line) > MAX_LINE:
+        raise _BadRequest(431)
+    name, _, value = line.decode('latin-1').partition(':')
+    name, value = name.strip().lower(), value.strip()
+    headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+
+def _framing(version, headers):
+    """(keep-alive, body length) of a request"""
+    connection = headers.get('connection', '').lower()
+    keep_alive = 'close' not in connection if version == 'HTTP/1.1' else 'keep-alive' in connection
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise _BadRequest(411)
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise _BadRequest(400) from None
+    return keep_alive, length
+
+
+def _environ(method, target, version, headers, body, server, peer):
+    path, _, query = target.partition('?')
+    environ = {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': unquote_to_bytes(path).decode('latin-1'),
+        'QUERY_STRING': query,
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': version,
+        'REMOTE_ADDR': peer[0],
+        'REMOTE_PORT': str(peer[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in headers.items():
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'content-length':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+    return environ
+
+
+def _call_wsgi(app, environ):
+    """(status, headers, body) of a WSGI app's response, buffered"""
+    response = []
+
+    def start_response(status, headers, exc_info=None):
+        response[:] = [status, headers]
+
+    result = app(environ, start_response)
+    try:
+        data = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response[0], response[1], data
+
+
+def _response(status, headers, data, keep_alive, head=False):
+    lines = [f"HTTP/1.1 {status}"]
+    lines.extend(f"{name}: {value}" for name, value in headers if name.lower() not in SKIPPED_HEADERS)
+    lines.append(f"Content-Length: {len(data)}")
+    lines.append(f"Date: {formatdate(usegmt=True)}")
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (b'' if head else data)
+
+
+class ThreadWorker:
+    """WSGI over HTTP/1.1 keep-alive on a fixed pool of `threads`, accepting only while a thread is free"""
+
+    def __init__(self, app, sock, threads=8, keepalive=5.0):
+        self.app = app
+        self.sock = sock
+        self.sock.setblocking(False)  # other workers may win the accept() race
+        self.server = sock.getsockname()[:2]
+        self.keepalive = keepalive
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix="http")
+        self.stopping = False
+        self._slots = threading.BoundedSemaphore(threads)
+        self._idle = set()  # connections waiting for their next request
+        self._lock = threading.Lock()
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        while not self.stopping:
+            if not self._slots.acquire(timeout=0.5):
+                continue
+            try:
+                if not select.select([self.sock], [], [], 0.5)[0]:
+                    self._slots.release()
+                    continue
+                conn, peer = self.sock.accept()
+            except OSError:  # BlockingIOError: another worker took it
+                self._slots.release()
+                continue
+            self.pool.submit(self._connection, conn, peer)
+        with self._lock:
+            for conn in self._idle:
+                _shutdown(conn)  # idle keep-alive connections: wake their readline() now
+        self.pool.shutdown(wait=True)
+
+    def _connection(self, conn, peer):
+        conn.setblocking(True)
+        conn.settimeout(self.keepalive)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        reader = conn.makefile('rb')
+        try:
+            while not self.stopping:
+                with self._lock:
+                    self._idle.add(conn)
+                try:
+                    line = reader.readline(MAX_LINE + 1)
+                finally:
+                    with self._lock:
+                        self._idle.discard(conn)
+                if not line:
+                    return
+                if not line.strip():
+                    continue  # stray CRLF between requests
+                if not self._request(line, reader, conn, peer):
+                    return
+        except (OSError, ValueError):
+            pass  # idle past keep-alive or client went away
+        finally:
+            reader.close()
+            conn.close()
+            self._slots.release()
+
+    def _request(self, line, reader, conn, peer):
+        try:
+            method, target, version = _parse_request_line(line)
+            headers = {}
+            while True:
+                line = reader.readline(MAX_LINE + 1)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                _add_header(headers, line)
+            keep_alive, length = _framing(version, headers)
+        except _BadRequest as e:
+            conn.sendall(_response(e.status, [], b'', False))
+            return False
+        if length and headers.get('expect', '').lower() == '100-continue':
+            conn.sendall(b"HTTP/1.1 100 Continue\r\n\r\n")
+        body = reader.read(length) if length else b''
+        if len(body) < length:
+            return False
+        environ = _environ(method, target, version, headers, body, self.server, peer)
+        status, response_headers, data = _call_wsgi(self.app, environ)
+        keep_alive = keep_alive and not self.stopping
+        conn.sendall(_response(status, response_headers, data, keep_alive, head=method == 'HEAD'))
+        return keep_alive
+
+
+class AsyncWorker:
+    """asyncio HTTP/1.1 server: coroutine views on the loop, other routes on a thread pool"""
+
+    def __init__(self, app, sock, threads=8, keepalive=5.0, views=None, backlog=2048):
+        self.app = app
+        self.sock = sock
+        self.server = sock.getsockname()[:2]
+        self.keepalive = keepalive
+        self.backlog = backlog
+        self.views = views or {}
+        self.adapter = app.url_map.bind('localhost')
+        self.metrics = app.extensions.get('metrics')
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="wsgi")
+        self.stopping = False
+        self.active = 0
+        self._idle = set()  # writers of connections waiting for their next request
+        self._stop = None
+
+    def stop(self):
+        self.stopping = True
+        self._stop.set()
+
+    def run(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        self._stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self.stop)
+        server = await asyncio.start_server(self._connection, sock=self.sock, backlog=self.backlog,
+                                            limit=MAX_LINE)
+        async with server:
+            await self._stop.wait()
+            server.close()
+            for writer in list(self._idle):
+                writer.close()
+            while self.active:
+                await asyncio.sleep(0.05)
+        self.executor.shutdown(wait=True)
+
+    async def _connection(self, reader, writer):
+        peer = writer.get_extra_info('peername') or ('', 0)
+        try:
+            while not self.stopping:
+                self._idle.add(writer)
+                try:
+                    line = await asyncio.wait_for(reader.readline(), self.keepalive)
+                finally:
+                    self._idle.discard(writer)
+                if not line:
+                    return
+                if not line.strip():
+                    continue  # stray CRLF between requests
+                self.active += 1
+                try:
+                    keep_alive = await self._request(line, reader, writer, peer)
+                finally:
+                    self.active -= 1
+                if not keep_alive:
+                    return
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # idle past keep-alive, client went away, or a line over MAX_LINE
+        finally:
+            writer.close()
+
+    async def _request(self, line, reader, writer, peer):
+        try:
+            method, target, version = _parse_request_line(line)
+            headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), self.keepalive)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                _add_header(headers, line)
+            keep_alive, length = _framing(version, headers)
+        except _BadRequest as e:
+            writer.write(_response(e.status, [], b'', False))
+            await writer.drain()
+            return False
+        if length and headers.get('expect', '').lower() == '100-continue':
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        body = await reader.readexactly(length) if length else b''
+
+        rule, view, args = self._match(method, target)
+        if view is not None:
+            status, response_headers, data = await self._call_view(method, rule, view, args)
+        else:
+            environ = _environ(method, target, version, headers, body, self.server, peer)
+            status, response_headers, data = await asyncio.get_running_loop().run_in_executor(
+                self.executor, _call_wsgi, self.app, environ)
+        keep_alive = keep_alive and not self.stopping
+        writer.write(_response(status, response_headers, data, keep_alive, head=method == 'HEAD'))
+        await writer.drain()
+        return keep_alive
+
+    def _match(self, method, target):
+        if not self.views:
+            return None, None, None
+        path = target.partition('?')[0]
+        try:
+            rule, args = self.adapter.match(unquote_to_bytes(path).decode('utf-8', 'replace'), method,
+                                            return_rule=True)
+        except HTTPException:
+            return None, None, None  # 404/405/redirects: let Flask answer them
+        return rule, self.views.get(rule.endpoint), args
+
+    async def _call_view(self, method, rule, view, args):
+        metrics = self.metrics
+        if metrics:
+            metrics.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            payload, status = await view(**args)
+        except Exception:
+            logger.exception(f"async view {rule.endpoint} failed")
+            payload, status = {'error': 'Internal Server Error'}, 500
+        finally:
+            if metrics:
+                metrics.in_flight.dec()
+        response = self.app.json.response(payload)
+        response.status_code = status
+        if metrics:
+            metrics.observe(method, rule.rule, status, time.perf_counter() - started)
+        return response.status, list(response.headers.items()), response.get_data()
+
+
+class _Worker:
+    def __init__(self, pid, generation):
+        self.pid = pid
+        self.generation = generation
+        self.started = time.monotonic()
+        self.ready = False
+        self.terminating = None  # monotonic time SIGTERM was sent
+
+
+class PreforkServer:
+    """Master process: owns the socket, keeps `workers` processes serving, reloads on SIGHUP"""
+
+    def __init__(self, service, host='0.0.0.0', port=None, workers=None, threads=8, worker_class='threads',
+                 keepalive=5.0, graceful_timeout=30.0, backlog=2048):
+        if worker_class not in WORKER_CLASSES:
+            raise ValueError(f"worker_class must be one of {WORKER_CLASSES}, got {worker_class!r}")
+        self.service = service
+        self.host = host
+        self.port = SERVICE_PORTS.get(service, 8000) if port is None else port
+        self.workers = workers or os.cpu_count() or 1
+        self.threads = threads
+        self.worker_class = worker_class
+        self.keepalive = keepalive
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.socket = None
+        self.generation = 0
+        self.children = {}  # pid -> _Worker
+        self.restarts = 0
+        self._previous_generation = None
+        self._booted = False
+        self._stopping = False
+        self._reload = False
+        self._metrics_dir = None
+        self._mark_dead = None
+        self._respawn_after = 0.0
+
+    # -- master -------------------------------------------------------------
+
+    def run(self):
+        """Serve until SIGTERM/SIGINT; returns the process exit code"""
+        self.socket = socket.create_server((self.host, self.port), backlog=self.backlog)
+        self.port = self.socket.getsockname()[1]
+        self._setup_metrics()
+        self._ready_r, self._ready_w = os.pipe()
+        wake_r, wake_w = os.pipe()
+        for fd in (self._ready_r, wake_r, wake_w):
+            os.set_blocking(fd, False)
+        signal.set_wakeup_fd(wake_w)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGCHLD, lambda *_: None)  # wakes select() through the wakeup fd
+
+        logger.info(f"🚀 {self.service}: master {os.getpid()} listening on {self.host}:{self.port} "
+                    f"({self.workers} {self.worker_class} workers x {self.threads} threads, "
+                    f"keep-alive {self.keepalive:g}s)")
+        self._start_generation()
+        code = 0
+        try:
+            pending = b''
+            while self.children or not self._stopping:
+                readable = select.select([self._ready_r, wake_r], [], [], 1.0)[0]
+                if wake_r in readable:
+                    _drain(wake_r)
+                if self._ready_r in readable:
+                    pending += _drain(self._ready_r)
+                    *lines, pending = pending.split(b'\n')
+                    for line in lines:
+                        worker = self.children.get(int(line))
+                        if worker is not None:
+                            worker.ready = True
+                code = self._reap() or code
+                if self._stopping:
+                    self._terminate(list(self.children.values()))
+                elif self._reload:
+                    self._reload = False
+                    self._start_generation()
+                else:
+                    self._finish_reload()
+                    self._maintain()
+                self._escalate()
+        finally:
+            signal.set_wakeup_fd(-1)
+            for fd in (self._ready_r, self._ready_w, wake_r, wake_w):
+                os.close(fd)
+            self.socket.close()
+            if self._metrics_dir:
+                shutil.rmtree(self._metrics_dir, ignore_errors=True)
+        logger.info(f"👋 {self.service}: master {os.getpid()} stopped")
+        return code
+
+    def _on_reload(self, *_):
+        self._reload = True
+
+    def _on_stop(self, *_):
+        self._stopping = True
+
+    def _setup_metrics(self):
+        # prometheus_client picks its value class at import, so the directory is set before the import
+        if importlib.util.find_spec('prometheus_client') is None:
+            return
+        if not (os.environ.get('PROMETHEUS_MULTIPROC_DIR') or os.environ.get('prometheus_multiproc_dir')):
+            self._metrics_dir = tempfile.mkdtemp(prefix=f"{self.service}-metrics-")
+            os.environ['PROMETHEUS_MULTIPROC_DIR'] = self._metrics_dir
+        if SERVICES_DIR not in sys.path:
+            sys.path.insert(0, SERVICES_DIR)
+        from common.metrics import mark_process_dead
+        self._mark_dead = mark_process_dead
+
+    def _start_generation(self):
+        if self.generation and any(w.generation == self.generation for w in self.children.values()):
+            logger.info(f"🔄 {self.service}: reloading - starting {self.workers} new workers")
+            self._previous_generation = self.generation
+        self.generation += 1
+        for _ in range(self.workers):
+            self._spawn()
+
+    def _finish_reload(self):
+        """Retire older generations once every worker of the current one has loaded the app"""
+        current = [w for w in self.children.values() if w.generation == self.generation and w.terminating is None]
+        if len(current) < self.workers or not all(w.ready for w in current):
+            return
+        if not self._booted:
+            self._booted = True
+            logger.info(f"✅ {self.service}: {len(current)} workers ready")
+        old = [w for w in self.children.values() if w.generation < self.generation and w.terminating is None]
+        if old:
+            logger.info(f"✅ {self.service}: reload complete, stopping {len(old)} old workers")
+            self._terminate(old)
+        self._previous_generation = None
+
+    def _maintain(self):
+        """Replace current-generation workers that died"""
+        if self._previous_generation is not None:
+            return  # a reload is in flight; _reap() decides its fate
+        missing = self.workers - sum(1 for w in self.children.values()
+                                     if w.generation == self.generation and w.terminating is None)
+        if missing > 0 and time.monotonic() >= self._respawn_after:
+            for _ in range(missing):
+                self.restarts += 1
+                self._spawn()
+
+    def _reap(self):
+        code = 0
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return code
+            if pid == 0:
+                return code
+            worker = self.children.pop(pid, None)
+            if self._mark_dead:
+                self._mark_dead(pid)
+            if worker is None or worker.terminating is not None or self._stopping:
+                continue
+            exit_code = os.waitstatus_to_exitcode(status)
+            if exit_code == BOOT_ERROR and not worker.ready:
+                if not self._booted:
+                    logger.error(f"❌ {self.service}: worker {pid} could not load the app; shutting down")
+                    self._stopping = True
+                    code = 1
+                elif self._previous_generation is not None and worker.generation == self.generation:
+                    logger.error(f"❌ {self.service}: new workers could not load the app; "
+                                 f"reload aborted, old workers keep serving")
+                    self._terminate([w for w in self.children.values() if w.generation == self.generation])
+                    self.generation = self._previous_generation
+                    self._previous_generation = None
+                else:
+                    logger.error(f"❌ {self.service}: worker {pid} could not load the app; retrying in 1s")
+                    self._respawn_after = time.monotonic() + 1.0
+            else:
+                logger.warning(f"⚠️  {self.service}: worker {pid} exited with code {exit_code}; replacing it")
+
+    def _terminate(self, workers):
+        now = time.monotonic()
+        for worker in workers:
+            if worker.terminating is None:
+                worker.terminating = now
+                _signal(worker.pid, signal.SIGTERM)
+
+    def _escalate(self):
+        now = time.monotonic()
+        for worker in self.children.values():
+            if worker.terminating is not None and now - worker.terminating > self.graceful_timeout:
+                logger.warning(f"⚠️  {self.service}: worker {worker.pid} still busy after "
+                               f"{self.graceful_timeout:g}s; killing it")
+                _signal(worker.pid, signal.SIGKILL)
+                worker.terminating = float('inf')  # don't signal again
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = _Worker(pid, self.generation)
+            return pid
+        code = 1
+        try:
+            code = self._worker_main()
+        except BaseException:
+            logger.exception(f"{self.service}: worker {os.getpid()} crashed")
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    # -- worker -------------------------------------------------------------
+
+    def _worker_main(self):
+        signal.set_wakeup_fd(-1)
+        for signum in (signal.SIGCHLD, signal.SIGTERM):
+            signal.signal(signum, signal.SIG_DFL)
+        # Ctrl-C and a HUP sent to the whole group reach the workers too; the master coordinates
+        for signum in (signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_IGN)
+        os.close(self._ready_r)
+        try:
+            app = load_service_app(self.service)
+            views = getattr(service_module(self.service), 'async_views', None)
+        except Exception:
+            logger.exception(f"{self.service}: worker {os.getpid()} failed to load the app")
+            return BOOT_ERROR
+        if self.worker_class == 'async':
+            worker = AsyncWorker(app, self.socket, self.threads, self.keepalive, views, self.backlog)
+        else:
+            worker = ThreadWorker(app, self.socket, self.threads, self.keepalive)
+        os.write(self._ready_w, f"{os.getpid()}\n".encode())
+        worker.run()
+        return 0
+
+
+def _drain(fd):
+    data = b''
+    while True:
+        try:
+            chunk = os.read(fd, 4096)
+        except BlockingIOError:
+            return data
+        if not chunk:
+            return data
+        data += chunk
+
+
+def _shutdown(conn):
+    try:
+        conn.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def _signal(pid, signum):
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
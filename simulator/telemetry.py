@@ -0,0 +1,332 @@
+# simulator/telemetry.py
+"""
+Structured telemetry output for metrics and access events.
+
+The text logs stay the primary output; these writers add machine-readable
+copies with a typed schema so analysis code can load (or memory-map) large
+runs instead of regex-parsing log lines:
+
+  jsonl    - one JSON object per line, always available
+  parquet  - Parquet row groups (needs pyarrow)
+  arrow    - Arrow IPC file, memory-mappable with pyarrow.memory_map (needs pyarrow)
+  npy      - NumPy fallback, part directories of one raw .npy file per column
+             (memory-mappable with np.load(mmap_mode='r')), strings dictionary-encoded
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional
+    pa = None
+    pq = None
+
+# Column types: timestamp (epoch milliseconds), category (dictionary-encoded
+# string), and fixed-width numerics
+SCHEMAS = {
+    'metrics': (
+        ('timestamp', 'timestamp_ms'),
+        ('service', 'category'),
+        ('status', 'category'),
+        ('response_time', 'float64'),
+        ('error_rate', 'float64'),
+        ('throughput', 'int32'),
+        ('cpu_usage', 'int16'),
+    ),
+    'system': (
+        ('timestamp', 'timestamp_ms'),
+        ('cpu_usage', 'int16'),
+        ('memory_usage', 'int16'),
+        ('disk_usage', 'int16'),
+        ('network_latency', 'float64'),
+    ),
+    'access': (
+        ('timestamp', 'timestamp_ms'),
+        ('client', 'category'),
+        ('method', 'category'),
+        ('path', 'category'),
+        ('service', 'category'),
+        ('status', 'int16'),
+        ('bytes', 'int32'),
+        ('user_agent', 'category'),
+        ('latency_ms', 'float32'),
+    ),
+}
+
+FORMATS = ('jsonl', 'parquet', 'arrow', 'npy')
+
+
+def telemetry_path(log_dir, table, run_id, fmt):
+    return os.path.join(log_dir, f"telemetry_{table}_{run_id}.{fmt}")
+
+
+def _arrow_type(kind):
+    if kind == 'timestamp_ms':
+        return pa.timestamp('ms')
+    if kind == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.from_numpy_dtype(np.dtype(kind))
+
+
+class JsonLinesWriter:
+    """Append rows as JSON objects; timestamps are ISO-8601 strings in UTC"""
+
+    def __init__(self, log_dir, run_id):
+        self.paths = {table: telemetry_path(log_dir, table, run_id, 'jsonl') for table in SCHEMAS}
+        self._files = {table: open(path, 'w', encoding='utf-8') for table, path in self.paths.items()}
+
+    def write(self, table, columns):
+        names = [name for name, _ in SCHEMAS[table]]
+        values = [columns[name] for name in names]
+        kinds = [kind for _, kind in SCHEMAS[table]]
+        lines = []
+        for row in zip(*values):
+            record = {}
+            for name, kind, value in zip(names, kinds, row):
+                if kind == 'timestamp_ms':
+                    value = datetime.fromtimestamp(int(value) / 1000, timezone.utc).isoformat(timespec='milliseconds')
+                elif kind == 'category':
+                    value = str(value)
+                elif kind.startswith('float'):
+                    value = float(value)
+                else:
+                    value = int(value)
+                record[name] = value
+            lines.append(json.dumps(record))
+        if lines:
+            lines.append('')
+            self._files[table].write('\n'.join(lines))
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+
+
+class _ColumnBuffer:
+    """Accumulate typed column chunks for one table"""
+
+    def __init__(self, table):
+        self.schema = SCHEMAS[table]
+        self.chunks = {name: [] for name, _ in self.schema}
+        self.rows = 0
+
+    def append(self, columns):
+        n = None
+        for name, kind in self.schema:
+            values = columns[name]
+            if kind == 'category':
+                values = np.asarray(values, dtype=object)
+            elif kind == 'timestamp_ms':
+                values = np.asarray(values, dtype=np.int64)
+            else:
+                values = np.asarray(values, dtype=kind)
+            self.chunks[name].append(values)
+            n = len(values)
+        self.rows += n or 0
+
+    def take(self):
+        columns = {}
+        for name, _ in self.schema:
+            chunks = self.chunks[name]
+            columns[name] = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+            self.chunks[name] = []
+        self.rows = 0
+        return columns
+
+
+class ArrowWriter:
+    """Stream record batches to Parquet or an Arrow IPC file"""
+
+    def __init__(self, log_dir, run_id, fmt='parquet', chunk_rows=65536):
+        if pa is None:
+            raise RuntimeError(f"{fmt} telemetry output requires pyarrow (pip install pyarrow)")
+        self.fmt = fmt
+        self.chunk_rows = chunk_rows
+        self.paths = {table: telemetry_path(log_dir, table, run_id, fmt) for table in SCHEMAS}
+        self.schemas = {
+            table: pa.schema([(name, _arrow_type(kind)) for name, kind in columns])
+            for table, columns in SCHEMAS.items()
+        }
+        self._buffers = {table: _ColumnBuffer(table) for table in SCHEMAS}
+        # One growing dictionary per category column, so later batches only
+        # add dictionary deltas (the IPC file format forbids replacements)
+        self._categories = {
+            (table, name): {} for table, columns in SCHEMAS.items()
+            for name, kind in columns if kind == 'category'
+        }
+        self._writers = {}
+
+    def write(self, table, columns):
+        buffer = self._buffers[table]
+        buffer.append(columns)
+        if buffer.rows >= self.chunk_rows:
+            self._flush(table)
+
+    def _writer(self, table):
+        writer = self._writers.get(table)
+        if writer is None:
+            if self.fmt == 'parquet':
+                writer = pq.ParquetWriter(self.paths[table], self.schemas[table])
+            else:
+                options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+                writer = pa.ipc.new_file(self.paths[table], self.schemas[table], options=options)
+            self._writers[table] = writer
+        return writer
+
+    def _flush(self, table):
+        buffer = self._buffers[table]
+        if not buffer.rows:
+            return
+        columns = buffer.take()
+        schema = self.schemas[table]
+        arrays = []
+        for (name, kind), field in zip(SCHEMAS[table], schema):
+            if kind == 'category':
+                arrays.append(self._encode(table, name, columns[name]))
+            else:
+                arrays.append(pa.array(columns[name], type=field.type))
+        self._writer(table).write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+
+    def _encode(self, table, name, values):
+        codes = self._categories[(table, name)]
+        indices = np.fromiter(
+            (codes.setdefault(value, len(codes)) for value in values.tolist()),
+            dtype=np.int32, count=len(values)
+        )
+        return pa.DictionaryArray.from_arrays(pa.array(indices), pa.array(list(codes), type=pa.string()))
+
+    def close(self):
+        for table in SCHEMAS:
+            self._flush(table)
+            # Always leave a (possibly empty) file carrying the schema
+            self._writer(table).close()
+
+
+class NpyWriter:
+    """NumPy fallback: part directories of raw .npy columns, strings as int32 codes plus a categories array
+
+    Rows are buffered up to `chunk_rows` and then written as the table's next
+    part (telemetry_<table>_<run>.part0000/, .part0001/, ...), so memory
+    stays bounded however long the run. A part holds <column>.npy per column
+    and <column>__categories.npy per string column (its own categories).
+    Plain .npy files rather than .npz archives, because np.load can only
+    memory-map the former.
+    """
+
+    def __init__(self, log_dir, run_id, chunk_rows=65536):
+        self.log_dir = log_dir
+        self.run_id = run_id
+        self.chunk_rows = chunk_rows
+        self._buffers = {table: _ColumnBuffer(table) for table in SCHEMAS}
+        self._parts = {table: [] for table in SCHEMAS}
+
+    @property
+    def paths(self):
+        """One entry per column file, e.g. 'access.part0000/status'"""
+        return {
+            f"{table}.part{index:04d}/{name}": os.path.join(path, f"{name}.npy")
+            for table, parts in self._parts.items() for index, (path, names) in enumerate(parts)
+            for name in names
+        }
+
+    def write(self, table, columns):
+        buffer = self._buffers[table]
+        buffer.append(columns)
+        if buffer.rows >= self.chunk_rows:
+            self._flush(table)
+
+    def _flush(self, table):
+        buffer = self._buffers[table]
+        if buffer.rows:
+            columns = buffer.take()
+        elif self._parts[table]:
+            return
+        else:
+            # Always leave one (possibly empty) part carrying the columns
+            columns = {name: np.empty(0, dtype=object) for name, _ in SCHEMAS[table]}
+        arrays = {}
+        for name, kind in SCHEMAS[table]:
+            values = columns[name]
+            if kind == 'category':
+                categories, codes = np.unique(values.astype(str), return_inverse=True)
+                arrays[name] = codes.astype(np.int32)
+                arrays[f"{name}__categories"] = categories
+            elif kind == 'timestamp_ms':
+                arrays[name] = values.astype('datetime64[ms]')
+            else:
+                arrays[name] = values.astype(kind)
+        parts = self._parts[table]
+        path = telemetry_path(self.log_dir, table, self.run_id, f"part{len(parts):04d}")
+        os.makedirs(path, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array)
+        parts.append((path, list(arrays)))
+
+    def close(self):
+        for table in SCHEMAS:
+            self._flush(table)
+
+
+class TelemetryOutput:
+    """Fan metrics snapshots and access events out to the configured writers"""
+
+    def __init__(self, formats, log_dir, run_id):
+        self.writers = []
+        for fmt in formats:
+            if fmt not in FORMATS:
+                raise ValueError(f"unknown telemetry format {fmt!r}, expected one of {FORMATS}")
+            if fmt == 'jsonl':
+                self.writers.append(JsonLinesWriter(log_dir, run_id))
+            elif fmt == 'npy':
+                self.writers.append(NpyWriter(log_dir, run_id))
+            else:
+                self.writers.append(ArrowWriter(log_dir, run_id, fmt))
+
+        self.log_dir = log_dir
+        self.schema_path = os.path.join(log_dir, f"telemetry_schema_{run_id}.json")
+        with open(self.schema_path, 'w') as f:
+            json.dump({table: dict(columns) for table, columns in SCHEMAS.items()}, f, indent=2)
+            f.write("\n")
+
+    @property
+    def paths(self):
+        paths = {'schema': self.schema_path}
+        for writer in self.writers:
+            for table, path in writer.paths.items():
+                paths[os.path.relpath(path, self.log_dir)] = path
+        return paths
+
+    def write(self, table, columns):
+        for writer in self.writers:
+            writer.write(table, columns)
+
+    def record_metrics(self, metrics, created):
+        """Flatten a generate_metrics() snapshot into the metrics and system tables"""
+        ts = int(created * 1000)
+        services = metrics['services']
+        self.write('metrics', {
+            'timestamp': [ts] * len(services),
+            'service': list(services),
+            'status': [m['status'] for m in services.values()],
+            'response_time': [m['response_time'] for m in services.values()],
+            'error_rate': [m['error_rate'] for m in services.values()],
+            'throughput': [m['throughput'] for m in services.values()],
+            'cpu_usage': [m['cpu_usage'] for m in services.values()],
+        })
+        system = metrics['system']
+        self.write('system', {
+            'timestamp': [ts],
+            'cpu_usage': [system['cpu_usage']],
+            'memory_usage': [system['memory_usage']],
+            'disk_usage': [system['disk_usage']],
+            'network_latency': [system['network_latency']],
+        })
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
@@ -0,0 +1,273 @@
+# simulator/timeseries.py
+"""
+In-process metrics time-series store.
+
+Each (service, metric) series keeps three fixed-size NumPy ring buffers:
+raw points, 1-minute rollups and 1-hour rollups. Every row is
+(timestamp, count, sum, min, max), so a raw point is just a rollup of one,
+and appending a point updates the open bucket of each rollup tier in place.
+Memory per series is fixed by the tier capacities no matter how long the
+run is. With a directory, the rings are np.memmap files, so a multi-day
+simulated run leaves its history on disk rather than on the heap.
+Reopen a spilled store with MetricsStore.load().
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+
+TS, COUNT, SUM, MIN, MAX = range(5)
+
+# (name, bucket seconds, rows kept): ~2.8h of raw points at the interactive
+# metrics cadence, a week of minutes, a year of hours
+DEFAULT_TIERS = (('raw', 0, 10000), ('1m', 60, 10080), ('1h', 3600, 8760))
+
+
+class Ring:
+    """Fixed-capacity, time-ordered rows of (ts, count, sum, min, max)"""
+
+    def __init__(self, name, capacity, resolution, path=None, head=0, size=0):
+        self.name = name
+        self.capacity = capacity
+        self.resolution = resolution
+        if path is None:
+            self.rows = np.zeros((capacity, 5))
+        else:
+            mode = 'r+' if os.path.exists(path) else 'w+'
+            self.rows = np.memmap(path, dtype=np.float64, mode=mode, shape=(capacity, 5))
+        self.head = head  # next row to write
+        self.size = size
+        # The newest row as a Python list: merging into it costs no array
+        # writes; it is written back when its bucket closes or on read
+        self._open = self.rows[head - 1].tolist() if size else None
+        self._dirty = False
+
+    def last_ts(self):
+        return self._open[TS] if self._open else None
+
+    def add(self, ts, value):
+        bucket = ts - ts % self.resolution if self.resolution else ts
+        row = self._open
+        if row is not None and self.resolution and row[TS] == bucket:
+            row[COUNT] += 1
+            row[SUM] += value
+            if value < row[MIN]:
+                row[MIN] = value
+            if value > row[MAX]:
+                row[MAX] = value
+            self._dirty = True
+            return
+        self._sync()
+        self._open = [bucket, 1.0, value, value, value]
+        self.rows[self.head] = self._open
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _sync(self):
+        if self._dirty:
+            self.rows[self.head - 1] = self._open
+            self._dirty = False
+
+    def oldest_ts(self):
+        if not self.size:
+            return None
+        return self.rows[self.head if self.size == self.capacity else 0, TS]
+
+    def range(self, start=None, end=None):
+        """Rows with start <= ts <= end, oldest first (a copy)"""
+        self._sync()
+        if self.size < self.capacity:
+            segments = [self.rows[:self.size]]
+        else:
+            segments = [self.rows[self.head:], self.rows[:self.head]]
+        parts = []
+        for segment in segments:
+            ts = segment[:, TS]
+            lo = 0 if start is None else np.searchsorted(ts, start - (start % self.resolution if self.resolution else 0))
+            hi = len(ts) if end is None else np.searchsorted(ts, end, side='right')
+            if hi > lo:
+                parts.append(segment[lo:hi])
+        return np.concatenate(parts) if parts else np.empty((0, 5))
+
+    def flush(self):
+        self._sync()
+        if isinstance(self.rows, np.memmap):
+            self.rows.flush()
+
+
+class Series:
+    def __init__(self, tiers, directory=None, key=None, state=None):
+        state = state or {}
+        self.key = key
+        self.rings = {}
+        for name, resolution, capacity in tiers:
+            path = os.path.join(directory, f"{key}.{name}.f64") if directory else None
+            head, size = state.get(name, (0, 0))
+            self.rings[name] = Ring(name, capacity, resolution, path, head, size)
+        self.raw = next(iter(self.rings.values()))
+        self.first_ts = state.get('first_ts')
+
+    def add(self, ts, value):
+        last = self.raw.last_ts()
+        if last is not None and ts < last:
+            raise ValueError(f"points must be appended in time order ({ts} < {last})")
+        if self.first_ts is None:
+            self.first_ts = ts
+        for ring in self.rings.values():
+            ring.add(ts, value)
+
+    def tier(self, start=None, resolution=None, step=None):
+        """The named tier, else the finest one still holding `start`
+
+        With a resample `step`, the coarsest tier whose buckets divide it
+        and that still holds `start`. If none reaches back that far, the
+        longest-lived candidate is used.
+        """
+        if resolution is not None:
+            if resolution not in self.rings:
+                raise ValueError(f"unknown resolution {resolution!r}; expected one of {list(self.rings)}")
+            return self.rings[resolution]
+        if start is None or (self.first_ts is not None and start < self.first_ts):
+            start = self.first_ts
+        candidates = [ring for ring in self.rings.values()
+                      if step is None or not ring.resolution or step % ring.resolution == 0]
+        covering = [ring for ring in candidates
+                    if start is None or ring.oldest_ts() is None or ring.oldest_ts() <= start]
+        if not covering:
+            return candidates[-1]
+        return covering[-1] if step is not None else covering[0]
+
+    def state(self):
+        state = {name: (ring.head, ring.size) for name, ring in self.rings.items()}
+        state['first_ts'] = self.first_ts
+        return state
+
+
+def _columns(rows, resolution):
+    count = rows[:, COUNT]
+    return {
+        'resolution': resolution,
+        'timestamp': rows[:, TS],
+        'count': count,
+        'mean': np.divide(rows[:, SUM], count, out=np.zeros(len(rows)), where=count > 0),
+        'min': rows[:, MIN],
+        'max': rows[:, MAX],
+    }
+
+
+class MetricsStore:
+    """Ring-buffered metric history keyed by (service, metric), with rollups
+
+    Range queries read the finest tier that still covers the requested
+    start; rollup buckets overlapping the range edges count whole.
+    """
+
+    def __init__(self, directory=None, tiers=DEFAULT_TIERS):
+        self.directory = directory
+        self.tiers = tuple(tuple(tier) for tier in tiers)
+        self._series = {}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def load(cls, directory):
+        """Reopen a store that was closed with a spill directory"""
+        with open(os.path.join(directory, 'index.json')) as f:
+            index = json.load(f)
+        store = cls(directory, index['tiers'])
+        for entry in index['series']:
+            store._series[(entry['service'], entry['metric'])] = Series(
+                store.tiers, directory, entry['file'], {k: tuple(v) if isinstance(v, list) else v
+                                                        for k, v in entry['state'].items()})
+        return store
+
+    def _get(self, service, metric, create=False):
+        key = (service, metric)
+        series = self._series.get(key)
+        if series is None:
+            if not create:
+                raise KeyError(f"no series for {service}/{metric}")
+            file = re.sub(r'[^A-Za-z0-9_.-]', '_', f"{service}__{metric}")
+            series = self._series[key] = Series(self.tiers, self.directory, file)
+        return series
+
+    def append(self, service, metric, ts, value):
+        self._get(service, metric, create=True).add(float(ts), float(value))
+
+    def record(self, metrics, ts):
+        """Store every numeric field of a generate_metrics() snapshot ('system' is a service)"""
+        groups = dict(metrics['services'])
+        groups['system'] = metrics.get('system', {})
+        for service, values in groups.items():
+            for metric, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self.append(service, metric, ts, value)
+
+    def series(self):
+        return sorted(self._series)
+
+    def query(self, service, metric, start=None, end=None, resolution=None):
+        """Columns timestamp/count/mean/min/max for start <= ts <= end"""
+        ring = self._get(service, metric).tier(start, resolution)
+        return _columns(ring.range(start, end), ring.name)
+
+    def aggregate(self, service, metric, start=None, end=None, resolution=None):
+        """count/mean/min/max/last over the range (exact from rollups: sum/count, not mean of means)"""
+        series = self._get(service, metric)
+        ring = series.tier(start, resolution)
+        rows = ring.range(start, end)
+        count = rows[:, COUNT].sum()
+        if not count:
+            return {'count': 0, 'mean': None, 'min': None, 'max': None, 'last': None}
+        last = series.raw.range(start, end)
+        return {
+            'count': int(count),
+            'mean': float(rows[:, SUM].sum() / count),
+            'min': float(rows[:, MIN].min()),
+            'max': float(rows[:, MAX].max()),
+            'last': float(last[-1, SUM]) if len(last) else None,
+        }
+
+    def resample(self, service, metric, step, start=None, end=None):
+        """Re-bucket the range into `step`-second buckets, from the coarsest tier fine enough"""
+        ring = self._get(service, metric).tier(start, step=step)
+        rows = ring.range(start, end)
+        if not len(rows):
+            return _columns(rows, f"{step}s")
+        buckets = rows[:, TS] - rows[:, TS] % step
+        edges = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        merged = np.column_stack([
+            buckets[edges],
+            np.add.reduceat(rows[:, COUNT], edges),
+            np.add.reduceat(rows[:, SUM], edges),
+            np.minimum.reduceat(rows[:, MIN], edges),
+            np.maximum.reduceat(rows[:, MAX], edges),
+        ])
+        return _columns(merged, f"{step}s")
+
+    def summary(self, start=None, end=None):
+        """{service: {metric: aggregate}} for every series"""
+        result = {}
+        for service, metric in self.series():
+            result.setdefault(service, {})[metric] = self.aggregate(service, metric, start, end)
+        return result
+
+    def memory_bytes(self):
+        """Heap bytes held by ring buffers (memmapped rings count as zero)"""
+        return sum(ring.rows.nbytes for series in self._series.values() for ring in series.rings.values()
+                   if not isinstance(ring.rows, np.memmap))
+
+    def close(self):
+        """Flush memmaps and write index.json so the store can be reloaded"""
+        if not self.directory:
+            return
+        index = {'tiers': self.tiers, 'series': []}
+        for (service, metric), series in self._series.items():
+            for ring in series.rings.values():
+                ring.flush()
+            index['series'].append({'service': service, 'metric': metric, 'file': series.key,
+                                    'state': series.state()})
+        with open(os.path.join(self.directory, 'index.json'), 'w') as f:
+            json.dump(index, f)
@@ -0,0 +1,165 @@
+# simulator/traffic.py
+"""
+Traffic-shape model for generated access logs.
+
+Request volume per endpoint is base rate x diurnal curve x weekly curve x
+flash-sale multiplier x incident retry factor, evaluated per time bucket and
+drawn as Poisson (or gamma-Poisson "bursty") counts. Offered load is compared
+against each service's capacity to decide how much traffic gets shed with
+503s, and incident status scales latency.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from simulator.config import load_yaml, parse_duration
+
+DEFAULT_IMPACT = {
+    'running': {'latency': 1.0, 'retry': 1.0},
+    'degraded': {'latency': 3.0, 'retry': 1.3},
+    'critical': {'latency': 8.0, 'retry': 1.8},
+    'down': {'latency': 20.0, 'retry': 2.5},
+}
+
+
+class FlashSale:
+    """A window of boosted traffic, either once (`start`) or recurring daily (`daily_at`)"""
+
+    def __init__(self, name, duration, multiplier, services=None, start=None, daily_at=None, weekdays=None):
+        self.name = name
+        self.duration = duration
+        self.multiplier = multiplier
+        self.services = set(services) if services else None
+        self.start = start
+        self.daily_at = daily_at
+        self.weekdays = set(weekdays) if weekdays is not None else None
+
+    def active(self, moment):
+        if self.start is not None:
+            return self.start <= moment < self.start + timedelta(seconds=self.duration)
+        hour, minute = self.daily_at
+        opened = moment.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if opened > moment:
+            opened -= timedelta(days=1)
+        if self.weekdays is not None and opened.weekday() not in self.weekdays:
+            return False
+        return moment < opened + timedelta(seconds=self.duration)
+
+
+class TrafficPlan:
+    """Per-bucket request counts and per-service load for one window"""
+
+    def __init__(self, bucket_starts, bucket_seconds, counts, load):
+        self.bucket_starts = bucket_starts    # (buckets,) epoch seconds
+        self.bucket_seconds = bucket_seconds  # (buckets,) length of each bucket
+        self.counts = counts                  # (buckets, endpoints) request counts
+        self.load = load                      # (buckets, services) offered load / capacity
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+
+class TrafficModel:
+    """Per-endpoint rates shaped by load curves, flash sales and incidents"""
+
+    def __init__(self, endpoints, services, diurnal=None, weekly=None, arrivals='poisson',
+                 burstiness=4.0, bucket=60.0, capacity=None, flash_sales=(), impact=None):
+        # endpoints: [{'path', 'method', 'service', 'rate' (req/h), 'latency' (s)}]
+        self.endpoints = endpoints
+        self.service_names = list(services)
+        self.endpoint_table = tuple(
+            (e['path'], e['method'], services[e['service']]['port']) for e in endpoints
+        )
+        self.rates = np.array([e['rate'] for e in endpoints], dtype=float) / 3600
+        self.latency = np.array([e.get('latency', 0.1) for e in endpoints], dtype=float)
+        self.endpoint_service = np.array(
+            [self.service_names.index(e['service']) for e in endpoints], dtype=np.int64
+        )
+        self.diurnal = np.array(diurnal if diurnal else [1.0] * 24, dtype=float)
+        self.weekly = np.array(weekly if weekly else [1.0] * 7, dtype=float)
+        if len(self.diurnal) != 24 or len(self.weekly) != 7:
+            raise ValueError("diurnal needs 24 hourly values and weekly needs 7 daily values")
+        if arrivals not in ('poisson', 'bursty'):
+            raise ValueError(f"arrivals must be 'poisson' or 'bursty', got {arrivals!r}")
+        self.arrivals = arrivals
+        self.burstiness = burstiness
+        self.bucket = bucket
+        capacity = capacity or {}
+        self.capacity = np.array([capacity.get(name, np.inf) for name in self.service_names], dtype=float)
+        self.flash_sales = list(flash_sales)
+        self.impact = {status: dict(DEFAULT_IMPACT[status], **(impact or {}).get(status, {}))
+                       for status in DEFAULT_IMPACT}
+
+    @classmethod
+    def from_config(cls, path, services):
+        config = load_yaml(path).get('traffic', {})
+        endpoints = [
+            dict(e, latency=parse_duration(e.get('latency', '100ms'))) for e in config['endpoints']
+        ]
+        arrivals = config.get('arrivals', {})
+        flash_sales = []
+        for sale in config.get('flash_sales', []):
+            daily_at = sale.get('daily_at')
+            flash_sales.append(FlashSale(
+                sale.get('name', 'flash-sale'),
+                parse_duration(sale['duration']),
+                float(sale['multiplier']),
+                services=sale.get('services'),
+                start=datetime.fromisoformat(sale['start']) if sale.get('start') else None,
+                daily_at=tuple(int(part) for part in daily_at.split(':')) if daily_at else None,
+                weekdays=sale.get('weekdays'),
+            ))
+        return cls(
+            endpoints, services,
+            diurnal=config.get('diurnal'),
+            weekly=config.get('weekly'),
+            arrivals=arrivals.get('model', 'poisson'),
+            burstiness=float(arrivals.get('burstiness', 4)),
+            bucket=parse_duration(arrivals.get('bucket', '60s')),
+            capacity=config.get('capacity'),
+            flash_sales=flash_sales,
+            impact=config.get('incident_impact'),
+        )
+
+    def multiplier(self, moment):
+        """Load-curve multiplier for a datetime, shared by all endpoints"""
+        return self.diurnal[moment.hour] * self.weekly[moment.weekday()]
+
+    def plan(self, start, end, statuses, rng):
+        """Draw request counts for [start, end) epoch seconds given current service statuses"""
+        if end <= start:
+            return TrafficPlan(np.empty(0), np.empty(0), np.zeros((0, len(self.endpoints)), dtype=np.int64),
+                               np.zeros((0, len(self.service_names))))
+        bucket_starts = np.arange(start, end, self.bucket, dtype=float)
+        bucket_seconds = np.minimum(bucket_starts + self.bucket, end) - bucket_starts
+
+        retry = np.array([self.impact[statuses[name]]['retry'] for name in self.service_names])
+        endpoint_retry = retry[self.endpoint_service]
+
+        expected = np.empty((len(bucket_starts), len(self.endpoints)))
+        for index, bucket_start in enumerate(bucket_starts.tolist()):
+            moment = datetime.fromtimestamp(bucket_start)
+            boost = np.ones(len(self.endpoints))
+            for sale in self.flash_sales:
+                if sale.active(moment):
+                    hit = [sale.services is None or self.service_names[s] in sale.services
+                           for s in self.endpoint_service]
+                    boost[hit] *= sale.multiplier
+            expected[index] = self.rates * self.multiplier(moment) * boost * endpoint_retry
+        expected *= bucket_seconds[:, None]
+
+        if self.arrivals == 'bursty':
+            # Gamma-Poisson mixture: same mean, overdispersed bucket-to-bucket
+            expected *= rng.gamma(self.burstiness, 1 / self.burstiness, size=expected.shape)
+        counts = rng.poisson(expected)
+
+        per_service = np.zeros((len(bucket_starts), len(self.service_names)))
+        for endpoint, service in enumerate(self.endpoint_service.tolist()):
+            per_service[:, service] += counts[:, endpoint]
+        load = per_service / bucket_seconds[:, None] / self.capacity
+        return TrafficPlan(bucket_starts, bucket_seconds, counts, load)
+
+    def latency_multipliers(self, statuses):
+        return np.array([self.impact[statuses[name]]['latency'] for name in self.service_names])
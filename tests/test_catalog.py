@@ -0,0 +1,84 @@
+# tests/test_catalog.py
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'services',
+                                'product-service'))
+
+from catalog import ENTRY_OVERHEAD, Catalog, LRUCache, ProductStore  # noqa: E402
+
+
+def test_put_writes_through_and_drops_cached_copies():
+    catalog = Catalog(ProductStore(count=10), LRUCache())
+    assert catalog.product_json(42) == b'null'
+    first_page = json.loads(catalog.page_json(1, 5))
+    catalog.put({'id': 42, 'name': 'Quantum Toaster', 'price': 42.0})
+    catalog.put({'id': 3, 'name': 'Renamed Lamp', 'price': 1.0})
+    assert json.loads(catalog.product_json(42))['name'] == 'Quantum Toaster'
+    page = json.loads(catalog.page_json(1, 5))
+    assert page['products'][2]['name'] == 'Renamed Lamp' != first_page['products'][2]['name']
+    assert 42 in {product['id'] for product in catalog.store}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _entry_size(key, value):
+    return len(key) + len(value) + ENTRY_OVERHEAD
+
+
+def test_lru_evicts_least_recently_used_within_the_byte_budget():
+    value = b'x' * 100
+    cache = LRUCache(max_bytes=3 * _entry_size('k:1', value))
+    for key in ('k:1', 'k:2', 'k:3'):
+        assert cache.set(key, value)
+    assert cache.get('k:1') == value  # k:2 is now the least recently used
+    cache.set('k:4', value)
+    assert cache.get('k:2') is None
+    assert [cache.get(key) for key in ('k:1', 'k:3', 'k:4')] == [value] * 3
+    assert cache.evictions == 1 and cache.bytes == 3 * _entry_size('k:1', value) <= cache.max_bytes
+
+
+def test_lru_replacing_a_key_adjusts_bytes_and_oversized_values_are_refused():
+    cache = LRUCache(max_bytes=2000)
+    cache.set('k', b'a' * 10)
+    cache.set('k', b'b' * 500)
+    assert len(cache) == 1 and cache.bytes == _entry_size('k', b'b' * 500)
+    assert not cache.set('big', b'x' * 2000)
+    assert cache.get('big') is None and cache.bytes == _entry_size('k', b'b' * 500)
+
+
+def test_lru_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(ttl=10, clock=clock)
+    cache.set('k', b'v')
+    clock.now = 9.9
+    assert cache.get('k') == b'v'
+    clock.now = 10.0
+    assert cache.get('k') is None
+    assert cache.expirations == 1 and cache.bytes == 0 and len(cache) == 0
+
+
+def test_lru_byte_accounting_holds_under_concurrent_writers():
+    cache = LRUCache(max_bytes=50 * _entry_size('k:0000', b'x' * 64))
+
+    def writer(offset):
+        for i in range(2000):
+            key = f"k:{(offset + i) % 200:04d}"
+            cache.set(key, b'x' * 64)
+            cache.get(key)
+
+    threads = [threading.Thread(target=writer, args=(n * 37,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.bytes == sum(entry[2] for entry in cache._entries.values()) <= cache.max_bytes
+    assert len(cache) == 50
@@ -0,0 +1,85 @@
+# tests/test_connection_pool.py
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'services',
+                                'user-service'))
+
+from db import ConnectionPool, PoolTimeout  # noqa: E402
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, acquire_timeout=5.0)
+    yield pool
+    pool.close()
+
+
+def test_acquire_times_out_when_the_pool_is_exhausted(pool):
+    held = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire(timeout=0.05)
+    assert pool.timeouts == 1 and pool.waiting == 0
+    pool.release(held)
+    assert pool.acquire(timeout=0.05) is held  # reused, not a new connection
+    assert pool.stats()['open'] == 1
+
+
+def test_release_hands_the_connection_to_a_waiting_thread(pool):
+    held = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    while not pool.waiting:
+        pass
+    pool.release(held)
+    waiter.join(5)
+    assert got == [held] and pool.in_use == 1
+
+
+def test_release_from_a_thread_wakes_acquire_async(pool):
+    held = pool.acquire()
+
+    async def main():
+        task = asyncio.create_task(pool.acquire_async())
+        while not pool.waiting:
+            await asyncio.sleep(0.001)
+        threading.Thread(target=pool.release, args=(held,)).start()
+        return await asyncio.wait_for(task, 5)
+
+    assert asyncio.run(main()) is held
+    assert pool.waiting == 0 and not pool._async_waiters
+
+
+def test_acquire_async_times_out_and_leaves_no_waiter(pool):
+    pool.acquire()
+
+    async def main():
+        with pytest.raises(PoolTimeout):
+            await pool.acquire_async(timeout=0.05)
+
+    asyncio.run(main())
+    assert pool.timeouts == 1 and pool.waiting == 0 and not pool._async_waiters
+
+
+def test_cancelled_async_waiter_does_not_swallow_the_handoff(pool):
+    held = pool.acquire()
+
+    async def main():
+        first = asyncio.create_task(pool.acquire_async())
+        second = asyncio.create_task(pool.acquire_async())
+        while pool.waiting < 2:
+            await asyncio.sleep(0.001)
+        pool.release(held)
+        first.cancel()  # the wake-up went to `first`; it must pass it on
+        conn = await asyncio.wait_for(second, 5)
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return conn
+
+    assert asyncio.run(main()) is held
+    assert pool.in_use == 1 and pool.waiting == 0
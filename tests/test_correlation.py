@@ -0,0 +1,44 @@
+# tests/test_correlation.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.correlation import Correlator, TemplateMiner  # noqa: E402
+
+
+def _incident(correlator, ts, name, service, header):
+    closed = correlator.marker(ts, name)
+    closed += correlator.error(ts, 'ERROR', None, header)
+    closed += correlator.error(ts, 'ERROR', service, f"service={service} detail=1")
+    closed += correlator.error(ts, 'CRITICAL', None, f"{name} escalated")
+    return closed
+
+
+def test_incident_header_lands_with_its_service_lines():
+    correlator = Correlator()
+    _incident(correlator, 1000.0, 'high_cpu_usage', 'user-service', "HIGH CPU UTILIZATION ALERT")
+    _incident(correlator, 1600.0, 'authentication_failure', 'user-service', "AUTHENTICATION SERVICE FAILURE")
+    clusters = correlator.flush()
+    assert [c['incidents'] for c in clusters] == [['high_cpu_usage'], ['authentication_failure']]
+    assert [c['errors'] for c in clusters] == [3, 3]
+    assert clusters[1]['first'] == "AUTHENTICATION SERVICE FAILURE"
+
+
+def test_service_less_burst_gets_its_own_cluster():
+    correlator = Correlator()
+    _incident(correlator, 1000.0, 'high_cpu_usage', 'user-service', "HIGH CPU UTILIZATION ALERT")
+    correlator.marker(1300.0, 'disk_space_issue')
+    correlator.error(1300.0, 'ERROR', None, "DISK SPACE CRITICAL")
+    correlator.error(1300.0, 'CRITICAL', None, "disk full on /var")
+    clusters = correlator.flush()
+    assert [(c['incidents'], c['errors']) for c in clusters] == [(['high_cpu_usage'], 3), (['disk_space_issue'], 2)]
+
+
+def test_signature_is_stable_as_template_generalizes():
+    miner = TemplateMiner()
+    template = miner.add("Upstream call failed service=user-service state=open")
+    signature = template.signature
+    assert miner.add("Upstream call failed service=order-service state=open") is template
+    assert template.text == "Upstream call failed service=<*> state=open"
+    assert template.signature == signature
@@ -0,0 +1,41 @@
+# tests/test_health.py
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.health import Endpoint, HealthChecker  # noqa: E402
+
+
+async def _server(status):
+    """Minimal HTTP server answering every request with `status`"""
+    async def serve(reader, writer):
+        try:
+            while True:
+                await reader.readuntil(b"\r\n\r\n")
+                writer.write(f"HTTP/1.1 {status} X\r\nContent-Length: 0\r\n\r\n".encode())
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(serve, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_instances_sharing_a_name_are_probed_at_their_own_urls():
+    async def main():
+        up, up_port = await _server(200)
+        down, down_port = await _server(503)
+        checker = HealthChecker([Endpoint('user-service', f"http://127.0.0.1:{up_port}/health"),
+                                 Endpoint('user-service', f"http://127.0.0.1:{down_port}/health")])
+        try:
+            return await checker.sweep()
+        finally:
+            await checker.close()
+            up.close()
+            down.close()
+
+    results = asyncio.run(main())
+    assert [(r['healthy'], r['status']) for r in results] == [(True, 200), (False, 503)]
+    assert results[0]['url'] != results[1]['url']
@@ -0,0 +1,117 @@
+# tests/test_order_store.py
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['REDIS_URL'] = 'memory://'
+
+from simulator.services import service_module  # noqa: E402
+
+order_app = service_module('order-service')
+
+
+class FlakyRedis:
+    """InMemoryRedis whose pipelines fail while `failing`, and block while `gate` is clear"""
+
+    def __init__(self):
+        self.redis = order_app.make_client('memory://')
+        self.failing = False
+        self.attempts = 0
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def ping(self):
+        if self.failing:
+            raise ConnectionError("redis down")
+        return True
+
+    def pipeline(self, transaction=True):
+        pipe = self.redis.pipeline(transaction)
+        execute = pipe.execute
+
+        def flaky_execute():
+            self.attempts += 1
+            self.entered.set()
+            self.gate.wait(5)
+            if self.failing:
+                raise ConnectionError("redis down")
+            return execute()
+        pipe.execute = flaky_execute
+        return pipe
+
+
+def _store(client, **options):
+    options = {'retry_backoff': 0, 'flush_interval': 0.5, **options}
+    return order_app.OrderStore(client, **options)
+
+
+def _post(monkeypatch, store, order):
+    monkeypatch.setattr(order_app, 'orders', store)
+    monkeypatch.setattr(order_app.random, 'random', lambda: 1.0)  # no simulated inventory failures
+    return order_app.app.test_client().post('/orders', json=order)
+
+
+def test_orders_are_written_in_pipelined_batches():
+    client = order_app.make_client('memory://')
+    store = _store(client, batch_size=100)
+    for order_id in range(250):
+        store.submit(order_id, json.dumps({'id': order_id}))
+    assert store.close()
+    assert store.written == 250 and store.batches == 3
+    assert client.round_trips == 3
+    assert json.loads(client.get('order_249')) == {'id': 249}
+
+
+def test_accepted_order_is_202(monkeypatch):
+    store = _store(order_app.make_client('memory://'))
+    response = _post(monkeypatch, store, {'id': 7})
+    assert response.status_code == 202 and response.get_json()['status'] == 'accepted'
+    assert store.close() and store.written == 1
+
+
+def test_full_queue_is_429(monkeypatch):
+    client = FlakyRedis()
+    client.gate.clear()
+    store = _store(client, max_queue=1, batch_size=1)
+    store.submit(1, '{}')
+    assert client.entered.wait(5)  # the flusher holds order 1, the queue is empty again
+    store.submit(2, '{}')
+    response = _post(monkeypatch, store, {'id': 3})
+    assert response.status_code == 429 and response.headers['Retry-After'] == '1'
+    client.gate.set()
+    assert store.close()
+    assert store.written == 2 and store.rejected == 1
+
+
+def test_one_failed_batch_does_not_make_the_store_unavailable():
+    client = FlakyRedis()
+    client.failing = True
+    store = _store(client, retries=3, unhealthy_after=3)
+    store.submit(1, '{}')
+    assert store.flush()
+    assert client.attempts == 4
+    assert store.failed == 1 and store.consecutive_failures == 1 and store.available
+
+
+def test_repeatedly_failing_store_is_503_until_redis_answers(monkeypatch):
+    client = FlakyRedis()
+    client.failing = True
+    store = _store(client, retries=1, unhealthy_after=2)
+    for order_id in range(2):
+        store.submit(order_id, '{}')
+        assert store.flush()
+    assert not store.available
+    response = _post(monkeypatch, store, {'id': 3})
+    assert response.status_code == 503 and response.headers['Retry-After'] == '5'
+
+    client.failing = False
+    deadline = time.monotonic() + 5
+    while not store.available and time.monotonic() < deadline:
+        time.sleep(0.01)  # the idle flusher pings Redis every half second
+    assert store.available
+    assert _post(monkeypatch, store, {'id': 4}).status_code == 202
+    assert store.close()
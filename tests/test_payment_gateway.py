@@ -0,0 +1,127 @@
+# tests/test_payment_gateway.py
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'services',
+                                'payment-service'))
+
+import gateway as gateway_module  # noqa: E402
+from gateway import GatewayError, PaymentProcessor, StubGateway  # noqa: E402
+
+
+class ScriptedGateway(StubGateway):
+    """StubGateway whose calls fail in a fixed order: 'timeout' charges then times out, '503' charges nothing"""
+
+    def __init__(self, name, script):
+        super().__init__(name)
+        self.script = list(script)
+
+    def authorize(self, payments, idempotency_key):
+        step = self.script.pop(0) if self.script else None
+        if step == '503':
+            self.calls += 1
+            raise GatewayError(f"{self.name} returned 503", status=503)
+        if step == '400':
+            self.calls += 1
+            raise GatewayError(f"{self.name} rejected the request", status=400, retryable=False)
+        results = super().authorize(payments, idempotency_key)
+        if step == 'timeout':
+            raise GatewayError(f"{self.name} timed out", ambiguous=True)
+        return results
+
+
+def _processor(primary, fallback):
+    return PaymentProcessor(primary, fallback, max_attempts=2, base_backoff=0, max_backoff=0)
+
+
+def test_timeout_then_503_never_falls_back():
+    primary = ScriptedGateway('primary', ['timeout', '503'])
+    fallback = ScriptedGateway('fallback', [])
+    result = _processor(primary, fallback).authorize({'id': 1, 'amount': 10})
+    assert result['status'] == 'unknown'
+    assert primary.charges == 1
+    assert fallback.charges == 0
+
+
+def test_timeout_then_refusal_is_unknown_and_retry_does_not_double_charge():
+    primary = ScriptedGateway('primary', ['timeout', '400'])
+    processor = _processor(primary, ScriptedGateway('fallback', []))
+    assert processor.authorize({'id': 2, 'amount': 10})['status'] == 'unknown'
+    retried = processor.authorize({'id': 2, 'amount': 10})
+    assert retried['status'] == 'processed'
+    assert primary.charges == 1
+
+
+def test_plain_503s_fall_back():
+    primary = ScriptedGateway('primary', ['503', '503'])
+    fallback = ScriptedGateway('fallback', [])
+    result = _processor(primary, fallback).authorize({'id': 3, 'amount': 10})
+    assert result['status'] == 'processed' and result['processor'] == 'fallback'
+    assert primary.charges == 0 and fallback.charges == 1
+
+
+class GatedGateway(ScriptedGateway):
+    """ScriptedGateway whose calls block until `gate` is set"""
+
+    def __init__(self, name, script):
+        super().__init__(name, script)
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+
+    def authorize(self, payments, idempotency_key):
+        self.entered.set()
+        self.gate.wait(5)
+        return super().authorize(payments, idempotency_key)
+
+
+class _WatchedEvent(threading.Event):
+    """Event that reports when somebody starts waiting on it"""
+
+    waiting = None
+
+    def wait(self, timeout=None):
+        self.waiting.set()
+        return super().wait(timeout)
+
+
+def _concurrent(monkeypatch, processor, gateway, payment):
+    """Leader and waiter results of two overlapping authorize() calls with the same key"""
+    waiting = threading.Event()
+
+    class WatchedAttempt(gateway_module._Attempt):
+        def __init__(self):
+            super().__init__()
+            self.done = _WatchedEvent()
+            self.done.waiting = waiting
+
+    monkeypatch.setattr(gateway_module, '_Attempt', WatchedAttempt)
+    results = {}
+    leader = threading.Thread(target=lambda: results.setdefault('leader', processor.authorize(payment)))
+    leader.start()
+    assert gateway.entered.wait(5)
+    waiter = threading.Thread(target=lambda: results.setdefault('waiter', processor.authorize(payment)))
+    waiter.start()
+    assert waiting.wait(5)
+    gateway.gate.set()
+    leader.join(5)
+    waiter.join(5)
+    return results['leader'], results['waiter']
+
+
+def test_waiter_on_an_ambiguous_attempt_is_unknown(monkeypatch):
+    primary = GatedGateway('primary', ['timeout', 'timeout'])
+    processor = _processor(primary, ScriptedGateway('fallback', []))
+    leader, waiter = _concurrent(monkeypatch, processor, primary, {'id': 4, 'amount': 10})
+    assert leader['status'] == 'unknown'
+    assert waiter['status'] == 'unknown'
+    assert primary.charges == 1
+
+
+def test_waiter_on_a_processed_attempt_replays_it(monkeypatch):
+    primary = GatedGateway('primary', [])
+    processor = _processor(primary, ScriptedGateway('fallback', []))
+    leader, waiter = _concurrent(monkeypatch, processor, primary, {'id': 5, 'amount': 10})
+    assert leader['status'] == waiter['status'] == 'processed'
+    assert waiter['replayed'] and waiter['authorization'] == leader['authorization']
+    assert primary.charges == 1
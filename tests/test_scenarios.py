@@ -0,0 +1,27 @@
+# tests/test_scenarios.py
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.scenarios import Scenario, ScenarioRegistry  # noqa: E402
+
+
+def test_default_scenarios_load_and_trigger():
+    registry = ScenarioRegistry.from_yaml()
+    incident = registry.choose(random.Random(1)).trigger(random.Random(1))
+    assert incident.lines
+
+
+@pytest.mark.parametrize('options, message', [
+    ({'service': 'user-servce'}, "scenario 'typo': unknown service 'user-servce'"),
+    ({'service': 'user-service', 'transition': {'status': 'degarded'}},
+     "scenario 'typo': unknown transition status 'degarded'"),
+    ({'transition': {'status': 'down'}}, "scenario 'typo': a transition needs a service"),
+])
+def test_bad_service_or_status_is_rejected_at_load(options, message):
+    with pytest.raises(ValueError, match=message):
+        Scenario('typo', [{'error': "something broke"}], **options)
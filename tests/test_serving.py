@@ -0,0 +1,174 @@
+# tests/test_serving.py
+import os
+import signal
+import socket
+import sys
+import threading
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator import serving  # noqa: E402
+from simulator.serving import AsyncWorker, PreforkServer, ThreadWorker  # noqa: E402
+
+WORKERS = {'threads': ThreadWorker, 'async': AsyncWorker}
+
+
+def _app(slow):
+    app = Flask(__name__)
+
+    @app.route('/echo/<word>')
+    def echo(word):
+        return word
+
+    @app.route('/slow')
+    def wait():
+        slow['entered'].set()
+        slow['gate'].wait(5)
+        return 'done'
+
+    return app
+
+
+@pytest.fixture
+def sigterm():
+    """Workers install their own SIGTERM handler; put pytest's back afterwards"""
+    previous = signal.signal(signal.SIGTERM, lambda *_: None)
+    yield lambda: os.kill(os.getpid(), signal.SIGTERM)
+    signal.signal(signal.SIGTERM, previous)
+
+
+def _serve(worker_class, client, stop):
+    """Run a worker in this (main) thread while `client(port, slow)` talks to it from another thread
+
+    Workers stop on SIGTERM like under the master; `client` may send it
+    itself, otherwise it's sent (until the worker returns) once it finishes.
+    """
+    slow = {'entered': threading.Event(), 'gate': threading.Event()}
+    sock = socket.create_server(('127.0.0.1', 0))
+    worker = WORKERS[worker_class](_app(slow), sock, threads=4, keepalive=2.0)
+    finished = threading.Event()
+    outcome = {}
+
+    def run_client():
+        try:
+            outcome['result'] = client(sock.getsockname()[1], slow)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            slow['gate'].set()
+            while not finished.is_set():
+                stop()
+                finished.wait(1)
+
+    thread = threading.Thread(target=run_client)
+    thread.start()
+    try:
+        worker.run()
+    finally:
+        finished.set()
+        thread.join(5)
+        sock.close()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+
+def _connect(port):
+    conn = socket.create_connection(('127.0.0.1', port), timeout=5)
+    return conn, conn.makefile('rb')
+
+
+def _read_response(reader):
+    """(status line, headers, body) of one response"""
+    status = reader.readline().decode().strip()
+    headers = {}
+    while True:
+        line = reader.readline().decode().strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.lower()] = value.strip()
+    return status, headers, reader.read(int(headers.get('content-length', 0)))
+
+
+@pytest.mark.parametrize('worker_class', WORKERS)
+def test_pipelined_requests_on_one_keep_alive_connection(worker_class, sigterm):
+    def client(port, slow):
+        conn, reader = _connect(port)
+        with conn:
+            conn.sendall(b"GET /echo/one HTTP/1.1\r\nHost: x\r\n\r\n"
+                         b"GET /echo/two HTTP/1.1\r\nHost: x\r\n\r\n")
+            first, second = _read_response(reader), _read_response(reader)
+            conn.sendall(b"GET /echo/three HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+            third = _read_response(reader)
+            return first, second, third, reader.read()
+
+    first, second, third, rest = _serve(worker_class, client, sigterm)
+    assert [response[2] for response in (first, second, third)] == [b'one', b'two', b'three']
+    assert first[0] == 'HTTP/1.1 200 OK' and first[1]['connection'] == 'keep-alive'
+    assert third[1]['connection'] == 'close' and rest == b''  # closed after the last response
+
+
+@pytest.mark.parametrize('worker_class', WORKERS)
+@pytest.mark.parametrize('request_line, status', [
+    (b"GARBAGE\r\n", '400 Bad Request'),
+    (b"GET /echo/x HTTP/1.1 extra\r\n", '400 Bad Request'),
+    (b"GET /echo/x HTTP/2.0\r\n", '505 HTTP Version Not Supported'),
+])
+def test_malformed_request_line_is_rejected_and_closed(worker_class, request_line, status, sigterm):
+    def client(port, slow):
+        conn, reader = _connect(port)
+        with conn:
+            conn.sendall(request_line + b"Host: x\r\n\r\n")
+            return _read_response(reader), reader.read()
+
+    (line, headers, _), rest = _serve(worker_class, client, sigterm)
+    assert line == f"HTTP/1.1 {status}"
+    assert headers['connection'] == 'close' and rest == b''
+
+
+@pytest.mark.parametrize('worker_class', WORKERS)
+def test_graceful_stop_finishes_in_flight_requests_and_closes_idle_ones(worker_class, sigterm):
+    def client(port, slow):
+        idle, idle_reader = _connect(port)
+        busy, busy_reader = _connect(port)
+        with idle, busy:
+            idle.sendall(b"GET /echo/warm HTTP/1.1\r\nHost: x\r\n\r\n")
+            assert _read_response(idle_reader)[2] == b'warm'
+            busy.sendall(b"GET /slow HTTP/1.1\r\nHost: x\r\n\r\n")
+            assert slow['entered'].wait(5)
+            sigterm()
+            idle_closed = idle_reader.read()  # EOF well before the 2s keep-alive timeout
+            slow['gate'].set()
+            return idle_closed, _read_response(busy_reader), busy_reader.read()
+
+    idle_closed, (line, headers, body), rest = _serve(worker_class, client, sigterm)
+    assert idle_closed == b''
+    assert line == 'HTTP/1.1 200 OK' and body == b'done'
+    assert headers['connection'] == 'close' and rest == b''
+
+
+def test_worker_ignores_sighup_sent_to_the_process_group(monkeypatch):
+    def fail():
+        raise RuntimeError("no app here")
+
+    monkeypatch.setattr(serving, 'load_service_app', lambda service: fail())
+    server = PreforkServer('user-service')
+    server._ready_r, server._ready_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            serving.logger.disabled = True
+            if server._worker_main() == serving.BOOT_ERROR:
+                os.kill(os.getpid(), signal.SIGHUP)
+                code = 0
+        finally:
+            os._exit(code)
+    os.close(server._ready_r)
+    os.close(server._ready_w)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0  # not -SIGHUP
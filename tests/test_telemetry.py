@@ -0,0 +1,41 @@
+# tests/test_telemetry.py
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.telemetry import NpyWriter  # noqa: E402
+
+
+def _system_rows(start, count):
+    return {
+        'timestamp': np.arange(start, start + count) * 1000,
+        'cpu_usage': np.full(count, 40),
+        'memory_usage': np.full(count, 50),
+        'disk_usage': np.full(count, 60),
+        'network_latency': np.full(count, 1.5),
+    }
+
+
+def test_npy_parts_are_memory_mappable_columns(tmp_path):
+    writer = NpyWriter(str(tmp_path), 'run', chunk_rows=4)
+    writer.write('system', _system_rows(0, 5))
+    writer.write('access', {'timestamp': [0, 1000, 2000], 'client': ['a', 'b', 'a'], 'method': ['GET'] * 3,
+                            'path': ['/x'] * 3, 'service': ['user-service'] * 3, 'status': [200, 500, 200],
+                            'bytes': [1, 2, 3], 'user_agent': ['ua'] * 3, 'latency_ms': [1.0, 2.0, 3.0]})
+    writer.close()
+
+    part = tmp_path / 'telemetry_system_run.part0000'
+    cpu = np.load(part / 'cpu_usage.npy', mmap_mode='r')
+    assert isinstance(cpu, np.memmap) and cpu.dtype == np.int16 and len(cpu) == 5
+    assert np.load(part / 'timestamp.npy', mmap_mode='r')[-1] == np.datetime64(4000, 'ms')
+
+    access = tmp_path / 'telemetry_access_run.part0000'
+    codes = np.load(access / 'client.npy', mmap_mode='r')
+    categories = np.load(access / 'client__categories.npy', mmap_mode='r')
+    assert categories[codes].tolist() == ['a', 'b', 'a']
+    assert len(np.load(tmp_path / 'telemetry_metrics_run.part0000' / 'cpu_usage.npy', mmap_mode='r')) == 0
+    assert all(os.path.isfile(path) for path in writer.paths.values())
+    assert 'access.part0000/client__categories' in writer.paths
@@ -0,0 +1,148 @@
+# tests/test_user_lookup.py
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'services',
+                                'user-service'))
+
+from lookup import UserLookup  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class GatedLoad:
+    """Backend query that blocks until `gate` is set, then returns `value` or raises `error`"""
+
+    def __init__(self, value=None, error=None):
+        self.value = value
+        self.error = error
+        self.calls = 0
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.entered.set()
+        self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def _concurrent(lookup, load, callers=5):
+    """Results (or exceptions) of `callers` threads asking for one key while the first query runs"""
+    results = [None] * callers
+
+    def call(i):
+        try:
+            results[i] = lookup.get('42', load)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(0,))]
+    threads[0].start()
+    assert load.entered.wait(5)
+    threads += [threading.Thread(target=call, args=(i,)) for i in range(1, callers)]
+    for thread in threads[1:]:
+        thread.start()
+    while lookup.coalesced < callers - 1:
+        pass
+    load.gate.set()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_concurrent_lookups_share_one_backend_query():
+    lookup = UserLookup()
+    load = GatedLoad({'id': 42})
+    results = _concurrent(lookup, load)
+    assert results == [{'id': 42}] * 5
+    assert load.calls == 1 and lookup.backend_queries == 1 and lookup.coalesced == 4
+    assert lookup.get('42', load) == {'id': 42} and lookup.hits == 1  # now cached
+
+
+def test_errors_are_shared_but_never_cached():
+    lookup = UserLookup()
+    load = GatedLoad(error=TimeoutError("query timed out"))
+    results = _concurrent(lookup, load, callers=3)
+    assert all(result is load.error for result in results)
+    assert load.calls == 1 and lookup.errors == 1 and len(lookup) == 0
+    load.error = None
+    load.value = {'id': 42}
+    assert lookup.get('42', load) == {'id': 42} and load.calls == 2
+
+
+def test_misses_use_the_negative_ttl():
+    clock = FakeClock()
+    lookup = UserLookup(ttl=5.0, negative_ttl=1.0, clock=clock)
+    calls = []
+    load = lambda: calls.append(1)  # noqa: E731 - returns None: no such user
+    assert lookup.get('7', load) is None
+    clock.now = 0.9
+    assert lookup.get('7', load) is None and len(calls) == 1 and lookup.negative_hits == 1
+    clock.now = 1.0
+    assert lookup.get('7', load) is None and len(calls) == 2
+
+
+def test_without_coalescing_every_lookup_queries():
+    lookup = UserLookup(ttl=0, negative_ttl=0, coalesce=False)
+    calls = []
+    for _ in range(3):
+        lookup.get('1', lambda: calls.append(1) or {'id': 1})
+    assert len(calls) == 3 and lookup.saved == 0 and len(lookup) == 0
+
+
+def test_async_lookups_share_one_query_and_errors_are_not_cached():
+    lookup = UserLookup()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise TimeoutError("query timed out")
+        return {'id': 42}
+
+    async def main():
+        first = await asyncio.gather(*(lookup.get_async('42', load) for _ in range(4)), return_exceptions=True)
+        second = await asyncio.gather(*(lookup.get_async('42', load) for _ in range(4)))
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert all(isinstance(result, TimeoutError) for result in first)
+    assert second == [{'id': 42}] * 4
+    assert len(calls) == 2 and lookup.coalesced == 6 and lookup.errors == 1
+
+
+def test_cancelled_async_waiter_does_not_cancel_the_shared_query():
+    lookup = UserLookup()
+    started = []
+
+    async def load():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return {'id': 42}
+
+    async def main():
+        leader = asyncio.create_task(lookup.get_async('42', load))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(lookup.get_async('42', load))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert asyncio.run(main()) == {'id': 42}
+    assert started == [1]